@@ -3,174 +3,144 @@
 
 # APP_enhanced.py - FINAL (MPGB Cricket Club - Sagar)
 # Features: CrickPro-like scorer, commentary rules, autosave, auto innings end, MOTM etc.
+# Scoring, persistence and instrumentation live in the UI-free `mpgb` package;
+# this file is the Streamlit front end over it.
+#
+# Cold start: heavy modules (pandas, PIL, matplotlib) are imported
+# inside the page functions that use them, so opening "Home" never loads them.
+
+import time
+_run_started = time.perf_counter()
 
 import os
 import io
+import csv
+import html
 import json
-import uuid
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import streamlit as st
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
 
-# optional auto-refresh
-try:
-    from streamlit_autorefresh import st_autorefresh
-    HAS_AUTORE = True
-except Exception:
-    HAS_AUTORE = False
+from mpgb import Match, ScoringEngine, FileStore, export_match_json, export_match_csv
+from mpgb.metrics import get_metrics, timed, instrumented
+from mpgb.util import normalize_mobile, format_over_ball
+from mpgb.commentary import recent_commentary, full_commentary
+from mpgb.roster import name_of, team_ids, recent_balls, all_balls, batting_rows, bowling_rows, named_stats
+from mpgb.overs import current_over, over_complete, over_rows
+from mpgb.partnerships import current_partnership, partnership_rows, fow_text
 
 # ---------------- Config ----------------
 DATA_DIR = "data"
 PHOTOS_DIR = os.path.join(DATA_DIR, "photos")
 MEMBERS_CSV = os.path.join(DATA_DIR, "members.csv")
 PAID_CSV = os.path.join(DATA_DIR, "Members_Paid.csv")
-MATCH_INDEX = os.path.join(DATA_DIR, "matches_index.json")
+TOURNAMENTS_JSON = os.path.join(DATA_DIR, "tournaments.json")
+MATCHUPS_JSON = os.path.join(DATA_DIR, "matchups.json")
 BACKUP_DIR = os.path.join(DATA_DIR, "backups")
 ADMIN_PHONE = "8931883300"  # change if needed
 LOGO_PATH = os.path.join(DATA_DIR, "logo.png")
+ASYNC_SAVES = True  # write match state from a background thread (False = write inline)
+STATE_FORMAT = "json-compact"  # match state/backups: json | json-compact | binary, optionally +gzip / +zstd
+BATCH_FLUSH_BALLS = 6  # batch scorer mode: deliveries queued on the scorer's session before one save
+LIVE_DIR = os.path.join(DATA_DIR, "live")  # static <mid>.json/.html scoreboards, published on every ball
+LIVE_BASE_URL = ""  # where LIVE_DIR is served (e.g. "http://192.168.1.10:8600"); "" hides the link
+API_PORT = 0  # >0 serves the JSON API (mpgb/api.py) on this port; writes need $MPGB_API_TOKEN
+API_HOST = "127.0.0.1"  # "0.0.0.0" exposes the API (reads need no token) to the whole LAN
+LIVE_EVENTS_BASE = ""  # API URL (e.g. "http://192.168.1.10:8700") for push updates in static scoreboards
+LIVE_HEARTBEAT_S = 1  # public page: idle check-in while waiting for the next ball (how soon a click is picked up)
+LIVE_MAX_WAIT_S = 600  # public page: rerun anyway after this long without a ball
+LIVE_MAX_WAITERS = 100  # public page: viewers held open for push updates; the rest get a Refresh button
+MEMBER_PICKER_TOP_K = 10  # Match Setup: search matches offered per keystroke
+STARTUP_BUDGET_MS = 1500  # first page paint after a server restart should stay under this
 
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(PHOTOS_DIR, exist_ok=True)
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-# ---------------- Commentary templates ----------------
-RUN_TEMPLATES = [
-    "Quick push and a run taken.",
-    "Good placement and a run.",
-    "Worked away for a couple.",
-    "Nice timing, that'll be a quick two.",
-    "Smart running between the wickets."
-]
-
-WICKET_TEMPLATES = [
-    "Clean bowled! That's a beauty.",
-    "Caught — taken safely.",
-    "LBW! The umpire raises his finger.",
-    "Edge and taken — batsman walks.",
-    "Run out! Direct hit.",
-    "Stumped — beaten by the bowler."
-]
-
-EXTRA_TEMPLATES = {
-    "WD": ["Wide called — extra run.", "Wide — one extra."],
-    "NB": ["No ball — free hit coming!", "No ball — extra run awarded."],
-    "BY": ["Byes added to the total.", "Byes — runs to the batting side."],
-    "LB": ["Leg-byes added.", "Leg-bye — runs added."]
-}
+@st.cache_resource
+def get_live_slots():
+    # each waiting viewer keeps a script thread of this process busy: bound how many
+    import threading
+    return threading.BoundedSemaphore(LIVE_MAX_WAITERS)
+
+@st.cache_resource
+def get_notifier():
+    # wakes public viewers (and API long-polls / event streams) when a ball is saved
+    from mpgb.notify import ChangeNotifier
+    return ChangeNotifier()
+
+@st.cache_resource
+def get_tournaments():
+    # teams, fixtures and points tables; finalize() feeds results in as an engine listener
+    from mpgb.tournament import TournamentBook
+    return TournamentBook(TOURNAMENTS_JSON)
+
+@st.cache_resource
+def get_matchups():
+    # batter-vs-bowler index; finalize() folds each finished match in as an engine listener
+    from mpgb.matchups import MatchupIndex
+    return MatchupIndex(MATCHUPS_JSON)
+
+@st.cache_resource
+def get_timelines():
+    # checkpointed replays (mpgb/replay.py) behind the public timeline slider and Admin restore
+    from mpgb.replay import TimelineCache
+    return TimelineCache()
+
+@st.cache_resource
+def get_engine():
+    # one engine (and background writer) per server process, shared by all sessions and reruns
+    from mpgb.publish import StaticPublisher
+    notifier = get_notifier()
+    eng = ScoringEngine(FileStore(DATA_DIR, async_writes=ASYNC_SAVES, serializer=STATE_FORMAT),
+                        listeners=[StaticPublisher(LIVE_DIR, events_base=LIVE_EVENTS_BASE), notifier, get_tournaments(), get_matchups()])
+    notifier.watch(eng.store)  # scoring through a standalone API process
+    if API_PORT:
+        from mpgb.api import start_api
+        try:
+            start_api(eng, port=API_PORT, host=API_HOST, token=os.environ.get("MPGB_API_TOKEN", ""), notifier=notifier)
+        except OSError as e:
+            print(f"[mpgb] API not started on port {API_PORT}: {e}")
+    return eng
 
-GENERIC_COMMENTS = [
-    "Good over, tight bowling.",
-    "Pressure building on the batsman.",
-    "Crowd enjoying the contest."
-]
-
-# ---------------- Helpers ----------------
-def normalize_mobile(s):
-    if pd.isna(s) or s is None:
-        return ""
-    s = str(s).strip()
-    for ch in [" ", "+", "-", "(", ")"]:
-        s = s.replace(ch, "")
-    digits = "".join([c for c in s if c.isdigit()])
-    if len(digits) > 10:
-        digits = digits[-10:]
-    return digits
-
-def load_json(path, default=None):
-    if default is None:
-        default = {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return default
+engine = get_engine()
 
-def save_json(path, obj):
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
-    try:
-        os.replace(tmp, path)
-    except:
-        os.rename(tmp, path)
-
-def format_over_ball(total_balls):
-    try:
-        total_balls = int(total_balls or 0)
-    except:
-        total_balls = 0
-    over_num = total_balls // 6
-    ball_in_over = total_balls % 6
-    return f"{over_num}.{ball_in_over}"
-
-# smart compare names or mobiles
-def same_player(a, b):
-    if not a or not b:
-        return False
-    sa = str(a).strip()
-    sb = str(b).strip()
-    if any(ch.isdigit() for ch in sa) and any(ch.isdigit() for ch in sb):
-        da = "".join([c for c in sa if c.isdigit()])
-        db = "".join([c for c in sb if c.isdigit()])
-        if len(da) >= 10 and len(db) >= 10:
-            return da[-10:] == db[-10:]
-        return da == db
-    return sa.lower() == sb.lower()
-
-def player_team(state, player_name):
-    if not player_name:
-        return None
-    teams = state.get("teams", {})
-    for tname, members in teams.items():
-        for m in members:
-            if same_player(m, player_name):
-                return tname
-    return None
+@st.cache_resource
+def get_registry():
+    # one in-process index per server; the ID sequence and appends are file-locked
+    from mpgb.members import MemberRegistry
+    return MemberRegistry(MEMBERS_CSV)
 
 # ---------------- Members / Paid list ----------------
 def ensure_members_file():
     if not os.path.exists(MEMBERS_CSV):
-        df = pd.DataFrame(columns=["MemberID", "Name", "Mobile", "Paid"])
-        df.to_csv(MEMBERS_CSV, index=False)
+        with open(MEMBERS_CSV, "w", encoding="utf-8") as f:
+            f.write("MemberID,Name,Mobile,Paid\n")
 
+@instrumented("storage.read_members")
 def read_members():
-    ensure_members_file()
+    # current row per member (members.csv is append-only: the last line for an ID wins)
+    import pandas as pd
+    from mpgb.members import FIELDS
     try:
-        df = pd.read_csv(MEMBERS_CSV, dtype=str)
-    except:
-        df = pd.DataFrame(columns=["MemberID", "Name", "Mobile", "Paid"])
-    if "Mobile" in df.columns:
-        df["Mobile"] = df["Mobile"].apply(normalize_mobile)
-    else:
-        df["Mobile"] = ""
-    if "Paid" not in df.columns:
-        df["Paid"] = "N"
-    return df.fillna("")
+        rows = get_registry().members()
+    except Exception:
+        rows = []
+    return pd.DataFrame(rows, columns=FIELDS)
 
 def write_members(df):
+    # full rewrite (admin edits only); registrations and Paid updates append
     try:
-        df2 = df.copy()
-        df2.to_csv(MEMBERS_CSV, index=False)
+        get_registry().replace_all(df.fillna("").to_dict("records"))
     except Exception as e:
         st.error(f"Error saving members: {e}")
 
-def next_member_id():
-    df = read_members()
-    if df.empty:
-        return "M001"
-    try:
-        nums = [int(x.lstrip("M")) for x in df["MemberID"].dropna().tolist() if str(x).startswith("M")]
-        mx = max(nums) if nums else 0
-    except:
-        mx = 0
-    return f"M{(mx+1):03d}"
-
+@instrumented("storage.read_paid_list")
 def read_paid_list():
+    import pandas as pd
     if os.path.exists(PAID_CSV):
         try:
+            get_metrics().incr("bytes_read", os.path.getsize(PAID_CSV))
             df = pd.read_csv(PAID_CSV, dtype=str)
         except:
             df = pd.DataFrame(columns=["Mobile_No"])
@@ -219,393 +189,142 @@ def sync_paid_with_registry():
     if paid_df.empty:
         return {"updated_count": 0, "unmatched": []}
     paid_set = set(paid_df["Mobile_No"].tolist())
-    updated = 0
-    unmatched = []
-    for idx, row in mems.iterrows():
-        mob = normalize_mobile(row.get("Mobile", ""))
-        if mob and mob in paid_set:
-            if mems.at[idx, "Paid"] != "Y":
-                mems.at[idx, "Paid"] = "Y"
-                updated += 1
-    reg_mobs = set(mems["Mobile"].apply(normalize_mobile).tolist())
-    for p in paid_set:
-        if p not in reg_mobs:
-            unmatched.append(p)
-    write_members(mems)
+    newly_paid = mems[mems["Mobile"].isin(paid_set) & (mems["Paid"] != "Y")]
+    # only the changed members are appended, not the whole registry rewritten
+    updated = get_registry().update([{"MemberID": m, "Paid": "Y"} for m in newly_paid["MemberID"]])
+    reg_mobs = set(mems["Mobile"].tolist())
+    unmatched = [p for p in paid_set if p not in reg_mobs]
     return {"updated_count": updated, "unmatched": unmatched}
 
-# ---------------- Matches state ----------------
-def load_matches_index():
-    return load_json(MATCH_INDEX, {})
-
-def save_matches_index(idx):
-    save_json(MATCH_INDEX, idx)
-
-def match_state_path(mid):
-    return os.path.join(DATA_DIR, f"match_{mid}_state.json")
-
-def save_match_state(mid, state):
-    save_json(match_state_path(mid), state)
-    try:
-        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        save_json(os.path.join(BACKUP_DIR, f"match_{mid}_backup_{ts}.json"), state)
-    except:
-        pass
-
-def load_match_state(mid):
-    return load_json(match_state_path(mid), {})
-
-def init_match_state_full(mid, title, overs, teamA, teamB, venue=""):
-    state = {
-        "mid": mid,
-        "title": title,
-        "venue": venue,
-        "overs_limit": int(overs),
-        "status": "INNINGS1",
-        "innings": 1,
-        "bat_team": "Team A",
-        "teams": {"Team A": teamA, "Team B": teamB},
-        "score": {"Team A": {"runs": 0, "wkts": 0, "balls": 0}, "Team B": {"runs": 0, "wkts": 0, "balls": 0}},
-        "batting": {"striker": teamA[0] if len(teamA)>0 else "", "non_striker": teamA[1] if len(teamA)>1 else "", "order": teamA[:], "next_index": 2},
-        "bowling": {"current_bowler": "", "last_over_bowler": "", "over_needs_change": False},
-        "batsman_stats": {},
-        "bowler_stats": {},
-        "balls_log": [],
-        "commentary": [],
-        "overs_detail": [],
-        "man_of_match_override": "",
-        "scorer_lock": {}
-    }
-    save_match_state(mid, state)
-    return state
-
-# ---------------- Commentary ----------------
-def pick_commentary(outcome, striker, bowler, extras=None):
-    extras = extras or {}
-    striker = striker or "Batsman"
-    bowler = bowler or "Bowler"
-    o = str(outcome)
-
-    if o == "6":
-        text = "It's a HUGE SIX!"
-    elif o == "4":
-        text = "That's a FOUR!"
-    elif o in ["1", "2", "3"]:
-        text = random.choice(RUN_TEMPLATES)
-    elif o in ["0", "dot", ""]:
-        text = random.choice(["No runs. Dot ball.", "Tight bowling — dot ball."])
-    elif o in ["W", "Wicket"]:
-        text = random.choice(WICKET_TEMPLATES)
-    elif o in ["WD", "Wide"]:
-        text = random.choice(EXTRA_TEMPLATES["WD"])
-    elif o in ["NB", "NoBall"]:
-        text = random.choice(EXTRA_TEMPLATES["NB"])
-    elif o in ["BY", "LB", "Bye", "LegBye"]:
-        text = random.choice(EXTRA_TEMPLATES["BY"])
-    else:
-        text = random.choice(GENERIC_COMMENTS)
-
-    return f"{bowler} to {striker} — {text}"
-
-# ---------------- Finalize / Summary helpers ----------------
-def compute_man_of_match(state):
-    best = None
-    best_score = -10**9
-    for p, vals in state.get("batsman_stats", {}).items():
-        runs = int(vals.get("R", 0) or 0)
-        score = runs
-        if score > best_score:
-            best_score = score
-            best = p
-    for p, vals in state.get("bowler_stats", {}).items():
-        wk = int(vals.get("W", 0) or 0)
-        runs_conceded = int(vals.get("R", 0) or 0)
-        score = wk * 25 - (runs_conceded // 10)
-        if score > best_score:
-            best_score = score
-            best = p
-    return best or state.get("man_of_match_override", "")
-
-def save_final_scorecard_files(mid, state):
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    base = os.path.join(BACKUP_DIR, f"match_{mid}_final_{ts}")
-    json_path = base + ".json"
-    csv_path = base + ".csv"
-    save_json(json_path, state)
-    rows = []
-    for b in state.get("balls_log", []):
-        rows.append({
-            "time": b.get("time"),
-            "outcome": b.get("outcome"),
-            "striker": b.get("striker"),
-            "non_striker": b.get("non_striker"),
-            "bowler": b.get("bowler"),
-            "extras": json.dumps(b.get("extras", {}), ensure_ascii=False),
-            "wicket": json.dumps(b.get("wicket", {}), ensure_ascii=False),
-            "prev_runs": b.get("prev_score", {}).get("runs"),
-            "post_runs": b.get("post_score", {}).get("runs")
-        })
-    try:
-        df = pd.DataFrame(rows)
-        df.to_csv(csv_path, index=False)
-    except Exception:
-        pass
-    return json_path, csv_path
-
-def finalize_match(mid, state):
-    if state.get("status") != "COMPLETED":
-        state["status"] = "COMPLETED"
-    ta = "Team A"; tb = "Team B"
-    ra = int(state.get("score", {}).get(ta, {}).get("runs", 0) or 0)
-    rb = int(state.get("score", {}).get(tb, {}).get("runs", 0) or 0)
-    wa = int(state.get("score", {}).get(ta, {}).get("wkts", 0) or 0)
-    wb = int(state.get("score", {}).get(tb, {}).get("wkts", 0) or 0)
-
-    if ra == rb:
-        result_text = "Match tied"
-    else:
-        if ra > rb:
-            margin = ra - rb
-            result_text = f"Team A won by {margin} runs"
-        else:
-            teamA_players = state.get("teams", {}).get("Team A", [])
-            team_size = max(0, len(teamA_players))
-            wkts_fallen = state.get("score", {}).get("Team B", {}).get("wkts", 0)
-            wickets_remaining = max(0, team_size - 1 - wkts_fallen)
-            result_text = f"Team B won by {wickets_remaining} wickets"
-
-    motm_auto = compute_man_of_match(state)
-    state["man_of_match_auto"] = motm_auto
-
-    summary = {
-        "result_text": result_text,
-        "runs": {"Team A": ra, "Team B": rb},
-        "wkts": {"Team A": wa, "Team B": wb},
-        "man_of_match_auto": motm_auto,
-        "completed_at": datetime.utcnow().isoformat()
-    }
-    state["final_summary"] = summary
-
-    jpath, cpath = save_final_scorecard_files(mid, state)
-
-    idx = load_matches_index()
-    if mid in idx:
-        idx[mid]["completed_at"] = summary["completed_at"]
-        idx[mid]["final_summary_brief"] = {"result": result_text, "motm": motm_auto}
-        save_matches_index(idx)
-
-    save_match_state(mid, state)
-    return summary
-
-# ---------------- Scoring function ----------------
-def record_ball_full(state, mid, outcome, extras=None, wicket_info=None):
-    if extras is None:
-        extras = {}
-
-    if state.get("status") == "COMPLETED":
-        return {"stopped": True, "reason": "Match already completed"}
-
-    bat_team = state.get("bat_team", "Team A")
-    sc = state["score"].get(bat_team, {"runs": 0, "wkts": 0, "balls": 0})
-    striker = state.get("batting", {}).get("striker", "")
-    non_striker = state.get("batting", {}).get("non_striker", "")
-    bowler = state.get("bowling", {}).get("current_bowler", "") or "Unknown"
-
-    if state.get("status") not in ("INNINGS1", "INNINGS2"):
-        return {"stopped": True, "reason": "Innings not active"}
-
-    team_players = state.get("teams", {}).get(bat_team, [])
-    team_size = max(0, len(team_players))
-
-    entry = {
-        "time": datetime.utcnow().isoformat(),
-        "outcome": outcome,
-        "extras": extras,
-        "wicket": wicket_info,
-        "striker": striker,
-        "non_striker": non_striker,
-        "bowler": bowler,
-        "prev_score": sc.copy(),
-        "prev_batsman": {
-            striker: state.get("batsman_stats", {}).get(striker, {}).copy(),
-            non_striker: state.get("batsman_stats", {}).get(non_striker, {}).copy()
-        },
-        "prev_bowler": {bowler: state.get("bowler_stats", {}).get(bowler, {}).copy()}
-    }
-
-    state.setdefault("batsman_stats", {})
-    state.setdefault("bowler_stats", {})
-    state["batsman_stats"].setdefault(striker, {"R": 0, "B": 0, "4": 0, "6": 0})
-    state["batsman_stats"].setdefault(non_striker, {"R": 0, "B": 0, "4": 0, "6": 0})
-    state["bowler_stats"].setdefault(bowler, {"B": 0, "R": 0, "W": 0})
-
-    def legal_ball_increment():
-        state["bowler_stats"][bowler]["B"] = state["bowler_stats"][bowler].get("B", 0) + 1
-        sc["balls"] = sc.get("balls", 0) + 1
-
-    o = str(outcome)
-
-    if o in ["0", "1", "2", "3", "4", "6"]:
-        runs = int(o)
-        state["batsman_stats"][striker]["R"] += runs
-        state["batsman_stats"][striker]["B"] += 1
-        if runs == 4:
-            state["batsman_stats"][striker]["4"] = state["batsman_stats"][striker].get("4", 0) + 1
-        if runs == 6:
-            state["batsman_stats"][striker]["6"] = state["batsman_stats"][striker].get("6", 0) + 1
-        legal_ball_increment()
-        state["bowler_stats"][bowler]["R"] += runs
-        sc["runs"] = sc.get("runs", 0) + runs
-        if runs % 2 == 1:
-            state["batting"]["striker"], state["batting"]["non_striker"] = non_striker, striker
-
-    elif o in ["W", "Wicket"]:
-        state["batsman_stats"][striker]["B"] += 1
-        legal_ball_increment()
-        state["bowler_stats"][bowler]["B"] += 1
-        state["bowler_stats"][bowler]["W"] = state["bowler_stats"][bowler].get("W", 0) + 1
-        sc["wkts"] = sc.get("wkts", 0) + 1
-        nxt = state["batting"].get("next_index", 0)
-        order = state["batting"].get("order", [])
-        next_player = None
-        if wicket_info and wicket_info.get("new_batsman"):
-            next_player = wicket_info.get("new_batsman")
-        else:
-            while nxt < len(order):
-                cand = order[nxt]
-                nxt += 1
-                if cand not in [striker, non_striker]:
-                    next_player = cand
-                    break
-        state["batting"]["next_index"] = nxt
-        if next_player:
-            state["batting"]["striker"] = next_player
-            state["batsman_stats"].setdefault(next_player, {"R": 0, "B": 0, "4": 0, "6": 0})
-
-    elif o in ["WD", "Wide"]:
-        add = int(extras.get("runs", 1))
-        state["bowler_stats"][bowler]["R"] += add
-        sc["runs"] = sc.get("runs", 0) + add
-
-    elif o in ["NB", "NoBall"]:
-        offbat = int(extras.get("runs_off_bat", 0))
-        add = 1 + offbat
-        state["bowler_stats"][bowler]["R"] += add
-        sc["runs"] = sc.get("runs", 0) + add
-        if offbat > 0:
-            state["batsman_stats"][striker]["R"] += offbat
-
-    elif o in ["BY", "LB", "Bye", "LegBye"]:
-        add = int(extras.get("runs", 1))
-        state["batsman_stats"][striker]["B"] += 1
-        legal_ball_increment()
-        state["bowler_stats"][bowler]["B"] += 1
-        sc["runs"] = sc.get("runs", 0) + add
-        if add % 2 == 1:
-            state["batting"]["striker"], state["batting"]["non_striker"] = non_striker, striker
-
-    else:
-        state["batsman_stats"][striker]["B"] += 1
-        legal_ball_increment()
-        state["bowler_stats"][bowler]["B"] += 1
-
-    entry["post_score"] = sc.copy()
-    state.setdefault("balls_log", []).append(entry)
-
-    comment_text = pick_commentary(o, striker, bowler, extras)
-    state.setdefault("commentary", []).append(format_over_ball(sc.get("balls", 0)) + " — " + comment_text)
-
-    overs_limit = int(state.get("overs_limit", 0) or 0)
-    overs_reached = False
-    all_out = False
-    if overs_limit > 0:
-        if sc.get("balls", 0) >= overs_limit * 6:
-            overs_reached = True
-    if team_size > 0:
-        if sc.get("wkts", 0) >= max(0, team_size - 1):
-            all_out = True
-
-    if overs_reached or all_out:
-        if state.get("status") == "INNINGS1":
-            state["status"] = "INNINGS2"
-            state["innings"] = 2
-            state["bat_team"] = "Team B" if state.get("bat_team") == "Team A" else "Team A"
-        else:
-            state["status"] = "COMPLETED"
-
-    save_match_state(mid, state)
-    return entry
-
-# ---------------- Undo last ball ----------------
-def undo_last_ball_full(state, mid):
-    if not state.get("balls_log"):
-        return False
-    last = state["balls_log"].pop()
-    state["score"][state.get("bat_team")] = last.get("prev_score", state["score"].get(state.get("bat_team"), {"runs": 0, "wkts": 0, "balls": 0}))
-    prev_bats = last.get("prev_batsman", {})
-    for p, vals in prev_bats.items():
-        if vals == {}:
-            state["batsman_stats"].pop(p, None)
-        else:
-            state["batsman_stats"][p] = vals
-    prev_bowl = last.get("prev_bowler", {})
-    for p, vals in prev_bowl.items():
-        if vals == {}:
-            state["bowler_stats"].pop(p, None)
-        else:
-            state["bowler_stats"][p] = vals
-    if state.get("commentary"):
-        state["commentary"].pop()
-    save_match_state(mid, state)
-    return True
-
-# ---------------- Scorer lock ----------------
-def try_acquire_scorer_lock(state, mid, phone):
-    lock = state.get("scorer_lock", {})
-    now = datetime.utcnow()
-    if not lock or not lock.get("locked_by"):
-        state["scorer_lock"] = {"locked_by": phone, "locked_at": now.isoformat(), "expires_at": (now + timedelta(minutes=15)).isoformat()}
-        save_match_state(mid, state)
-        return True
+PAID_WORDS = ["Y", "YES", "TRUE", "1", "PAID"]
+
+def bulk_import_members(df, photos=None):
+    """Admin bulk import: name, mobile, paid, optional photo columns -> inserted/updated/skipped report."""
+    import pandas as pd
+    cols = {c: str(c).strip().lower() for c in df.columns}
+    df = df.rename(columns=cols)
+    for c in ["name", "mobile", "paid", "photo"]:
+        if c not in df.columns:
+            df[c] = ""
+    df = df.fillna("").astype(str)
+    # whole-column normalization (same rule as normalize_mobile: digits only, last 10)
+    df["Mobile"] = df["mobile"].str.replace(r"\D", "", regex=True).str[-10:]
+    df["Name"] = df["name"].str.strip()
+    df["Paid"] = df["paid"].str.strip().str.upper().isin(PAID_WORDS).map({True: "Y", False: "N"})
+    df["Photo"] = df["photo"].str.strip()
+    df["Reason"] = ""
+    df.loc[df["Name"] == "", "Reason"] = "missing name"
+    df.loc[(df["Reason"] == "") & (df["Mobile"].str.len() != 10), "Reason"] = "invalid mobile"
+    df.loc[(df["Reason"] == "") & df.duplicated("Mobile", keep="first"), "Reason"] = "repeated in file"
+    bad = df[df["Reason"] != ""]
+    ok = df[df["Reason"] == ""]
+    # one locked pass: dedup against the registry by mobile, one batch of IDs, one append
+    report = get_registry().import_rows(ok[["Name", "Mobile", "Paid"]].to_dict("records"))
+    photo_of = dict(zip(ok["Mobile"], ok["Photo"]))
+    photos = {os.path.basename(f.name).lower(): f for f in (photos or [])}
+    missing = []
+    for row in report["inserted"] + report["updated"]:
+        fname = photo_of.get(row["Mobile"], "")
+        if not fname:
+            continue
+        f = photos.get(os.path.basename(fname).lower())
+        ext = fname.rsplit(".", 1)[-1].lower()
+        if f is None or ext not in ["png", "jpg", "jpeg"]:
+            missing.append(fname)
+            continue
+        with open(os.path.join(PHOTOS_DIR, f"{row['MemberID']}.{ext}"), "wb") as out:
+            out.write(f.getvalue())
+    frames = {k: pd.DataFrame(v) for k, v in report.items()}
+    frames["skipped"] = pd.concat([bad[["Name", "Mobile", "Paid", "Reason"]], frames["skipped"]], ignore_index=True)
+    return frames, missing
+
+# ---------------- Live refresh ----------------
+def wait_for_next_ball(mid, version, slot):
+    slots = get_live_slots()
+    if not slots.acquire(blocking=False):
+        get_metrics().incr("public_waiters_full")
+        with slot.container():
+            st.caption("Live — too many viewers for instant updates right now")
+            st.button("🔄 Refresh", key="live_refresh")
+        return
     try:
-        expires = datetime.fromisoformat(lock.get("expires_at"))
-        if expires < now:
-            state["scorer_lock"] = {"locked_by": phone, "locked_at": now.isoformat(), "expires_at": (now + timedelta(minutes=15)).isoformat()}
-            save_match_state(mid, state)
-            return True
-    except:
-        pass
-    return False
-
-def release_scorer_lock(state, mid, phone):
-    lock = state.get("scorer_lock", {})
-    if lock.get("locked_by") == phone:
-        state["scorer_lock"] = {}
-        save_match_state(mid, state)
-        return True
-    return False
-
-# ---------------- Export helpers ----------------
-def export_match_json(state):
-    return json.dumps(state, indent=2, ensure_ascii=False).encode("utf-8")
-
-def export_match_csv(state):
-    rows = []
-    for b in state.get("balls_log", []):
-        rows.append({
-            "time": b.get("time"),
-            "outcome": b.get("outcome"),
-            "striker": b.get("striker"),
-            "non_striker": b.get("non_striker"),
-            "bowler": b.get("bowler"),
-            "extras": json.dumps(b.get("extras", {}), ensure_ascii=False),
-            "wicket": json.dumps(b.get("wicket", {}), ensure_ascii=False)
-        })
-    df = pd.DataFrame(rows)
-    return df.to_csv(index=False).encode("utf-8")
+        notifier = get_notifier()
+        if notifier.version(mid) is None:
+            notifier.publish(mid, version)  # baseline for matches not saved since the server started
+        deadline = time.monotonic() + LIVE_MAX_WAIT_S
+        while time.monotonic() < deadline:
+            if notifier.wait(mid, version, timeout=LIVE_HEARTBEAT_S) != version:
+                get_metrics().incr("public_push_refreshes")
+                st.experimental_rerun()
+            # every st call is a point where Streamlit can end this run (viewer left / clicked something)
+            slot.caption(f"🟢 Live — updates on every ball · checked {datetime.now().strftime('%H:%M:%S')}")
+        st.experimental_rerun()
+    finally:
+        slots.release()
 
 # ---------------- UI ----------------
+_first_run = get_metrics().counter("reruns") == 0  # first script run since the server started
 st.set_page_config(page_title="MPGB Cricket Club - Sagar", layout="wide")
+get_metrics().mark_rerun()
+
+# ---------------- Embed / kiosk mode ----------------
+# ?embed=1[&mid=<match id>] for TVs and iframes: the score strip and the crease only - no
+# banner, themes, sidebar, member lookups or tables - rebuilt once per ball for all viewers
+EMBED_CSS = ("<style>#MainMenu,header,footer,[data-testid=stSidebar],[data-testid=collapsedControl]{display:none}"
+             ".block-container{padding:.5rem 1rem}</style>")
+
+@st.cache_data(max_entries=64)
+def embed_html(mid, version):
+    from html import escape
+    from mpgb.summary import live_summary
+    match = engine.load_shared(mid)
+    if match is None:
+        return "<div>Match not found</div>"
+    d = live_summary(mid, match.state, n_commentary=0)
+    team = lambda t: escape(d["team_names"].get(t, t))
+    sc = d["score"][d["bat_team"]]
+    line = f"{team(d['bat_team'])} {sc['runs']}/{sc['wkts']} ({sc['overs']}{'/' + str(d['overs_limit']) if d['overs_limit'] else ''})"
+    if d["result"]:
+        sub = escape(d["result"])
+    elif d["required"]:
+        r = d["required"]
+        sub = f"Need {r['runs']}" + (f" from {r['balls']} balls" if r["balls"] is not None else "")
+    else:
+        sub = f"RR {d['run_rate']:.2f}"
+    bats = " · ".join(f"{escape(b['name'])}{'*' if i == 0 else ''} {b['R']} ({b['B']})"
+                      for i, b in enumerate([d["striker"], d["non_striker"]]) if b)
+    bowl = d["bowler"]
+    bowl = f"{escape(bowl['name'])} {bowl['W']}-{bowl['R']} ({bowl['overs']})" if bowl else ""
+    return (f"<div style='font-family:sans-serif;background:#0b6efd;color:#fff;border-radius:10px;padding:12px 16px'>"
+            f"<div style='font-size:34px;font-weight:900'>{line}</div><div style='font-size:15px'>{sub}</div>"
+            f"<div style='font-size:15px;margin-top:6px'>{bats}</div><div style='font-size:15px'>{bowl}</div>"
+            f"<div style='font-size:18px;letter-spacing:4px;margin-top:6px'>{' '.join(escape(x) for x in d['last_balls'])}</div></div>")
+
+def page_embed(params):
+    st.markdown(EMBED_CSS, unsafe_allow_html=True)
+    matches = engine.list_matches()
+    mid = (params.get("mid") or [""])[0]
+    if mid not in matches:
+        live = [k for k, v in matches.items() if not (v.get("completed_at") or v.get("final_summary_brief"))]
+        # ids are <date>-<random hex>: the newest is the latest created_at, not the largest id
+        mid = max(live or matches or [""], key=lambda k: (matches.get(k, {}).get("created_at") or "", k))
+    if not mid:
+        st.info("No matches"); return None
+    match = engine.load_shared(mid)
+    if match is None:
+        st.info("Match state missing"); return None
+    st.markdown(embed_html(mid, match.version), unsafe_allow_html=True)
+    get_metrics().incr("embed_runs")
+    return (mid, match.version) if match.is_live else None
+
+_params = st.experimental_get_query_params()
+if (_params.get("embed") or ["0"])[0] not in ("", "0", "false"):
+    with timed("page.embed"):
+        _live = page_embed(_params)
+    get_metrics().observe("script.run", time.perf_counter() - _run_started)
+    if _live:
+        wait_for_next_ball(*_live, st.empty())
+    st.stop()
 
 # Banner CSS + header with embedded logo
 BANNER_CSS = """
@@ -622,21 +341,22 @@ BANNER_CSS = """
 .cricket-badge{background:rgba(255,255,255,.12);padding:8px 12px;border-radius:999px;font-weight:700;}
 </style>
 """
-st.markdown(BANNER_CSS, unsafe_allow_html=True)
 
-logo_html = ""
-if os.path.exists(LOGO_PATH):
-    try:
-        import base64
-        logo_bytes = open(LOGO_PATH, "rb").read()
-        logo_b64 = base64.b64encode(logo_bytes).decode()
-        logo_html = f"<img src='data:image/png;base64,{logo_b64}' style='width:64px;height:64px;border-radius:8px;object-fit:cover;'/>"
-    except Exception:
-        logo_html = "<div style='width:64px;height:64px;border-radius:8px;background:rgba(255,255,255,.14);display:flex;align-items:center;justify-content:center;'>MPGB</div>"
-else:
-    logo_html = "<div style='width:64px;height:64px;border-radius:8px;background:linear-gradient(90deg,#0b6efd,#055ecb);display:flex;align-items:center;justify-content:center;color:#fff;font-weight:800;'>MPGB</div>"
-
-st.markdown(f"""
+@st.cache_data
+def banner_html(logo_path, logo_mtime):
+    # built once per logo version instead of base64-encoding the logo on every rerun
+    logo_html = ""
+    if logo_mtime is not None:
+        try:
+            import base64
+            logo_bytes = open(logo_path, "rb").read()
+            logo_b64 = base64.b64encode(logo_bytes).decode()
+            logo_html = f"<img src='data:image/png;base64,{logo_b64}' style='width:64px;height:64px;border-radius:8px;object-fit:cover;'/>"
+        except Exception:
+            logo_html = "<div style='width:64px;height:64px;border-radius:8px;background:rgba(255,255,255,.14);display:flex;align-items:center;justify-content:center;'>MPGB</div>"
+    else:
+        logo_html = "<div style='width:64px;height:64px;border-radius:8px;background:linear-gradient(90deg,#0b6efd,#055ecb);display:flex;align-items:center;justify-content:center;color:#fff;font-weight:800;'>MPGB</div>"
+    return BANNER_CSS + f"""
 <div class="app-banner">
   <div style='display:flex;align-items:center;gap:12px;'>
     {logo_html}
@@ -647,9 +367,10 @@ st.markdown(f"""
   </div>
   <div><div class="cricket-badge">🏏 Cricket • Score • Share</div></div>
 </div>
-""", unsafe_allow_html=True)
+<br/>
+"""
 
-st.markdown("<br/>", unsafe_allow_html=True)
+st.markdown(banner_html(LOGO_PATH, os.path.getmtime(LOGO_PATH) if os.path.exists(LOGO_PATH) else None), unsafe_allow_html=True)
 
 # Button styling
 st.markdown("""
@@ -668,18 +389,57 @@ div.stButton > button:first-child {
 """, unsafe_allow_html=True)
 
 # Sidebar member card
+@st.cache_data
+def members_by_id(members_mtime):
+    # plain csv lookup keyed by file mtime: the sidebar never needs pandas
+    out = {}
+    try:
+        with open(MEMBERS_CSV, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                row = {k: (v or "") for k, v in row.items()}
+                row["Mobile"] = normalize_mobile(row.get("Mobile", ""))
+                row.setdefault("Paid", "N")
+                if row.get("MemberID"):
+                    out[row["MemberID"]] = row
+    except Exception:
+        pass
+    return out
+
 def current_member():
     mid = st.session_state.get("MemberID", "")
     if not mid:
         return None
-    df = read_members()
-    row = df[df["MemberID"] == mid]
-    if row.empty:
+    ensure_members_file()
+    row = members_by_id(os.path.getmtime(MEMBERS_CSV)).get(mid)
+    if not row:
         return None
-    return row.iloc[0].to_dict()
+    return dict(row)
+
+@st.cache_data
+def id_card_png(member_id, name, mobile):
+    from PIL import Image, ImageDraw, ImageFont
+    w, h = 600, 360
+    img = Image.new("RGB", (w, h), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    try:
+        f_b = ImageFont.truetype("DejaVuSans-Bold.ttf", 26)
+        f_m = ImageFont.truetype("DejaVuSans.ttf", 16)
+    except:
+        f_b = ImageFont.load_default()
+        f_m = ImageFont.load_default()
+    draw.rectangle([20, 20, 100, 100], fill=(11, 110, 253))
+    draw.text((28, 42), "MPGB", fill=(255, 255, 255), font=f_b)
+    draw.text((130, 30), name or "-", fill=(0, 0, 0), font=f_b)
+    draw.text((130, 70), f"ID: {member_id or '-'}", fill=(0, 0, 0), font=f_m)
+    draw.text((130, 100), f"Mobile: {mobile or '-'}", fill=(0, 0, 0), font=f_m)
+    draw.text((20, 130), "MPGB Cricket Club - Sagar", fill=(0, 0, 0), font=f_m)
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
 
 st.sidebar.title("Member")
 mem = current_member()
+id_card_slot = None
 if mem:
     st.sidebar.markdown("### Member Card")
     st.sidebar.markdown(f"**ID:** {mem.get('MemberID')}")
@@ -698,36 +458,8 @@ if mem:
         except:
             pass
 
-    # id card
-    def generate_id_card_image(member):
-        w, h = 600, 360
-        img = Image.new("RGB", (w, h), color=(255, 255, 255))
-        draw = ImageDraw.Draw(img)
-        try:
-            f_b = ImageFont.truetype("DejaVuSans-Bold.ttf", 26)
-            f_m = ImageFont.truetype("DejaVuSans.ttf", 16)
-        except:
-            f_b = ImageFont.load_default()
-            f_m = ImageFont.load_default()
-        draw.rectangle([20, 20, 100, 100], fill=(11, 110, 253))
-        draw.text((28, 42), "MPGB", fill=(255, 255, 255), font=f_b)
-        nm = member.get("Name", "-")
-        mob = member.get("Mobile", "-")
-        midv = member.get("MemberID", "-")
-        draw.text((130, 30), nm, fill=(0, 0, 0), font=f_b)
-        draw.text((130, 70), f"ID: {midv}", fill=(0, 0, 0), font=f_m)
-        draw.text((130, 100), f"Mobile: {mob}", fill=(0, 0, 0), font=f_m)
-        draw.text((20, 130), "MPGB Cricket Club - Sagar", fill=(0, 0, 0), font=f_m)
-        out = io.BytesIO()
-        img.save(out, format="PNG")
-        out.seek(0)
-        return out
-
-    try:
-        id_bytes = generate_id_card_image(mem)
-        st.sidebar.download_button("Download ID Card (PNG)", data=id_bytes.getvalue(), file_name=f"{mem.get('MemberID')}_ID.png", mime="image/png")
-    except Exception:
-        pass
+    # id card: filled in after the page has rendered
+    id_card_slot = st.sidebar.empty()
 
     if st.sidebar.button("Logout"):
         st.session_state.pop("MemberID", None)
@@ -736,15 +468,32 @@ else:
     st.sidebar.info("Guest — go to Menu -> Login / Register")
 
 # Sidebar menu
-menu = st.sidebar.selectbox("Menu", ["Home", "Login / Register", "Match Setup", "Live Scorer", "Live Score (Public)", "Player Stats", "Admin"])
+menu = st.sidebar.selectbox("Menu", ["Home", "Login / Register", "Match Setup", "Tournaments", "Live Scorer", "Live Score (Public)", "Player Stats", "Admin"])
+
+# ---------------- Shared page widgets ----------------
+def render_timeline(mid, state):
+    # worm + Manhattan from the engine's per-over aggregates; PNGs cached per state version
+    if not state.get("balls_log"):
+        st.info("Charts appear after the first over starts.")
+        return
+    try:
+        from mpgb.charts import chart_png
+        c1, c2 = st.columns(2)
+        with c1:
+            st.image(chart_png(mid, state, "worm"), use_column_width=True)
+        with c2:
+            st.image(chart_png(mid, state, "manhattan"), use_column_width=True)
+    except ImportError:
+        st.info("Charts need matplotlib (pip install matplotlib).")
 
 # ---------------- Pages ----------------
-if menu == "Home":
+def page_home():
     st.header("Welcome to MPGB Cricket Club - Sagar")
     st.write("Use Menu to create matches and score. Login/Register to access member features.")
 
 # ---------------- Login / Register ----------------
-if menu == "Login / Register":
+def page_login_register():
+    from PIL import Image
     st.header("Login / Register")
     login_mobile = st.text_input("Enter mobile (10 digits)", key="ui_login_mobile")
     col1, col2 = st.columns(2)
@@ -754,9 +503,8 @@ if menu == "Login / Register":
             if not mnorm:
                 st.error("Please enter valid mobile.")
             else:
-                mems = read_members()
-                if mnorm in mems["Mobile"].tolist():
-                    row = mems[mems["Mobile"] == mnorm].iloc[0]
+                row = get_registry().by_mobile(mnorm)
+                if row:
                     st.session_state["MemberID"] = row["MemberID"]
                     try:
                         paid_flag = is_mobile_paid(mnorm)
@@ -785,14 +533,13 @@ if menu == "Login / Register":
             if not rname.strip() or not rmobile.strip():
                 st.error("Name and mobile required")
             else:
-                mems = read_members()
                 mnorm = normalize_mobile(rmobile)
-                if mnorm in mems["Mobile"].tolist():
+                # ID allocation, duplicate check and the one-line append happen under one lock
+                row, created = get_registry().register(rname.strip(), mnorm)
+                if not created:
                     st.info("Mobile already registered.")
                 else:
-                    nid = next_member_id()
-                    new = pd.DataFrame([{"MemberID": nid, "Name": rname.strip(), "Mobile": mnorm, "Paid": "N"}])
-                    write_members(pd.concat([mems, new], ignore_index=True))
+                    nid = row["MemberID"]
                     if rphoto:
                         try:
                             image = Image.open(rphoto).convert("RGB")
@@ -807,29 +554,87 @@ if menu == "Login / Register":
                     st.session_state["MemberID"] = nid
                     st.experimental_rerun()
 
+def render_partnerships(state):
+    import pandas as pd
+    # maintained on the scoring path (mpgb/partnerships.py): no balls_log replay here
+    cur = current_partnership(state)
+    if cur:
+        st.caption(f"Current partnership: {cur['runs']} ({cur['balls']} balls)")
+    for inn in (1, 2):
+        rows = partnership_rows(state, inn)
+        if not rows:
+            continue
+        st.markdown(f"### Partnerships — innings {inn}")
+        st.table(pd.DataFrame(rows).drop(columns=["Inn"]))
+        fow = fow_text(state, inn)
+        if fow:
+            st.markdown(f"**Fall of wickets:** {fow}")
+
+def render_point_in_time(mid, state, n):
+    # the match as it stood after ball n, replayed from the nearest checkpoint
+    at = get_timelines().get(mid, state).state_at(n)
+    bat = at.get("bat_team", "Team A")
+    for team in ("Team A", "Team B"):
+        s = at.get("score", {}).get(team, {})
+        mark = " (batting)" if team == bat and at.get("status") != "COMPLETED" else ""
+        st.write(f"**{team}:** {s.get('runs', 0)}/{s.get('wkts', 0)} ({format_over_ball(s.get('balls', 0))}){mark}")
+    br = at.get("batting", {})
+    st.caption(f"Striker: {name_of(at, br.get('striker', -1)) or '-'} • Non-striker: {name_of(at, br.get('non_striker', -1)) or '-'} • "
+               f"Bowler: {name_of(at, at.get('bowling', {}).get('current_bowler', -1)) or '-'}")
+    over = current_over(at)
+    if over:
+        st.caption(f"This over: {' '.join(over['symbols'])}")
+    for txt in recent_commentary(at, 3):
+        st.markdown(f"- {txt}")
+    return at
+
 # ---------------- Match Setup ----------------
-if menu == "Match Setup":
+@st.cache_resource(max_entries=2)
+def member_index(registry_stamp, paid_mtime):
+    # rebuilt only when members.csv or the paid list changes; shared by all sessions
+    from mpgb.members import MemberIndex
+    paid_df = read_paid_list()
+    paid = set(paid_df["Mobile_No"].tolist()) if not paid_df.empty else set()
+    rows = [r for r in get_registry().members() if r["Paid"] == "Y" or r["Mobile"] in paid]
+    known = {r["Mobile"] for r in rows}
+    rows += [{"MemberID": "", "Name": "", "Mobile": m, "Paid": "Y"} for m in sorted(paid - known)]
+    return MemberIndex(rows)
+
+def paid_member_index():
+    paid_mtime = os.path.getmtime(PAID_CSV) if os.path.exists(PAID_CSV) else None
+    return member_index(get_registry().stamp(), paid_mtime)
+
+def member_picker(label, key, index):
+    # type-ahead: the multiselect only ever holds the current picks plus the top matches
+    query = st.text_input(f"Search {label} (name, mobile or member ID)", key=f"{key}_q")
+    picked = list(st.session_state.get(key, []))
+    options = list(dict.fromkeys(picked + [e["Mobile"] for e in index.search(query, MEMBER_PICKER_TOP_K)]))
+    return st.multiselect(label, options=options, format_func=index.label, key=key)
+
+def page_match_setup():
     cm = current_member()
     role = "guest"
     if cm:
         role = "admin" if normalize_mobile(cm.get("Mobile", "")) == normalize_mobile(ADMIN_PHONE) else ("member" if is_mobile_paid(cm.get("Mobile", "")) else "guest")
     if role not in ["member", "admin"]:
         st.warning("Match creation is for paid members only.")
-        st.stop()
+        return
 
     st.subheader("Create / Manage Matches")
-    matches = load_matches_index()
+    matches = engine.list_matches()
+    # pickers live outside the form so searching updates the matches as you type
+    index = paid_member_index()
+    st.markdown("Select players (paid members); add anyone else manually below")
+    pcol1, pcol2 = st.columns(2)
+    with pcol1:
+        tA_sel = member_picker("Team A", "tA_sel", index)
+    with pcol2:
+        tB_sel = member_picker("Team B", "tB_sel", index)
     with st.form("create_match", clear_on_submit=True):
         title = st.text_input("Match Title (e.g. Team A vs Team B)")
         venue = st.text_input("Venue (optional)")
         overs = st.number_input("Overs per innings", min_value=1, max_value=50, value=2)
-        st.markdown("Select players for Team A (mobile numbers or names)")
-        paid_df = read_paid_list()
-        member_choices = paid_df["Mobile_No"].tolist() if not paid_df.empty else []
-        tA_sel = st.multiselect("Team A (mobiles)", options=member_choices, default=[])
         tA_manual = st.text_area("Team A manual (one per line)")
-        st.markdown("Select players for Team B")
-        tB_sel = st.multiselect("Team B (mobiles)", options=member_choices, default=[])
         tB_manual = st.text_area("Team B manual (one per line)")
         create_btn = st.form_submit_button("Create Match")
     if create_btn:
@@ -851,11 +656,9 @@ if menu == "Match Setup":
         elif not title or not tA or not tB:
             st.error("Provide title and players for both teams.")
         else:
-            mid = datetime.now().strftime("%Y%m%d") + "-" + uuid.uuid4().hex[:6].upper()
-            matches[mid] = {"title": title, "venue": venue, "overs": int(overs), "teamA": tA, "teamB": tB, "created_at": datetime.now().isoformat()}
-            save_matches_index(matches)
-            init_match_state_full(mid, title, overs, tA, tB, venue=venue)
-            st.success(f"Match created: {title} ({mid})")
+            new_match = engine.create_match(title, overs, tA, tB, venue=venue)
+            matches = engine.list_matches()
+            st.success(f"Match created: {title} ({new_match.mid})")
 
     st.markdown("### Existing matches")
     if matches:
@@ -863,481 +666,572 @@ if menu == "Match Setup":
             st.write(f"- **{info.get('title')}** ({k}) — Overs: {info.get('overs')} — Created: {info.get('created_at')}")
             if role == "admin":
                 if st.button(f"Delete {k}", key=f"del_{k}"):
-                    matches.pop(k, None); save_matches_index(matches)
-                    try:
-                        os.remove(match_state_path(k))
-                    except:
-                        pass
+                    engine.delete_match(k)
                     st.success("Deleted")
 
+# ---------------- Tournaments ----------------
+def page_tournaments():
+    book = get_tournaments()
+    cm = current_member()
+    is_admin = bool(cm) and normalize_mobile(cm.get("Mobile", "")) == normalize_mobile(ADMIN_PHONE)
+    can_manage = is_admin or (bool(cm) and is_mobile_paid(cm.get("Mobile", "")))
+    st.subheader("Tournaments")
+    tours = book.tournaments()
+    if tours:
+        tid = st.selectbox("Tournament", sorted(tours, key=lambda k: tours[k]["created_at"], reverse=True),
+                           format_func=lambda k: f"{tours[k]['name']} ({tours[k]['format'].replace('_', ' ')})", key="tour_sel")
+        t = book.get(tid)
+        if t["format"] == "round_robin":
+            st.markdown("### Points table")
+            st.dataframe([{k: r[k] for k in ["Pos", "Team", "P", "W", "L", "T", "Pts", "NRR"]} for r in book.standings(tid)])
+        st.markdown("### Fixtures")
+        for f in t["fixtures"]:
+            line = f"R{f['round']} {f['fid']}: **{book.team_name(f['a'])}** vs **{book.team_name(f['b'])}** — {f['status']}"
+            if f["result"] and f["result"] != "bye":
+                line += f" — {f['result']}"
+            st.write(line)
+            if not can_manage:
+                continue
+            if f["status"] == "scheduled" and f["a"] and f["b"]:
+                if st.button(f"Create match for {f['fid']}", key=f"tour_start_{tid}_{f['fid']}"):
+                    m = book.start_fixture(engine, tid, f["fid"])
+                    st.success(f"Match created: {m.title} ({m.mid}) — open Live Scorer to score it.")
+            if t["format"] == "knockout" and f["status"] == "completed" and f["winner"] is None and is_admin:
+                w = st.selectbox(f"Tied — winner of {f['fid']}", [f["a"], f["b"]], format_func=book.team_name, key=f"tour_win_{tid}_{f['fid']}")
+                if st.button(f"Set winner for {f['fid']}", key=f"tour_setwin_{tid}_{f['fid']}"):
+                    book.set_winner(tid, f["fid"], w)
+                    st.experimental_rerun()
+        if is_admin and st.button("Delete tournament", key=f"tour_del_{tid}"):
+            book.delete(tid)
+            st.experimental_rerun()
+    else:
+        st.info("No tournaments yet.")
+
+    if not can_manage:
+        return
+    st.markdown("### Teams")
+    teams = book.teams()
+    with st.form("tour_team", clear_on_submit=True):
+        edit = st.selectbox("Team", [""] + sorted(teams, key=lambda k: teams[k]["name"]),
+                            format_func=lambda k: teams[k]["name"] if k else "New team")
+        tname = st.text_input("Team name (blank keeps the current name)")
+        tplayers = st.text_area("Players, one per line (mobiles or names; blank keeps the current list)")
+        if st.form_submit_button("Save team"):
+            players = [normalize_mobile(x) if any(ch.isdigit() for ch in x) else x.strip() for x in tplayers.splitlines() if x.strip()]
+            old = teams.get(edit, {})
+            name = tname.strip() or old.get("name", "")
+            if not name or not (players or old.get("players")):
+                st.error("A team needs a name and players.")
+            else:
+                book.save_team(name, players or old["players"], team_id=edit or None)
+                st.success(f"Saved {name}")
+    if teams:
+        st.caption(" • ".join(f"{v['name']} ({len(v['players'])})" for v in sorted(teams.values(), key=lambda v: v["name"])))
+
+    st.markdown("### New tournament")
+    with st.form("tour_new", clear_on_submit=True):
+        name = st.text_input("Tournament name")
+        sel = st.multiselect("Teams (in seed order for knockouts)", list(teams), format_func=lambda k: teams[k]["name"])
+        fmt = st.radio("Format", ["round_robin", "knockout"], format_func=lambda x: x.replace("_", " ").title(), horizontal=True)
+        overs = st.number_input("Overs per innings", min_value=1, max_value=50, value=10)
+        legs = st.number_input("Round robin legs", min_value=1, max_value=2, value=1)
+        if st.form_submit_button("Create tournament"):
+            try:
+                book.create(name.strip() or "Tournament", sel, fmt, overs=overs, legs=legs)
+                st.success("Tournament created with fixtures")
+            except ValueError as e:
+                st.error(str(e))
+
+def scorer_command(rev, action):
+    # Command ID for a scoring button: session + the revision the screen was drawn at (state
+    # version, or the batch scorer's local revision) + the action, so a double tap or a replayed
+    # click on one screen repeats the same ID and the engine drops the repeat (buttons are
+    # keyed by revision for the same reason)
+    sess = st.session_state.setdefault("scorer_session", os.urandom(6).hex())
+    return f"{sess}:{rev}:{action}"
+
+def offline_scorer(mid):
+    # batch mode: this session scores a local copy (mpgb/offline.py) flushed to the engine in batches
+    from mpgb.offline import OfflineScorer
+    key = f"offline_scorer_{mid}"
+    if key not in st.session_state:
+        st.session_state[key] = OfflineScorer(engine, mid, flush_every=BATCH_FLUSH_BALLS)
+    return st.session_state[key]
+
+def close_offline_scorers():
+    # leaving batch mode: send whatever is still queued
+    for key in [k for k in st.session_state if str(k).startswith("offline_scorer_")]:
+        scorer = st.session_state.pop(key)
+        if not scorer.close(timeout=10):
+            st.error(f"Could not save queued balls: {scorer.last_error}")
+
 # ---------- REPLACE START: Scorebox-like Live Scorer UI (inserted by ChatGPT) ----------
-# Custom scorebox-like Streamlit UI block (visuals inspired by scorebox.in)
-# NOTE: This block expects existing helper functions in the file such as:
-# - format_over_ball(balls)
-# - record_ball_full(state, mid, outcome, extras=None, wicket_info=None)
-# - save_match_state(mid, state)
-# and variables: mid, state, sc, opp_sc, bat, other
-# If they are named differently in your file, adapt accordingly.
+def page_live_scorer():
+    import pandas as pd
+    # Custom scorebox-like Streamlit UI block (visuals inspired by scorebox.in)
+    # NOTE: All scoring goes through the shared `engine` (mpgb.ScoringEngine) on the
+    # `match` object below; every engine call persists the match itself.
+    # Variables used by the UI: mid, match, state, sc, opp_sc, bat, other
+
+    # Ensure required local variables exist for this UI block.
+    # This makes the block robust if called from different parts of the app.
+    try:
+        # if 'state' and 'mid' are already defined in outer scope (typical), use them
+        _mid = locals().get('mid', globals().get('mid', None))
+        _state = locals().get('state', globals().get('state', None))
 
-import streamlit as st
-# Ensure required local variables exist for this UI block.
-# This makes the block robust if called from different parts of the app.
-try:
-    # if 'state' and 'mid' are already defined in outer scope (typical), use them
-    _mid = locals().get('mid', globals().get('mid', None))
-    _state = locals().get('state', globals().get('state', None))
-
-    # fallback: if we have a matches index and only one active match, try to pick it
-    if not _state:
+        # fallback: if we have a matches index and only one active match, try to pick it
+        if not _state:
+            try:
+                matches_tmp = engine.list_matches()
+                if matches_tmp:
+                    # pick the most recent match key if mid not present
+                    if not _mid:
+                        _mid = sorted(matches_tmp.keys(), reverse=True)[0]
+                    _loaded = offline_scorer(_mid).match if st.session_state.get("scorer_batch") else engine.load_match(_mid)
+                    _state = _loaded.state if _loaded else None
+            except Exception:
+                _state = None
+
+        # final fallback: empty state
+        if not _state:
+            _state = {
+                "bat_team": "Team A",
+                "overs_limit": 0,
+                "title": "Match",
+                "roster": [],
+                "teams": {"Team A": [], "Team B": []},
+                "score": {"Team A": {"runs": 0, "wkts": 0, "balls": 0}, "Team B": {"runs": 0, "wkts": 0, "balls": 0}},
+                "batting": {"striker": -1, "non_striker": -1, "next_index": 0},
+                "bowling": {"current_bowler": -1, "last_over_bowler": -1, "over_needs_change": False},
+                "balls_log": [],
+                "commentary": []
+            }
+
+        # Expose names expected by the UI
+        mid = _mid or "UNKNOWN_MATCH"
+        state = _state
+        match = Match(mid, state)
+
+        # batting team & scores
+        bat = state.get("bat_team", "Team A")
+        sc = state.get("score", {}).get(bat, {"runs": 0, "wkts": 0, "balls": 0})
+        other = "Team A" if bat == "Team B" else "Team B"
+        opp_sc = state.get("score", {}).get(other, {"runs": 0, "wkts": 0, "balls": 0})
+
+        # other helpful defaults used later in the block
         try:
-            matches_tmp = load_matches_index()
-            if matches_tmp:
-                # pick the most recent match key if mid not present
-                if not _mid:
-                    _mid = sorted(matches_tmp.keys(), reverse=True)[0]
-                _state = load_match_state(_mid)
+            other_team_players = state.get("teams", {}).get(other, []) or []
         except Exception:
-            _state = None
-
-    # final fallback: empty state
-    if not _state:
-        _state = {
-            "bat_team": "Team A",
-            "overs_limit": 0,
-            "title": "Match",
-            "teams": {"Team A": [], "Team B": []},
-            "score": {"Team A": {"runs": 0, "wkts": 0, "balls": 0}, "Team B": {"runs": 0, "wkts": 0, "balls": 0}},
-            "batting": {"striker": "", "non_striker": "", "order": [], "next_index": 0},
-            "bowling": {"current_bowler": "", "last_over_bowler": "", "over_needs_change": False},
-            "balls_log": [],
-            "commentary": []
-        }
-
-    # Expose names expected by the UI
-    mid = _mid or "UNKNOWN_MATCH"
-    state = _state
-
-    # batting team & scores
-    bat = state.get("bat_team", "Team A")
-    sc = state.get("score", {}).get(bat, {"runs": 0, "wkts": 0, "balls": 0})
-    other = "Team A" if bat == "Team B" else "Team B"
-    opp_sc = state.get("score", {}).get(other, {"runs": 0, "wkts": 0, "balls": 0})
+            other_team_players = []
 
-    # other helpful defaults used later in the block
-    try:
-        other_team_players = state.get("teams", {}).get(other, []) or []
     except Exception:
+        # absolute fallback so UI doesn't crash on undefined names
+        mid = "UNKNOWN_MATCH"
+        state = {}
+        match = Match(mid, state)
+        bat = "Team A"
+        sc = {"runs": 0, "wkts": 0, "balls": 0}
+        other = "Team B"
+        opp_sc = {"runs": 0, "wkts": 0, "balls": 0}
         other_team_players = []
 
-except Exception:
-    # absolute fallback so UI doesn't crash on undefined names
-    mid = "UNKNOWN_MATCH"
-    state = {}
-    bat = "Team A"
-    sc = {"runs": 0, "wkts": 0, "balls": 0}
-    other = "Team B"
-    opp_sc = {"runs": 0, "wkts": 0, "balls": 0}
-    other_team_players = []
+    st.markdown("""
+    <style>
+    /* Container */
+    .scorebox-root { display:flex; justify-content:center; padding:12px 0; }
+    /* Card */
+    .scorebox-card { width:380px; background: linear-gradient(180deg,#ffffff,#f2f6fa); border-radius:12px; box-shadow:0 10px 30px rgba(10,20,40,0.06); overflow:hidden; }
+    /* Header */
+    .scorebox-header { padding:10px 16px; display:flex; justify-content:space-between; align-items:center; border-bottom:1px solid rgba(0,0,0,0.06); }
+    .scorebox-title { font-weight:800; letter-spacing:1px; font-size:18px; color:#1b8a4a; }
+    /* Score area */
+    .score-area { padding:18px 16px; background:linear-gradient(180deg,#ffffff,#f7fbff); }
+    .score-row { display:flex; justify-content:space-between; align-items:center; }
+    .score-big { font-size:56px; font-weight:900; color:#0b1730; }
+    .score-small { font-size:14px; color:#4b5563; }
+    /* Buttons grid */
+    .btn-grid { padding:18px 28px 6px 28px; display:grid; grid-template-columns: repeat(3,1fr); gap:18px; background:#eef4f8; }
+    .big-circle { height:72px; width:72px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:700; font-size:20px; box-shadow:0 6px 18px rgba(8,60,120,0.06); cursor:pointer; border:0; }
+    .bg-run { background:#ffffff; color:#111; }
+    .bg-4 { background:#0b8b7a; color:#fff; }
+    .bg-6 { background:#d97b10; color:#fff; }
+    .bg-wd { background:#8a4b20; color:#fff; }
+    .bg-nb { background:#6f4b3d; color:#fff; }
+    .bg-wk { background:#d9534f; color:#fff; }
+    /* Info */
+    .info { padding:10px 20px 22px 20px; font-size:13px; color:#6b7280; }
+    /* Footer nav */
+    .footer-nav { display:flex; justify-content:space-around; align-items:center; padding:10px 0; border-top:1px solid rgba(0,0,0,0.04); background:#fff; }
+    .nav-item { font-size:13px; color:#111827; text-align:center; }
+    .nav-active { background:#8f26ff; color:#fff; padding:6px 12px; border-radius:8px; box-shadow:0 6px 18px rgba(143,38,255,0.14); }
+    </style>
+    """, unsafe_allow_html=True)
 
-st.markdown("""
-<style>
-/* Container */
-.scorebox-root { display:flex; justify-content:center; padding:12px 0; }
-/* Card */
-.scorebox-card { width:380px; background: linear-gradient(180deg,#ffffff,#f2f6fa); border-radius:12px; box-shadow:0 10px 30px rgba(10,20,40,0.06); overflow:hidden; }
-/* Header */
-.scorebox-header { padding:10px 16px; display:flex; justify-content:space-between; align-items:center; border-bottom:1px solid rgba(0,0,0,0.06); }
-.scorebox-title { font-weight:800; letter-spacing:1px; font-size:18px; color:#1b8a4a; }
-/* Score area */
-.score-area { padding:18px 16px; background:linear-gradient(180deg,#ffffff,#f7fbff); }
-.score-row { display:flex; justify-content:space-between; align-items:center; }
-.score-big { font-size:56px; font-weight:900; color:#0b1730; }
-.score-small { font-size:14px; color:#4b5563; }
-/* Buttons grid */
-.btn-grid { padding:18px 28px 6px 28px; display:grid; grid-template-columns: repeat(3,1fr); gap:18px; background:#eef4f8; }
-.big-circle { height:72px; width:72px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-weight:700; font-size:20px; box-shadow:0 6px 18px rgba(8,60,120,0.06); cursor:pointer; border:0; }
-.bg-run { background:#ffffff; color:#111; }
-.bg-4 { background:#0b8b7a; color:#fff; }
-.bg-6 { background:#d97b10; color:#fff; }
-.bg-wd { background:#8a4b20; color:#fff; }
-.bg-nb { background:#6f4b3d; color:#fff; }
-.bg-wk { background:#d9534f; color:#fff; }
-/* Info */
-.info { padding:10px 20px 22px 20px; font-size:13px; color:#6b7280; }
-/* Footer nav */
-.footer-nav { display:flex; justify-content:space-around; align-items:center; padding:10px 0; border-top:1px solid rgba(0,0,0,0.04); background:#fff; }
-.nav-item { font-size:13px; color:#111827; text-align:center; }
-.nav-active { background:#8f26ff; color:#fff; padding:6px 12px; border-radius:8px; box-shadow:0 6px 18px rgba(143,38,255,0.14); }
-</style>
-""", unsafe_allow_html=True)
+    # root container (centered)
+    st.markdown('<div class="scorebox-root">', unsafe_allow_html=True)
+    st.markdown('<div class="scorebox-card">', unsafe_allow_html=True)
+
+    # Header (title & close)
+    st.markdown('<div class="scorebox-header">', unsafe_allow_html=True)
+    st.markdown(f'<div class="scorebox-title">SCOREBOX</div>', unsafe_allow_html=True)
+    st.markdown('<div style="font-weight:700;color:#c53030;cursor:pointer;padding:2px 8px;border-radius:6px;background:#fff">✖</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Batch mode (poor signal): balls apply locally at once and are saved every few deliveries
+    batch_mode = st.checkbox("Batch saves (poor signal)", key="scorer_batch",
+                             help=f"Balls show instantly and are saved every {BATCH_FLUSH_BALLS} balls or at the end of an over.")
+    scoring = engine
+    if batch_mode and mid != "UNKNOWN_MATCH":
+        scoring = offline_scorer(mid)
+        if state is not scoring.state:
+            st.experimental_rerun()  # toggled on during this run: redraw from the local copy
+    elif not batch_mode:
+        close_offline_scorers()
+
+    # Save indicator (background writer)
+    _save = engine.save_status(mid)
+    if scoring is not engine and scoring.last_error:
+        st.markdown(f'<div style="font-size:12px;color:#c53030">⚠️ Not saved yet: {html.escape(scoring.last_error)}</div>', unsafe_allow_html=True)
+    if scoring is not engine and scoring.pending():
+        st.markdown(f'<div style="font-size:12px;color:#b7791f">⏳ {scoring.pending()} ball(s) waiting to be saved</div>', unsafe_allow_html=True)
+        if st.button("Save now", key=f"offline_flush_{mid}"):
+            scoring.flush()
+            st.experimental_rerun()
+    elif _save.get("state") == "pending":
+        st.markdown('<div style="font-size:12px;color:#b7791f">⏳ Saving…</div>', unsafe_allow_html=True)
+    elif _save.get("state") == "error":
+        st.markdown(f'<div style="font-size:12px;color:#c53030">⚠️ Save failed: {html.escape(_save.get("error", ""))}{" — retrying" if _save.get("retrying") else ""}</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div style="font-size:12px;color:#0b8a4a">✔ Saved</div>', unsafe_allow_html=True)
+
+    # Score display area
+    st.markdown('<div class="score-area">', unsafe_allow_html=True)
+    runs = sc.get('runs', 0) if isinstance(sc, dict) else 0
+    wkts = sc.get('wkts', 0) if isinstance(sc, dict) else 0
+    balls = sc.get('balls', 0) if isinstance(sc, dict) else 0
+    overs_display = format_over_ball(balls) if 'format_over_ball' in globals() else f"{balls//6}.{balls%6}"
+    opp_runs = opp_sc.get('runs', 0) if isinstance(opp_sc, dict) else 0
+    st.markdown(f'<div style="display:flex;flex-direction:column;gap:8px">', unsafe_allow_html=True)
+    st.markdown(f'<div class="score-row"><div><span class="score-big">{runs}</span><span style="font-size:28px;margin-left:10px">/{wkts}</span></div><div style="text-align:right"><div class="score-small">{overs_display} ({state.get("overs_limit","-")})</div><div style="font-size:13px;margin-top:6px;color:#0b8a4a">{state.get("title","Match")}</div></div></div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # If innings 2 - show target/required line
+    if state.get('status') == 'INNINGS2':
+        # compute target and runs left (best-effort)
+        other_team = state.get('other_team_name', None) or ('Team B' if state.get('bat_team')=='Team A' else 'Team A')
+        try:
+            target = int(state.get('target', opp_runs+1))
+        except:
+            target = opp_runs + 1
+        runs_needed = max(0, target - runs)
+        balls_left = max(0, int(state.get('overs_limit',0))*6 - balls) if int(state.get('overs_limit',0))>0 else None
+        req_text = f"{runs_needed} from {balls_left} balls" if balls_left is not None else f"{runs_needed} needed"
+        st.markdown(f'<div style="margin-top:10px;background:#fff7d6;color:#5a4b00;padding:8px 12px;border-radius:8px;font-weight:700">Target {target} • {req_text}</div>', unsafe_allow_html=True)
 
-# root container (centered)
-st.markdown('<div class="scorebox-root">', unsafe_allow_html=True)
-st.markdown('<div class="scorebox-card">', unsafe_allow_html=True)
-
-# Header (title & close)
-st.markdown('<div class="scorebox-header">', unsafe_allow_html=True)
-st.markdown(f'<div class="scorebox-title">SCOREBOX</div>', unsafe_allow_html=True)
-st.markdown('<div style="font-weight:700;color:#c53030;cursor:pointer;padding:2px 8px;border-radius:6px;background:#fff">✖</div>', unsafe_allow_html=True)
-st.markdown('</div>', unsafe_allow_html=True)
-
-# Score display area
-st.markdown('<div class="score-area">', unsafe_allow_html=True)
-runs = sc.get('runs', 0) if isinstance(sc, dict) else 0
-wkts = sc.get('wkts', 0) if isinstance(sc, dict) else 0
-balls = sc.get('balls', 0) if isinstance(sc, dict) else 0
-overs_display = format_over_ball(balls) if 'format_over_ball' in globals() else f"{balls//6}.{balls%6}"
-opp_runs = opp_sc.get('runs', 0) if isinstance(opp_sc, dict) else 0
-st.markdown(f'<div style="display:flex;flex-direction:column;gap:8px">', unsafe_allow_html=True)
-st.markdown(f'<div class="score-row"><div><span class="score-big">{runs}</span><span style="font-size:28px;margin-left:10px">/{wkts}</span></div><div style="text-align:right"><div class="score-small">{overs_display} ({state.get("overs_limit","-")})</div><div style="font-size:13px;margin-top:6px;color:#0b8a4a">{state.get("title","Match")}</div></div></div>', unsafe_allow_html=True)
-st.markdown('</div>', unsafe_allow_html=True)
-
-# If innings 2 - show target/required line
-if state.get('status') == 'INNINGS2':
-    # compute target and runs left (best-effort)
-    other_team = state.get('other_team_name', None) or ('Team B' if state.get('bat_team')=='Team A' else 'Team A')
-    try:
-        target = int(state.get('target', opp_runs+1))
-    except:
-        target = opp_runs + 1
-    runs_needed = max(0, target - runs)
-    balls_left = max(0, int(state.get('overs_limit',0))*6 - balls) if int(state.get('overs_limit',0))>0 else None
-    req_text = f"{runs_needed} from {balls_left} balls" if balls_left is not None else f"{runs_needed} needed"
-    st.markdown(f'<div style="margin-top:10px;background:#fff7d6;color:#5a4b00;padding:8px 12px;border-radius:8px;font-weight:700">Target {target} • {req_text}</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)  # close score-area
 
-st.markdown('</div>', unsafe_allow_html=True)  # close score-area
+    # Buttons grid
+    st.markdown('<div class="btn-grid">', unsafe_allow_html=True)
 
-# Buttons grid
-st.markdown('<div class="btn-grid">', unsafe_allow_html=True)
+    ver = scoring.revision if scoring is not engine else state.get('version', 0)
 
-def safe_record(outcome, extras=None, wicket=None):
-    try:
-        # call existing function if available
-        if 'record_ball_full' in globals():
-            record_ball_full(state, mid, outcome, extras=extras or {}, wicket_info=wicket)
-        elif 'record_ball' in globals():
-            # fallback to older signature
-            record_ball(state, mid, outcome)
-        if 'save_match_state' in globals():
-            save_match_state(mid, state)
-        st.experimental_rerun()
-    except Exception as e:
-        st.error(f"Recording failed: {e}")
-
-# Row 1
-if st.button('1', key=f'sbtn_1_{mid}'): safe_record('1')
-if st.button('2', key=f'sbtn_2_{mid}'): safe_record('2')
-if st.button('Wide', key=f'sbtn_wd_{mid}'): safe_record('WD', extras={'runs':1})
-
-# Row 2
-if st.button('3', key=f'sbtn_3_{mid}'): safe_record('3')
-if st.button('4', key=f'sbtn_4_{mid}', help='Boundary'): safe_record('4')
-if st.button('6', key=f'sbtn_6_{mid}'): safe_record('6')
-
-# Row 3
-if st.button('No Ball', key=f'sbtn_nb_{mid}'): safe_record('NB', extras={'runs':1})
-if st.button('0', key=f'sbtn_0_{mid}'): safe_record('0')
-if st.button('Wicket', key=f'sbtn_wk_{mid}'): safe_record('W', wicket={'type':'out'})
-
-st.markdown('</div>', unsafe_allow_html=True)  # close btn-grid
-
-# Info and commentary preview
-st.markdown('<div class="info">', unsafe_allow_html=True)
-st.markdown('<div style="font-weight:700;margin-bottom:6px">Last Balls</div>', unsafe_allow_html=True)
-last12 = state.get('balls_log', [])[-8:][::-1]
-if not last12:
-    st.markdown('<div style="color:#6b7280">No balls recorded yet.</div>', unsafe_allow_html=True)
-else:
-    lb_html = '<div style="display:flex;flex-direction:column;gap:6px">'
-    for b in last12:
-        outcome = b.get('outcome', b.get('run','-'))
-        striker = b.get('striker','-')
-        bowler = b.get('bowler','-')
-        lb_html += f'<div style="font-family:monospace;font-size:13px;color:#111">{outcome} • {striker} v {bowler}</div>'
-    lb_html += '</div>'
-    st.markdown(lb_html, unsafe_allow_html=True)
-
-st.markdown('<div style="height:10px"></div>', unsafe_allow_html=True)
-st.markdown('<div style="font-weight:700;margin-bottom:6px">Commentary</div>', unsafe_allow_html=True)
-comms = state.get('commentary', [])[-6:][::-1]
-if not comms:
-    st.markdown('<div style="color:#6b7280">No commentary yet.</div>', unsafe_allow_html=True)
-else:
-    for c in comms:
-        st.markdown(f'- {c}', unsafe_allow_html=True)
-
-st.markdown('</div>', unsafe_allow_html=True)  # close info
-
-# Footer nav (visual only)
-st.markdown('<div class="footer-nav">', unsafe_allow_html=True)
-st.markdown('<div class="nav-item nav-active">Match</div>', unsafe_allow_html=True)
-st.markdown('<div class="nav-item">Timeline</div>', unsafe_allow_html=True)
-st.markdown('<div class="nav-item">Scorecard</div>', unsafe_allow_html=True)
-st.markdown('<div class="nav-item">Help</div>', unsafe_allow_html=True)
-st.markdown('</div>', unsafe_allow_html=True)  # footer-nav
-
-st.markdown('</div>', unsafe_allow_html=True)  # scorebox-card
-st.markdown('</div>', unsafe_allow_html=True)  # root
-# ---------- REPLACE END ----------
-
-
-    # End over / next bowler
-cur_balls = state.get('score', {}).get(bat, {}).get('balls', 0)
-if cur_balls > 0 and cur_balls % 6 == 0:
-    if not state.setdefault('bowling', {}).get('over_needs_change', False):
-        state.setdefault('bowling', {})['over_needs_change'] = True
-        save_match_state(mid, state)
-    st.info("Over completed — कृपया नया गेंदबाज़ (Next Bowler) चुनें।")
-    nb_col1, nb_col2 = st.columns([2, 1])
-    with nb_col1:
-        next_bowler = st.selectbox("Select next bowler", options=other_team_players, index=0, key=f"nextbowler_{mid}")
-    with nb_col2:
-        if st.button("Set Next Bowler", key=f"setnext_{mid}"):
-            if not next_bowler or str(next_bowler).strip() == "":
-                st.error("कृपया एक वैध अगले गेंदबाज़ का चयन करें।")
-            else:
-                try:
-                    last = state.get('bowling', {}).get('current_bowler', '')
-                    state.setdefault('bowling', {})['last_over_bowler'] = last
-                    state.setdefault('bowling', {})['current_bowler'] = next_bowler
-                    state.setdefault('bowling', {})['over_needs_change'] = False
-                    save_match_state(mid, state)
+    def safe_record(outcome, extras=None, wicket=None):
+        try:
+            scoring.record_ball(match, outcome, extras=extras or {}, wicket_info=wicket,
+                               command_id=scorer_command(ver, f"ball:{outcome}"))
+            st.experimental_rerun()
+        except Exception as e:
+            st.error(f"Recording failed: {e}")
+
+    # Row 1
+    if st.button('1', key=f'sbtn_1_{mid}_{ver}'): safe_record('1')
+    if st.button('2', key=f'sbtn_2_{mid}_{ver}'): safe_record('2')
+    if st.button('Wide', key=f'sbtn_wd_{mid}_{ver}'): safe_record('WD', extras={'runs':1})
+
+    # Row 2
+    if st.button('3', key=f'sbtn_3_{mid}_{ver}'): safe_record('3')
+    if st.button('4', key=f'sbtn_4_{mid}_{ver}', help='Boundary'): safe_record('4')
+    if st.button('6', key=f'sbtn_6_{mid}_{ver}'): safe_record('6')
+
+    # Row 3
+    if st.button('No Ball', key=f'sbtn_nb_{mid}_{ver}'): safe_record('NB', extras={'runs':1})
+    if st.button('0', key=f'sbtn_0_{mid}_{ver}'): safe_record('0')
+    if st.button('Wicket', key=f'sbtn_wk_{mid}_{ver}'): safe_record('W', wicket={'type':'out'})
+
+    st.markdown('</div>', unsafe_allow_html=True)  # close btn-grid
+
+    # Info and commentary preview
+    st.markdown('<div class="info">', unsafe_allow_html=True)
+    st.markdown('<div style="font-weight:700;margin-bottom:6px">Last Balls</div>', unsafe_allow_html=True)
+    last12 = recent_balls(state, 8)
+    if not last12:
+        st.markdown('<div style="color:#6b7280">No balls recorded yet.</div>', unsafe_allow_html=True)
+    else:
+        lb_html = '<div style="display:flex;flex-direction:column;gap:6px">'
+        for b in last12:
+            outcome = b.get('outcome', b.get('run','-'))
+            striker = b.get('striker','-')
+            bowler = b.get('bowler','-')
+            lb_html += f'<div style="font-family:monospace;font-size:13px;color:#111">{outcome} • {striker} v {bowler}</div>'
+        lb_html += '</div>'
+        st.markdown(lb_html, unsafe_allow_html=True)
+    this_over = current_over(state)
+    if this_over:
+        st.markdown(f'<div style="margin-top:6px;font-family:monospace;font-size:13px">This over ({name_of(state, this_over["bowler"])}): '
+                    f'{" ".join(this_over["symbols"])} — {this_over["runs"]} run(s)</div>', unsafe_allow_html=True)
+
+    st.markdown('<div style="height:10px"></div>', unsafe_allow_html=True)
+    st.markdown('<div style="font-weight:700;margin-bottom:6px">Commentary</div>', unsafe_allow_html=True)
+    comms = recent_commentary(state, 6)
+    if not comms:
+        st.markdown('<div style="color:#6b7280">No commentary yet.</div>', unsafe_allow_html=True)
+    else:
+        for c in comms:
+            st.markdown(f'- {c}', unsafe_allow_html=True)
+
+    st.markdown('</div>', unsafe_allow_html=True)  # close info
+
+    # Footer nav (visual only)
+    st.markdown('<div class="footer-nav">', unsafe_allow_html=True)
+    st.markdown('<div class="nav-item nav-active">Match</div>', unsafe_allow_html=True)
+    st.markdown('<div class="nav-item">Timeline</div>', unsafe_allow_html=True)
+    st.markdown('<div class="nav-item">Scorecard</div>', unsafe_allow_html=True)
+    st.markdown('<div class="nav-item">Help</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)  # footer-nav
+
+    with st.expander("Timeline — worm & Manhattan"):
+        render_timeline(mid, state)
+
+    st.markdown('</div>', unsafe_allow_html=True)  # scorebox-card
+    st.markdown('</div>', unsafe_allow_html=True)  # root
+    # ---------- REPLACE END ----------
+
+
+        # End over / next bowler
+    if over_complete(state):
+        st.info("Over completed — कृपया नया गेंदबाज़ (Next Bowler) चुनें।")
+        nb_col1, nb_col2 = st.columns([2, 1])
+        with nb_col1:
+            next_bowler = st.selectbox("Select next bowler", options=other_team_players, index=0, format_func=lambda pid: name_of(state, pid), key=f"nextbowler_{mid}")
+        with nb_col2:
+            if st.button("Set Next Bowler", key=f"setnext_{mid}_{ver}"):
+                if next_bowler is None or next_bowler < 0:
+                    st.error("कृपया एक वैध अगले गेंदबाज़ का चयन करें।")
+                else:
                     try:
-                        for k in [f"nextbowler_{mid}", f"bowler_{mid}", f"striker_{mid}", f"nonstriker_{mid}"]:
-                            if k in st.session_state:
-                                del st.session_state[k]
-                    except Exception:
-                        pass
-                    st.success(f"Next bowler set to {next_bowler}. Scoring resumed.")
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(f"Failed to set next bowler: {e}")
-
-    # Quick actions
-    left, right = st.columns([2, 1])
-    with left:
-        st.subheader("Quick Actions")
-        runs_cols = st.columns(6)
-        labels = ["0", "1", "2", "3", "4 🎯", "6 🔥"]
-        values = ["0", "1", "2", "3", "4", "6"]
-        for i in range(6):
-            with runs_cols[i]:
-                if st.button(labels[i]):
+                        scoring.set_next_bowler(match, next_bowler, command_id=scorer_command(ver, "bowler"))
+                        try:
+                            for k in [f"nextbowler_{mid}", f"bowler_{mid}", f"striker_{mid}", f"nonstriker_{mid}"]:
+                                if k in st.session_state:
+                                    del st.session_state[k]
+                        except Exception:
+                            pass
+                        st.success(f"Next bowler set to {name_of(state, next_bowler)}. Scoring resumed.")
+                        st.experimental_rerun()
+                    except Exception as e:
+                        st.error(f"Failed to set next bowler: {e}")
+
+        # Quick actions
+        left, right = st.columns([2, 1])
+        with left:
+            st.subheader("Quick Actions")
+            runs_cols = st.columns(6)
+            labels = ["0", "1", "2", "3", "4 🎯", "6 🔥"]
+            values = ["0", "1", "2", "3", "4", "6"]
+            for i in range(6):
+                with runs_cols[i]:
+                    if st.button(labels[i], key=f"qa_{values[i]}_{mid}_{ver}"):
+                        try:
+                            entry = scoring.record_ball(match, values[i], command_id=scorer_command(ver, f"ball:{values[i]}"))
+                            st.experimental_rerun()
+                        except Exception as e:
+                            st.error(e)
+            ex1, ex2, ex3 = st.columns(3)
+            with ex1:
+                if st.button("Wide (WD)", key=f"qa_wd_{mid}_{ver}"):
                     try:
-                        entry = record_ball_full(state, mid, values[i])
-                        save_match_state(mid, state)
+                        entry = scoring.record_ball(match, 'WD', extras={'runs': 1}, command_id=scorer_command(ver, "ball:WD"))
                         st.experimental_rerun()
                     except Exception as e:
                         st.error(e)
-        ex1, ex2, ex3 = st.columns(3)
-        with ex1:
-            if st.button("Wide (WD)"):
-                try:
-                    entry = record_ball_full(state, mid, 'WD', extras={'runs': 1})
-                    save_match_state(mid, state)
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(e)
-        with ex2:
-            if st.button("No Ball (NB)"):
-                try:
-                    entry = record_ball_full(state, mid, 'NB', extras={'runs_off_bat': 0})
-                    save_match_state(mid, state)
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(e)
-        with ex3:
-            if st.button("Bye (BY)"):
-                try:
-                    entry = record_ball_full(state, mid, 'BY', extras={'runs': 1})
-                    save_match_state(mid, state)
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(e)
-
-        # Wicket expander
-        with st.expander("Wicket ⚠️"):
-            wtype = st.selectbox("Wicket Type", options=["Bowled", "Caught", "LBW", "Run Out", "Stumped", "Hit Wicket", "Other"], key=f"wtype_{mid}")
-            bat_team = state.get("bat_team", "Team A")
-            bat_order = state.get('teams', {}).get(bat_team, [])[:]
-            dismissed = state.get('batting', {}).get('striker', '')
-            on_field = [state.get('batting', {}).get('striker', ''), state.get('batting', {}).get('non_striker', '')]
-            used_raw = [p for p, v in state.get('batsman_stats', {}).items() if (v.get('B', 0) > 0 or v.get('R', 0) > 0)]
-            candidates = []
-            for p in bat_order:
-                skip = False
-                for of in on_field:
-                    if same_player(p, of):
-                        skip = True
-                        break
-                if skip:
-                    continue
-                for u in used_raw:
-                    if same_player(p, u):
-                        skip = True
-                        break
-                if skip:
-                    continue
-                if same_player(p, dismissed):
-                    continue
-                candidates.append(p)
-            if not candidates:
-                candidates = [p for p in bat_order if not any(same_player(p, of) for of in on_field)]
-            if candidates:
-                newbat = st.selectbox("New batsman (required)", options=candidates, key=f"newbat_{mid}")
-            else:
-                newbat = st.text_input("New batsman (enter name)", key=f"newbatfree_{mid}")
-            if st.button("Record Wicket", key=f"recw_{mid}"):
-                if not newbat or str(newbat).strip() == "":
-                    st.error("नया बल्लेबाज़ चुनें/डालें — wicket record करने के लिए आवश्यक।")
-                else:
+            with ex2:
+                if st.button("No Ball (NB)", key=f"qa_nb_{mid}_{ver}"):
+                    try:
+                        entry = scoring.record_ball(match, 'NB', extras={'runs_off_bat': 0}, command_id=scorer_command(ver, "ball:NB"))
+                        st.experimental_rerun()
+                    except Exception as e:
+                        st.error(e)
+            with ex3:
+                if st.button("Bye (BY)", key=f"qa_by_{mid}_{ver}"):
                     try:
-                        winfo = {'type': wtype, 'new_batsman': newbat}
-                        entry = record_ball_full(state, mid, 'W', wicket_info=winfo)
-                        save_match_state(mid, state)
+                        entry = scoring.record_ball(match, 'BY', extras={'runs': 1}, command_id=scorer_command(ver, "ball:BY"))
                         st.experimental_rerun()
                     except Exception as e:
-                        st.error(f"Wicket record failed: {e}")
+                        st.error(e)
 
-    with right:
-        st.subheader("Batsmen")
-        bats = state.get('batsman_stats', {})
-        if not bats:
-            st.info("No batsman data yet")
-        else:
-            rows = []
-            for name, vals in bats.items():
-                t = player_team(state, name)
-                if t != bat:
-                    continue
-                R = int(vals.get("R", 0) or 0)
-                B = int(vals.get("B", 0) or 0)
-                F = int(vals.get("4", 0) or 0)
-                S6 = int(vals.get("6", 0) or 0)
-                SR = (R / B * 100) if B > 0 else 0.0
-                rows.append({"Player": name, "R": R, "B": B, "4s": F, "6s": S6, "SR": f"{SR:.1f}"})
-            if rows:
-                df = pd.DataFrame(rows).sort_values("R", ascending=False).reset_index(drop=True)
-                totR = df["R"].sum(); totB = df["B"].sum(); tot4 = df["4s"].sum(); tot6 = df["6s"].sum()
-                tot_sr = (totR / max(1, totB) * 100) if totB > 0 else 0.0
-                totals = pd.DataFrame([{"Player": "TOTAL", "R": totR, "B": totB, "4s": tot4, "6s": tot6, "SR": f"{tot_sr:.1f}"}])
-                df_display = pd.concat([df, totals], ignore_index=True)
-                st.table(df_display)
+            # Wicket expander
+            with st.expander("Wicket ⚠️"):
+                wtype = st.selectbox("Wicket Type", options=["Bowled", "Caught", "LBW", "Run Out", "Stumped", "Hit Wicket", "Other"], key=f"wtype_{mid}")
+                bat_team = state.get("bat_team", "Team A")
+                bat_order = team_ids(state, bat_team)
+                on_field = {match.striker, match.non_striker}
+                used = {int(p) for p, v in state.get('batsman_stats', {}).items() if (v.get('B', 0) > 0 or v.get('R', 0) > 0)}
+                candidates = [p for p in bat_order if p not in on_field and p not in used]
+                if not candidates:
+                    candidates = [p for p in bat_order if p not in on_field]
+                if candidates:
+                    newbat = st.selectbox("New batsman (required)", options=candidates, format_func=lambda pid: name_of(state, pid), key=f"newbat_{mid}")
+                else:
+                    newbat = st.text_input("New batsman (enter name)", key=f"newbatfree_{mid}")
+                if st.button("Record Wicket", key=f"recw_{mid}_{ver}"):
+                    if newbat is None or str(newbat).strip() == "":
+                        st.error("नया बल्लेबाज़ चुनें/डालें — wicket record करने के लिए आवश्यक।")
+                    else:
+                        try:
+                            winfo = {'type': wtype, 'new_batsman': newbat}
+                            entry = scoring.record_ball(match, 'W', wicket_info=winfo, command_id=scorer_command(ver, "ball:W"))
+                            st.experimental_rerun()
+                        except Exception as e:
+                            st.error(f"Wicket record failed: {e}")
+
+        with right:
+            st.subheader("Batsmen")
+            bats = state.get('batsman_stats', {})
+            if not bats:
+                st.info("No batsman data yet")
             else:
-                st.info("No batsmen of current batting team recorded yet.")
+                rows = batting_rows(state, bat)
+                if rows:
+                    with timed("render.scorer_batsmen_table"):
+                        df = pd.DataFrame(rows).sort_values("R", ascending=False).reset_index(drop=True)
+                        totR = df["R"].sum(); totB = df["B"].sum(); tot4 = df["4s"].sum(); tot6 = df["6s"].sum()
+                        tot_sr = (totR / max(1, totB) * 100) if totB > 0 else 0.0
+                        totals = pd.DataFrame([{"Player": "TOTAL", "R": totR, "B": totB, "4s": tot4, "6s": tot6, "SR": f"{tot_sr:.1f}"}])
+                        df_display = pd.concat([df, totals], ignore_index=True)
+                        st.table(df_display)
+                else:
+                    st.info("No batsmen of current batting team recorded yet.")
 
-        st.markdown("---")
-        st.subheader("Bowlers")
-        bowl = state.get('bowler_stats', {})
-        if not bowl:
-            st.info("No bowlers yet")
-        else:
-            rows = []
-            opp_team = other
-            for name, vals in bowl.items():
-                t = player_team(state, name)
-                if t != opp_team:
-                    continue
-                balls = int(vals.get("B", 0) or 0)
-                runs = int(vals.get("R", 0) or 0)
-                wkts = int(vals.get("W", 0) or 0)
-                rows.append({"Bowler": name, "Balls": format_over_ball(balls), "BallsRaw": balls, "R": runs, "W": wkts})
-            if rows:
-                dfb = pd.DataFrame(rows).sort_values("W", ascending=False).reset_index(drop=True)
-                totBallsRaw = dfb["BallsRaw"].sum() if "BallsRaw" in dfb.columns else 0
-                totR = dfb["R"].sum(); totW = dfb["W"].sum()
-                totals = pd.DataFrame([{"Bowler": "TOTAL", "Balls": format_over_ball(totBallsRaw), "R": totR, "W": totW}])
-                dfb_display = pd.concat([dfb.drop(columns=["BallsRaw"]), totals], ignore_index=True)
-                st.table(dfb_display)
+            st.markdown("---")
+            st.subheader("Bowlers")
+            bowl = state.get('bowler_stats', {})
+            if not bowl:
+                st.info("No bowlers yet")
             else:
-                st.info("No bowlers of opposition team recorded yet.")
+                rows = bowling_rows(state, other)
+                if rows:
+                    with timed("render.scorer_bowlers_table"):
+                        dfb = pd.DataFrame(rows).sort_values("W", ascending=False).reset_index(drop=True)
+                        totBallsRaw = dfb["BallsRaw"].sum() if "BallsRaw" in dfb.columns else 0
+                        totR = dfb["R"].sum(); totW = dfb["W"].sum()
+                        totals = pd.DataFrame([{"Bowler": "TOTAL", "Balls": format_over_ball(totBallsRaw), "M": dfb["M"].sum(), "R": totR, "W": totW,
+                                                "Econ": round(totR / (totBallsRaw / 6), 2) if totBallsRaw else 0.0}])
+                        dfb_display = pd.concat([dfb.drop(columns=["BallsRaw"]), totals], ignore_index=True)
+                        st.table(dfb_display)
+                else:
+                    st.info("No bowlers of opposition team recorded yet.")
 
-        st.markdown("---")
-        st.subheader("Last 12 Balls")
-        last12 = state.get('balls_log', [])[-12:][::-1]
-        if not last12:
-            st.info("No balls recorded yet.")
-        else:
-            for i, b in enumerate(last12, start=1):
-                st.markdown(f"{i}. {b.get('striker','-')} vs {b.get('bowler','-')} → {b.get('outcome','')} | Runs: {b.get('post_score',{}).get('runs','-')} / {b.get('post_score',{}).get('wkts','-')}")
+            st.markdown("---")
+            st.subheader("Last 12 Balls")
+            last12 = recent_balls(state, 12)
+            if not last12:
+                st.info("No balls recorded yet.")
+            else:
+                for i, b in enumerate(last12, start=1):
+                    st.markdown(f"{i}. {b.get('striker','-')} vs {b.get('bowler','-')} → {b.get('outcome','')} | Runs: {b.get('post_score',{}).get('runs','-')} / {b.get('post_score',{}).get('wkts','-')}")
+
+            st.markdown("---")
+            st.subheader("Commentary")
+            for txt in recent_commentary(state, 12):
+                st.markdown(f"- {txt}")
 
         st.markdown("---")
-        st.subheader("Commentary")
-        for txt in state.get("commentary", [])[-12:][::-1]:
-            st.markdown(f"- {txt}")
-
-    st.markdown("---")
-    f1, f2, f3 = st.columns(3)
-    with f1:
-        if st.button("Undo Last Ball"):
-            ok = undo_last_ball_full(state, mid)
-            if ok:
-                save_match_state(mid, state)
-                st.success("Last ball undone.")
-                st.experimental_rerun()
+        f1, f2, f3 = st.columns(3)
+        with f1:
+            if st.button("Undo Last Ball", key=f"undo_{mid}_{ver}"):
+                ok = scoring.undo_last_ball(match, command_id=scorer_command(ver, "undo"))
+                if ok:
+                    st.success("Last ball undone.")
+                    st.experimental_rerun()
+                else:
+                    st.info("No ball to undo.")
+        with f2:
+            if st.button("Export JSON"):
+                data = export_match_json(state)
+                st.download_button("Download JSON", data=data, file_name=f"match_{mid}.json", mime="application/json")
+        with f3:
+            if st.button("End Match (Complete)"):
+                try:
+                    if scoring is not engine:
+                        close_offline_scorers()
+                        match = engine.load_match(mid)
+                    summary = engine.finalize(match)
+                    st.success("Match marked completed.")
+                    st.info(summary.get("result_text", "Result computed"))
+                    if summary.get("man_of_match_auto"):
+                        st.info(f"Man of the Match (auto): {summary.get('man_of_match_auto')}")
+                    st.experimental_rerun()
+                except Exception as e:
+                    st.error(f"Failed to finalize match: {e}")
+
+        # Full scorecard expander
+        with st.expander("View Full Scorecard / Match Recap"):
+            st.markdown("### Innings Summary")
+            ta = "Team A"; tb = "Team B"
+            sa = state.get("score", {}).get(ta, {"runs": 0, "wkts": 0, "balls": 0})
+            sb = state.get("score", {}).get(tb, {"runs": 0, "wkts": 0, "balls": 0})
+            st.write(f"**{ta}:** {sa.get('runs',0)}/{sa.get('wkts',0)} ({format_over_ball(sa.get('balls',0))})")
+            st.write(f"**{tb}:** {sb.get('runs',0)}/{sb.get('wkts',0)} ({format_over_ball(sb.get('balls',0))})")
+            st.markdown("### Over by over")
+            recap = over_rows(state)
+            if recap:
+                st.dataframe(pd.DataFrame(recap))
+            render_partnerships(state)
+            st.markdown("### Ball-by-ball")
+            rows = []
+            for i, (b, text) in enumerate(zip(all_balls(state), full_commentary(state)), start=1):
+                rows.append({
+                    "Idx": i,
+                    "Over": format_over_ball(b.get("prev_score", {}).get("balls", 0)),
+                    "Time": b.get("time", ""),
+                    "Bowler": b.get("bowler", ""),
+                    "Striker": b.get("striker", ""),
+                    "Outcome": b.get("outcome", ""),
+                    "Extras": json.dumps(b.get("extras", {}), ensure_ascii=False),
+                    "Wicket": json.dumps(b.get("wicket", {}), ensure_ascii=False),
+                    "ScoreAfter": f"{b.get('post_score', {}).get('runs','-')}/{b.get('post_score', {}).get('wkts','-')}",
+                    "Commentary": text
+                })
+            if rows:
+                with timed("render.full_scorecard_table"):
+                    df_full = pd.DataFrame(rows)
+                    st.dataframe(df_full)
+                st.download_button("Download full scorecard (CSV)", data=df_full.to_csv(index=False).encode("utf-8"), file_name=f"match_{mid}_full_scorecard.csv", mime="text/csv")
+                st.download_button("Download full scorecard (JSON)", data=export_match_json(state), file_name=f"match_{mid}_full_scorecard.json", mime="application/json")
             else:
-                st.info("No ball to undo.")
-    with f2:
-        if st.button("Export JSON"):
-            data = export_match_json(state)
-            st.download_button("Download JSON", data=data, file_name=f"match_{mid}.json", mime="application/json")
-    with f3:
-        if st.button("End Match (Complete)"):
-            try:
-                summary = finalize_match(mid, state)
-                st.success("Match marked completed.")
-                st.info(summary.get("result_text", "Result computed"))
-                if summary.get("man_of_match_auto"):
-                    st.info(f"Man of the Match (auto): {summary.get('man_of_match_auto')}")
-                st.experimental_rerun()
-            except Exception as e:
-                st.error(f"Failed to finalize match: {e}")
-
-    # Full scorecard expander
-    with st.expander("View Full Scorecard / Match Recap"):
-        st.markdown("### Innings Summary")
-        ta = "Team A"; tb = "Team B"
-        sa = state.get("score", {}).get(ta, {"runs": 0, "wkts": 0, "balls": 0})
-        sb = state.get("score", {}).get(tb, {"runs": 0, "wkts": 0, "balls": 0})
-        st.write(f"**{ta}:** {sa.get('runs',0)}/{sa.get('wkts',0)} ({format_over_ball(sa.get('balls',0))})")
-        st.write(f"**{tb}:** {sb.get('runs',0)}/{sb.get('wkts',0)} ({format_over_ball(sb.get('balls',0))})")
-        st.markdown("### Ball-by-ball")
-        rows = []
-        for i,b in enumerate(state.get("balls_log", []), start=1):
-            rows.append({
-                "Idx": i,
-                "Over": format_over_ball(b.get("prev_score", {}).get("balls", 0)),
-                "Time": b.get("time", ""),
-                "Bowler": b.get("bowler", ""),
-                "Striker": b.get("striker", ""),
-                "Outcome": b.get("outcome", ""),
-                "Extras": json.dumps(b.get("extras", {}), ensure_ascii=False),
-                "Wicket": json.dumps(b.get("wicket", {}), ensure_ascii=False),
-                "ScoreAfter": f"{b.get('post_score', {}).get('runs','-')}/{b.get('post_score', {}).get('wkts','-')}"
-            })
-        if rows:
-            df_full = pd.DataFrame(rows)
-            st.dataframe(df_full)
-            st.download_button("Download full scorecard (CSV)", data=df_full.to_csv(index=False).encode("utf-8"), file_name=f"match_{mid}_full_scorecard.csv", mime="text/csv")
-            st.download_button("Download full scorecard (JSON)", data=export_match_json(state), file_name=f"match_{mid}_full_scorecard.json", mime="application/json")
-        else:
-            st.info("No ball records yet.")
-
-    save_match_state(mid, state)
+                st.info("No ball records yet.")
 
 # ---------------- Live Score (Public) ----------------
-if menu == "Live Score (Public)":
-    matches = load_matches_index()
+def page_live_public():
+    import pandas as pd
+    matches = engine.list_matches()
     if not matches:
-        st.info("No matches"); st.stop()
+        st.info("No matches"); return
     mid = st.selectbox("Select Match", options=list(matches.keys()), format_func=lambda x: f"{x} — {matches[x]['title']}", key="pub_match_select")
-    state = load_match_state(mid)
-    if not state:
-        st.error("Match state missing"); st.stop()
-    if HAS_AUTORE:
-        st_autorefresh(interval=5000, key=f"public_auto_{mid}")
+    pub_match = engine.load_shared(mid)  # read-only, shared by all viewers
+    if not pub_match:
+        st.error("Match state missing"); return
+    state = pub_match.state
+    if pub_match.is_live:
+        # refreshed by the next ball, not a timer (see wait_for_next_ball at the end of the script)
+        live_wait.update(mid=mid, version=pub_match.version, slot=st.empty())
+        get_metrics().incr("public_live_runs")
 
     st.markdown(f"### {matches[mid]['title']}")
+    if LIVE_BASE_URL:
+        st.caption(f"Lightweight scoreboard for phones: {LIVE_BASE_URL.rstrip('/')}/{mid}.html")
+    st.caption(f"TV / iframe view: add `?embed=1&mid={mid}` to this page's address.")
     bat = state.get("bat_team", "Team A")
     sc = state.get("score", {}).get(bat, {"runs": 0, "wkts": 0, "balls": 0})
     other = "Team A" if bat == "Team B" else "Team B"
@@ -1353,7 +1247,7 @@ if menu == "Live Score (Public)":
 
     br = state.get("batting", {})
     bw = state.get("bowling", {})
-    st.write(f"**Striker:** {br.get('striker','-')}   •   **Non-striker:** {br.get('non_striker','-')}   •   **Bowler:** {bw.get('current_bowler','-')}")
+    st.write(f"**Striker:** {name_of(state, br.get('striker', -1)) or '-'}   •   **Non-striker:** {name_of(state, br.get('non_striker', -1)) or '-'}   •   **Bowler:** {name_of(state, bw.get('current_bowler', -1)) or '-'}")
 
     if state.get("status") == "INNINGS2":
         other_team = "Team A" if state.get("bat_team") == "Team B" else "Team B"
@@ -1372,6 +1266,16 @@ if menu == "Live Score (Public)":
     st.write(f"Team A: {pretty(state['score'].get('Team A', {}))}")
     st.write(f"Team B: {pretty(state['score'].get('Team B', {}))}")
 
+    render_partnerships(state)
+
+    st.markdown("### Timeline")
+    render_timeline(mid, state)
+    n_balls = len(state.get("balls_log", []))
+    if n_balls:
+        with st.expander("Replay the match ball by ball"):
+            n = st.slider("After ball", min_value=0, max_value=n_balls, value=n_balls, key=f"replay_{mid}")
+            render_point_in_time(mid, state, n)
+
     if state.get("status") == "COMPLETED":
         fs = state.get("final_summary", {})
         st.success("Match completed — final scorecard")
@@ -1385,39 +1289,28 @@ if menu == "Live Score (Public)":
 
     # Batsmen table (public)
     st.markdown("### Batsmen")
-    bats = state.get("batsman_stats", {})
-    rows = []
-    for name, vals in bats.items():
-        if player_team(state, name) != bat:
-            continue
-        R = int(vals.get("R", 0) or 0); B = int(vals.get("B", 0) or 0); F = int(vals.get("4", 0) or 0); S6 = int(vals.get("6", 0) or 0)
-        SR = (R / B * 100) if B > 0 else 0.0
-        rows.append({"Player": name, "R": R, "B": B, "4s": F, "6s": S6, "SR": f"{SR:.1f}"})
+    rows = batting_rows(state, bat)
     if rows:
-        df = pd.DataFrame(rows).sort_values("R", ascending=False).reset_index(drop=True)
-        totR = df["R"].sum(); totB = df["B"].sum(); tot4 = df["4s"].sum(); tot6 = df["6s"].sum()
-        tot_sr = (totR / max(1, totB) * 100) if totB > 0 else 0.0
-        totals = pd.DataFrame([{"Player": "TOTAL", "R": totR, "B": totB, "4s": tot4, "6s": tot6, "SR": f"{tot_sr:.1f}"}])
-        df_display = pd.concat([df, totals], ignore_index=True)
-        st.table(df_display)
+        with timed("render.public_batsmen_table"):
+            df = pd.DataFrame(rows).sort_values("R", ascending=False).reset_index(drop=True)
+            totR = df["R"].sum(); totB = df["B"].sum(); tot4 = df["4s"].sum(); tot6 = df["6s"].sum()
+            tot_sr = (totR / max(1, totB) * 100) if totB > 0 else 0.0
+            totals = pd.DataFrame([{"Player": "TOTAL", "R": totR, "B": totB, "4s": tot4, "6s": tot6, "SR": f"{tot_sr:.1f}"}])
+            df_display = pd.concat([df, totals], ignore_index=True)
+            st.table(df_display)
     else:
         st.info("No batsman stats available yet for current batting team.")
 
     st.markdown("### Bowlers")
-    bowls = state.get("bowler_stats", {})
-    rows = []
-    for name, vals in bowls.items():
-        if player_team(state, name) != other:
-            continue
-        balls = int(vals.get("B", 0) or 0); runs = int(vals.get("R", 0) or 0); wkts = int(vals.get("W", 0) or 0)
-        rows.append({"Bowler": name, "Balls": format_over_ball(balls), "R": runs, "W": wkts})
+    rows = bowling_rows(state, other)
     if rows:
-        st.table(pd.DataFrame(rows).sort_values("W", ascending=False).reset_index(drop=True))
+        with timed("render.public_bowlers_table"):
+            st.table(pd.DataFrame(rows).drop(columns=["BallsRaw"]).sort_values("W", ascending=False).reset_index(drop=True))
     else:
         st.info("No bowler stats available yet for opposition team.")
 
     st.markdown("### Last 12 Balls")
-    last12 = state.get("balls_log", [])[-12:][::-1]
+    last12 = recent_balls(state, 12)
     if last12:
         for b in last12:
             st.markdown(f"- {b.get('striker','-')} vs {b.get('bowler','-')} → {b.get('outcome','')} | Score: {b.get('post_score',{}).get('runs','-')}/{b.get('post_score',{}).get('wkts','-')}")
@@ -1425,30 +1318,34 @@ if menu == "Live Score (Public)":
         st.info("No balls recorded yet.")
 
     st.markdown("### Commentary")
-    for txt in state.get("commentary", [])[-20:][::-1]:
+    for txt in recent_commentary(state, 20):
         st.markdown(f"<div style='background:#f8fafc;padding:8px;border-radius:8px;margin-bottom:6px;'>{txt}</div>", unsafe_allow_html=True)
 
 # ---------------- Player Stats ----------------
-if menu == "Player Stats":
+def page_player_stats():
+    import pandas as pd
     st.subheader("Player Statistics (from completed matches)")
-    matches = load_matches_index()
+    matches = engine.list_matches()
     stats = {}
     for mid, info in matches.items():
         if info.get("completed_at") or info.get("final_summary_brief"):
-            s = load_match_state(mid)
-            if not s:
+            m = engine.load_shared(mid)
+            if not m:
                 continue
-            for name, vals in s.get("batsman_stats", {}).items():
+            s = m.state
+            bat_stats = named_stats(s, "batsman_stats")
+            bowl_stats = named_stats(s, "bowler_stats")
+            for name, vals in bat_stats.items():
                 rec = stats.setdefault(name, {"R": 0, "B": 0, "4": 0, "6": 0, "matches": 0})
                 rec["R"] += int(vals.get("R", 0) or 0)
                 rec["B"] += int(vals.get("B", 0) or 0)
                 rec["4"] += int(vals.get("4", 0) or 0)
                 rec["6"] += int(vals.get("6", 0) or 0)
-            for name, vals in s.get("bowler_stats", {}).items():
+            for name, vals in bowl_stats.items():
                 rec = stats.setdefault(name, {"W": 0, "balls_bowled": 0})
                 rec["W"] += int(vals.get("W", 0) or 0)
                 rec["balls_bowled"] += int(vals.get("B", 0) or 0)
-            for p in set(list(s.get("batsman_stats", {}).keys()) + list(s.get("bowler_stats", {}).keys())):
+            for p in set(list(bat_stats.keys()) + list(bowl_stats.keys())):
                 stats.setdefault(p, {}).setdefault("matches", 0)
                 stats[p]["matches"] = stats[p].get("matches", 0) + 1
 
@@ -1467,15 +1364,45 @@ if menu == "Player Stats":
                 "Matches": v.get("matches", 0),
                 "SR": ((v.get("R", 0) / v.get("B", 1)) * 100) if v.get("B", 0) > 0 else 0.0
             })
-        df = pd.DataFrame(rows).sort_values("Runs", ascending=False).reset_index(drop=True)
-        st.dataframe(df)
+        with timed("render.player_stats_table"):
+            df = pd.DataFrame(rows).sort_values("Runs", ascending=False).reset_index(drop=True)
+            st.dataframe(df)
         st.download_button("Download Player Stats (CSV)", data=df.to_csv(index=False).encode("utf-8"), file_name="player_stats.csv", mime="text/csv")
 
+    st.markdown("### Head to head")
+    index = get_matchups()
+    index.ensure_built(engine)  # first visit after an upgrade: index the completed matches once
+    players = index.players()
+    if not players:
+        st.info("No ball-by-ball data from completed matches yet.")
+        return
+    keys = sorted(players, key=lambda k: players[k].casefold())
+    hcol1, hcol2 = st.columns(2)
+    with hcol1:
+        batter = st.selectbox("Batter", keys, format_func=players.get, key="h2h_batter")
+    with hcol2:
+        bowler = st.selectbox("Bowler", [""] + keys, format_func=lambda k: players.get(k, "— any bowler —") if k else "— any bowler —", key="h2h_bowler")
+    with timed("render.head_to_head"):
+        if bowler:
+            mu = index.matchup(batter, bowler)
+            st.write(f"**{players[batter]}** v **{players[bowler]}**: {mu['runs']} runs off {mu['balls']} balls, "
+                     f"{mu['outs']} dismissal(s) ({mu['wkts']} to the bowler), {mu['dots']} dots, {mu['4s']}×4, {mu['6s']}×6 (SR {mu['SR']})")
+        else:
+            rows = index.against_bowlers(batter)
+            if rows:
+                st.markdown(f"**{players[batter]}** against each bowler")
+                st.dataframe(pd.DataFrame(rows))
+            rows = index.against_batters(batter)
+            if rows:
+                st.markdown(f"**{players[batter]}** bowling to each batter")
+                st.dataframe(pd.DataFrame(rows))
+
 # ---------------- Admin ----------------
-if menu == "Admin":
+def page_admin():
+    import pandas as pd
     cmember = current_member()
     if not cmember or normalize_mobile(cmember.get("Mobile")) != normalize_mobile(ADMIN_PHONE):
-        st.warning("Admin only — login with admin mobile to access."); st.stop()
+        st.warning("Admin only — login with admin mobile to access."); return
     st.subheader("Admin Panel")
     up = st.file_uploader("Upload paid list (CSV/XLSX)", type=["csv", "xlsx"])
     if up:
@@ -1518,8 +1445,65 @@ if menu == "Admin":
     else:
         st.info("Paid list empty")
     st.markdown("### Member registry")
+    with st.expander("Bulk import members (CSV/XLSX)"):
+        st.caption("Columns: name, mobile, paid (Y/N), optional photo (file name of an image uploaded below). "
+                   "Known mobiles are only upgraded to Paid; new ones get the next Member IDs.")
+        bulk = st.file_uploader("Members file", type=["csv", "xlsx"], key="admin_bulk_members")
+        bulk_photos = st.file_uploader("Photos", type=["jpg", "jpeg", "png"], accept_multiple_files=True, key="admin_bulk_photos")
+        if bulk and st.button("Import members"):
+            try:
+                if bulk.name.endswith(".csv"):
+                    df = pd.read_csv(bulk, dtype=str)
+                else:
+                    df = pd.read_excel(bulk, engine="openpyxl", dtype=str)
+                with timed("members.bulk_import"):
+                    frames, missing = bulk_import_members(df, bulk_photos)
+                st.success(f"Inserted {len(frames['inserted'])}, updated {len(frames['updated'])}, skipped {len(frames['skipped'])}.")
+                for k in ["inserted", "updated", "skipped"]:
+                    if not frames[k].empty:
+                        st.markdown(f"**{k.capitalize()}**")
+                        st.dataframe(frames[k])
+                if missing:
+                    st.warning(f"{len(missing)} photo file(s) not uploaded or not an image: {', '.join(missing[:10])}")
+                report = pd.concat([f.assign(Result=k) for k, f in frames.items()], ignore_index=True)
+                st.download_button("Download import report", report.to_csv(index=False).encode("utf-8"),
+                                   file_name="member_import_report.csv", mime="text/csv")
+            except Exception as e:
+                st.error(f"Import failed: {e}")
     st.dataframe(read_members())
 
+    st.markdown("### Restore a match to an earlier ball")
+    rmatches = engine.list_matches()
+    if rmatches:
+        rmid = st.selectbox("Match", sorted(rmatches, reverse=True), format_func=lambda k: f"{rmatches[k].get('title')} ({k})", key="admin_restore_mid")
+        rmatch = engine.load_match(rmid)
+        n_balls = len(rmatch.balls_log) if rmatch else 0
+        if n_balls:
+            n = st.number_input("Keep the first N balls", min_value=0, max_value=n_balls, value=n_balls, step=1, key="admin_restore_n")
+            render_point_in_time(rmid, rmatch.state, n)
+            sure = st.checkbox(f"Yes, drop the last {n_balls - int(n)} ball(s)", key="admin_restore_sure")
+            if st.button("Restore to this ball", disabled=not sure or int(n) == n_balls):
+                engine.restore_to_ball(rmatch, int(n), get_timelines().get(rmid, rmatch.state))
+                st.success(f"{rmid} restored to ball {int(n)}.")
+        else:
+            st.info("No balls recorded in this match.")
+
+    st.markdown("### Data integrity")
+    st.caption("Checks every match state, backup and CSV under data/ (python -m mpgb.integrity from a shell).")
+    fix = st.checkbox("Rebuild derived stats from the ball log (no match should be in progress)", key="admin_integrity_fix")
+    if st.button("Run integrity check"):
+        from mpgb.integrity import check_data_dir
+        engine.store.flush()
+        with st.spinner("Checking data/ ..."):
+            report = check_data_dir(DATA_DIR, rebuild=fix)
+        st.caption(f"{report['matches']} matches, {report['balls']} balls, {report['backups']} backups in {report['seconds']} s")
+        if not report["issues"]:
+            st.success("No problems found.")
+        else:
+            open_issues = [i for i in report["issues"] if not i.get("fixed")]
+            (st.warning if open_issues else st.info)(f"{len(report['issues'])} problem(s), {len(open_issues)} still open.")
+            st.dataframe(pd.DataFrame(report["issues"]).assign(path=lambda d: d["path"].map(os.path.basename)))
+
     st.markdown("### Final scorecards / backups")
     files = sorted([f for f in os.listdir(BACKUP_DIR) if f.startswith("match_")], reverse=True)
     if files:
@@ -1536,6 +1520,64 @@ if menu == "Admin":
     else:
         st.info("No backups found yet.")
 
+    st.markdown("### Performance")
+    perf = get_metrics().snapshot()
+    pc1, pc2, pc3, pc4 = st.columns(4)
+    pc1.metric("Reruns / min", perf["reruns_per_min"])
+    pc2.metric("Total reruns", perf["counters"].get("reruns", 0))
+    pc3.metric("Bytes read", f"{perf['counters'].get('bytes_read', 0):,}")
+    pc4.metric("Bytes written", f"{perf['counters'].get('bytes_written', 0):,}")
+    cold = [r for r in perf["ops"] if r["op"] == "startup.cold_start"]
+    if cold:
+        cold_ms = cold[0]["max_ms"]
+        msg = f"Cold start: {cold_ms:.0f} ms (budget {STARTUP_BUDGET_MS} ms)"
+        if cold_ms > STARTUP_BUDGET_MS:
+            st.warning(msg)
+        else:
+            st.caption(msg)
+    if perf["ops"]:
+        dfo = pd.DataFrame(perf["ops"])
+        st.dataframe(dfo.style.format({"p50_ms": "{:.2f}", "p95_ms": "{:.2f}", "max_ms": "{:.2f}"}))
+    else:
+        st.info("No timings recorded yet.")
+    st.download_button("Download metrics (TXT)", data=get_metrics().export_text().encode("utf-8"), file_name=f"mpgb_metrics_{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.txt", mime="text/plain")
+
+# ---------------- Dispatch ----------------
+PAGES = {
+    "Home": page_home,
+    "Login / Register": page_login_register,
+    "Match Setup": page_match_setup,
+    "Tournaments": page_tournaments,
+    "Live Scorer": page_live_scorer,
+    "Live Score (Public)": page_live_public,
+    "Player Stats": page_player_stats,
+    "Admin": page_admin,
+}
+
+live_wait = {}  # set by the public page: hold this run open until the next ball
+with timed(f"page.{menu}"):
+    PAGES[menu]()
+
 # ---------------- Footer ----------------
 st.markdown("---")
 st.markdown("Note: Login by mobile only. Photos stored in `data/photos/`. Admin mobile is restricted.")
+
+_paint_ms = (time.perf_counter() - _run_started) * 1000
+get_metrics().observe("script.first_paint", _paint_ms / 1000)
+if _first_run:
+    # includes module imports, which later reruns get from sys.modules
+    get_metrics().observe("startup.cold_start", _paint_ms / 1000)
+    if _paint_ms > STARTUP_BUDGET_MS:
+        get_metrics().incr("startup_over_budget")
+        print(f"[mpgb] cold start took {_paint_ms:.0f} ms (budget {STARTUP_BUDGET_MS} ms)")
+
+# deferred sidebar work, after the page is on screen
+if id_card_slot is not None:
+    try:
+        id_card_slot.download_button("Download ID Card (PNG)", data=id_card_png(mem.get("MemberID"), mem.get("Name"), mem.get("Mobile")), file_name=f"{mem.get('MemberID')}_ID.png", mime="image/png")
+    except Exception:
+        pass
+get_metrics().observe("script.run", time.perf_counter() - _run_started)
+
+if live_wait:
+    wait_for_next_ball(**live_wait)
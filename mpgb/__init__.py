@@ -0,0 +1,26 @@
+# mpgb - headless scoring engine for MPGB Cricket Club - Sagar
+#
+# Importable without Streamlit:
+#
+#   from mpgb import ScoringEngine, FileStore
+#   engine = ScoringEngine(FileStore("data"))
+#   m = engine.create_match("A vs B", 2, ["a1", "a2"], ["b1", "b2"])
+#   engine.record_ball(m, "4")
+
+from .match import Match, TEAM_A, TEAM_B, other_team
+from .engine import (
+    ScoringEngine,
+    apply_ball,
+    undo_ball,
+    set_next_bowler,
+    compute_man_of_match,
+    match_result,
+    new_match_id,
+)
+from .storage import MatchStore, FileStore, MemoryStore, load_json, save_json
+from .serialize import Serializer, get_serializer
+from .commentary import pick_commentary
+from .export import export_match_json, export_match_csv
+from .metrics import get_metrics, timed, instrumented
+from .util import normalize_mobile, format_over_ball, same_player
+from .roster import name_of, team_of, team_ids
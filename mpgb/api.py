@@ -0,0 +1,346 @@
+# mpgb/api.py - local JSON HTTP API over the scoring engine (stdlib only)
+#
+#   python -m mpgb.api --data data --port 8700          # standalone
+#   MPGB_API_TOKEN=secret python -m mpgb.api ...         # enables write endpoints
+#
+# or start_api(engine, port) from a process that already owns an engine (the
+# Streamlit app does this when API_PORT is set), so writes share its store.
+#
+# Reads (no auth):
+#   GET  /api/matches                         match index
+#   GET  /api/matches/<mid>                   live summary
+#   GET  /api/matches/<mid>/scorecard         full scorecard
+#   GET  /api/matches/<mid>/balls?start=&stop=  ball-by-ball range (0-based, stop exclusive)
+#   GET  /api/matches/<mid>?since=<version>&wait=<s>  long-poll: held until the next ball
+#   GET  /api/matches/<mid>/events           server-sent events, one "update" per ball
+# Writes ("Authorization: Bearer <token>" or "X-API-Key: <token>"):
+#   POST /api/matches/<mid>/ball     {"outcome": "4", "extras": {...}, "wicket": {...}}
+#   POST /api/matches/<mid>/undo
+#   POST /api/matches/<mid>/bowler   {"bowler": <roster id or name>}
+#   POST /api/matches/<mid>/batch    {"commands": [{"command_id", "action": "ball"|"undo"|"bowler", ...}]}
+#                                    applied in order, saved once (queued/offline clients)
+#
+# A write may carry "command_id" in its body (or an Idempotency-Key header):
+# resending the same ID, e.g. a retry after a timeout, answers 200 with
+# "duplicate": true and changes nothing.
+#
+# Read responses are cached per (match, state stamp) and carry an ETag built
+# from the state version; pollers sending If-None-Match get a bodyless 304.
+
+import os
+import re
+import sys
+import hmac
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from .engine import ScoringEngine
+from .metrics import get_metrics, timed
+from .notify import ChangeNotifier
+from .storage import FileStore
+from .summary import live_summary, scorecard, ball_range
+
+API_CACHE_SIZE = 256
+MAX_BODY = 64 * 1024
+MAX_BATCH = 200        # commands per batch request
+MAX_LONG_POLL = 60     # seconds a long-poll may be held
+SSE_KEEPALIVE = 15     # seconds between keep-alive comments on idle event streams
+
+_ROUTE = re.compile(r"^/api/matches(?:/(?P<mid>[A-Za-z0-9_-]+)(?:/(?P<action>[a-z]+))?)?/?$")
+
+VIEWS = {
+    "summary": lambda mid, state, q: live_summary(mid, state),
+    "scorecard": lambda mid, state, q: scorecard(mid, state),
+    "balls": lambda mid, state, q: {"mid": mid, "version": int(state.get("version", 0) or 0),
+                                    "total": len(state.get("balls_log", [])), "balls": ball_range(state, *q)},
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ScoreApi:
+    """Transport-free core of the API: cached read views and serialized write commands."""
+
+    def __init__(self, engine, token=None, cache_size=API_CACHE_SIZE, notifier=None):
+        self.engine = engine
+        self.token = token or ""
+        self.notifier = notifier
+        self._cache = OrderedDict()  # (mid, view, args) -> (stamp, etag, body)
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    # ---- reads ----
+    def view(self, mid, view, args=()):
+        """(etag, body bytes) of a read view, re-rendered only when the stored state changed."""
+        key = (mid, view, args)
+        stamp = self.engine.store.state_stamp(mid)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and stamp is not None and hit[0] == stamp:
+                self._cache.move_to_end(key)
+                get_metrics().incr("api_cache_hits")
+                return hit[1], hit[2]
+        match = self.engine.load_shared(mid)
+        if match is None:
+            raise ApiError(404, f"unknown match {mid}")
+        with timed(f"api.render_{view}"):
+            body = _dumps(VIEWS[view](mid, match.state, args))
+        etag = f'"{mid}-v{match.version}-{view}{"-" + "-".join(map(str, args)) if args else ""}"'
+        with self._lock:
+            self._cache[key] = (stamp, etag, body)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return etag, body
+
+    def index(self):
+        return _dumps(self.engine.list_matches())
+
+    def wait_for_ball(self, mid, since, timeout):
+        """Block until ``mid`` has a version other than ``since`` (needs a notifier)."""
+        if self.notifier is None:
+            return
+        if self.notifier.version(mid) is None:
+            self.notifier.publish(mid, since)  # baseline for matches not saved since start-up
+        self.notifier.wait(mid, since, timeout=timeout)
+
+    # ---- writes ----
+    def authorized(self, presented):
+        return bool(self.token) and hmac.compare_digest(str(presented or ""), self.token)
+
+    def command(self, mid, action, payload):
+        cid = payload.get("command_id") or None
+        with self._write_lock:
+            match = self.engine.load_match(mid)
+            if match is None:
+                raise ApiError(404, f"unknown match {mid}")
+            if action == "ball":
+                if payload.get("outcome") in (None, ""):  # 0 (a dot ball sent as a number) is valid
+                    raise ApiError(400, "outcome is required")
+                entry = self.engine.record_ball(match, str(payload["outcome"]), extras=payload.get("extras") or {},
+                                                wicket_info=payload.get("wicket"), command_id=cid)
+                if entry.get("duplicate"):
+                    result = {"duplicate": True}
+                elif entry.get("stopped"):
+                    raise ApiError(409, entry.get("reason", "not accepted"))
+                else:
+                    result = {"ball": entry}
+            elif action == "undo":
+                if not self.engine.undo_last_ball(match, command_id=cid):
+                    raise ApiError(409, "no ball to undo")
+                result = {"undone": True}
+            elif action == "batch":
+                commands = payload.get("commands")
+                if not isinstance(commands, list) or not all(isinstance(c, dict) for c in commands):
+                    raise ApiError(400, "commands must be a list of objects")
+                if len(commands) > MAX_BATCH:
+                    raise ApiError(413, f"at most {MAX_BATCH} commands per batch")
+                result = {"results": self.engine.apply_batch(match, commands)}
+            elif action == "bowler":
+                bowler = payload.get("bowler")
+                if bowler in (None, ""):
+                    raise ApiError(400, "bowler is required")
+                self.engine.set_next_bowler(match, bowler, command_id=cid)
+                result = {"bowler": match.current_bowler_name}
+            else:
+                raise ApiError(404, f"unknown command {action}")
+            result["summary"] = live_summary(mid, match.state)
+            return result
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _int_arg(q, name):
+    vals = q.get(name)
+    if not vals or vals[0] == "":
+        return None
+    try:
+        return int(vals[0])
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    api = None  # ScoreApi, set by make_server
+    server_version = "mpgb-api/1"
+
+    def do_GET(self):
+        self._dispatch(write=False)
+
+    def do_POST(self):
+        self._dispatch(write=True)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Authorization, X-API-Key, Content-Type, If-None-Match, Idempotency-Key")
+        self.end_headers()
+
+    def _dispatch(self, write):
+        get_metrics().incr("api_requests")
+        url = urlsplit(self.path)
+        m = _ROUTE.match(url.path)
+        try:
+            if url.path.rstrip("/") == "/api/health":
+                return self._send(200, b'{"ok":true}')
+            if not m:
+                raise ApiError(404, "not found")
+            mid, action = m.group("mid"), m.group("action")
+            if write:
+                return self._write(mid, action)
+            if mid is None:
+                return self._send(200, self.api.index(), cache="no-cache")
+            if action == "events":
+                return self._events(mid)
+            if action is None:
+                view, args = "summary", ()
+                q = parse_qs(url.query)
+                since = _int_arg(q, "since")
+                if since is not None and self.api.notifier is not None:
+                    _etag, body = self.api.view(mid, view, args)
+                    if json.loads(body).get("version") == since:
+                        self.api.wait_for_ball(mid, since, min(MAX_LONG_POLL, max(0, _int_arg(q, "wait") or 25)))
+            elif action in ("scorecard", "balls"):
+                view = action
+                q = parse_qs(url.query)
+                args = (_int_arg(q, "start") or 0, _int_arg(q, "stop")) if action == "balls" else ()
+            else:
+                raise ApiError(404, "not found")
+            etag, body = self.api.view(mid, view, args)
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                get_metrics().incr("api_not_modified")
+                return self._send(304, b"", etag=etag, cache="no-cache")
+            return self._send(200, body, etag=etag, cache="no-cache")
+        except ApiError as e:
+            return self._send(e.status, _dumps({"error": str(e)}))
+        except Exception as e:
+            get_metrics().incr("api_errors")
+            return self._send(500, _dumps({"error": f"internal error: {e}"}))
+
+    def _events(self, mid):
+        if self.api.notifier is None:
+            raise ApiError(501, "live events are not available on this server")
+        _etag, body = self.api.view(mid, "summary", ())  # 404s before the stream starts
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self._cors()
+        self.end_headers()
+        get_metrics().incr("api_event_streams")
+        try:
+            while True:
+                version = json.loads(body).get("version")
+                if self.api.notifier.version(mid) is None:
+                    self.api.notifier.publish(mid, version)  # baseline for matches not saved since start-up
+                self.wfile.write(b"event: update\ndata: " + body + b"\n\n")
+                self.wfile.flush()
+                while self.api.notifier.wait(mid, version, timeout=SSE_KEEPALIVE) == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                if self.api.notifier.version(mid) == -1:
+                    return  # match deleted
+                _etag, body = self.api.view(mid, "summary", ())
+        except (BrokenPipeError, ConnectionResetError, ApiError):
+            return
+
+    def _write(self, mid, action):
+        auth = self.headers.get("Authorization", "")
+        presented = auth[7:].strip() if auth.lower().startswith("bearer ") else self.headers.get("X-API-Key")
+        if not self.api.token:
+            raise ApiError(403, "write endpoints are disabled (no API token configured)")
+        if not self.api.authorized(presented):
+            raise ApiError(401, "invalid or missing API token")
+        if mid is None or action is None:
+            raise ApiError(404, "not found")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, "request body too large")
+        raw = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(raw.decode("utf-8")) if raw.strip() else {}
+        except ValueError:
+            raise ApiError(400, "body must be JSON")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "body must be a JSON object")
+        if self.headers.get("Idempotency-Key"):
+            payload.setdefault("command_id", self.headers["Idempotency-Key"].strip())
+        with timed(f"api.command_{action}"):
+            result = self.api.command(mid, action, payload)
+        return self._send(200, _dumps(result))
+
+    def _cors(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+
+    def _send(self, status, body, etag=None, cache=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if cache:
+            # clients may keep the body but must revalidate (cheap 304) before reuse
+            self.send_header("Cache-Control", cache)
+        self._cors()
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(engine, host="127.0.0.1", port=8700, token=None, notifier=None):
+    api = ScoreApi(engine, token=token, notifier=notifier)
+    handler = type("BoundApiHandler", (ApiHandler,), {"api": api})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def start_api(engine, port=8700, host="127.0.0.1", token=None, notifier=None):
+    """Serve the API from a daemon thread; returns the server (``.shutdown()`` to stop).
+
+    Pass the ChangeNotifier registered on ``engine`` to enable long-polls and events.
+    """
+    httpd = make_server(engine, host=host, port=port, token=token, notifier=notifier)
+    threading.Thread(target=httpd.serve_forever, name="mpgb-api", daemon=True).start()
+    return httpd
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mpgb.api")
+    ap.add_argument("--data", default="data", help="data directory (same as the app's DATA_DIR)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8700)
+    ap.add_argument("--token", default=os.environ.get("MPGB_API_TOKEN", ""), help="enables write endpoints (default $MPGB_API_TOKEN)")
+    args = ap.parse_args(argv)
+    notifier = ChangeNotifier()
+    engine = ScoringEngine(FileStore(args.data, async_writes=False), listeners=[notifier])
+    notifier.watch(engine.store)  # the app (or another scorer) may be writing too
+    httpd = make_server(engine, args.host, args.port, token=args.token, notifier=notifier)
+    print(f"mpgb API on http://{args.host}:{args.port}/api/matches (writes {'enabled' if args.token else 'disabled'})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# mpgb/balls.py - compact ball records
+#
+# Each balls_log entry is a flat list of small ints:
+#
+#   [t, innings, code, x, wkt, striker, non_striker, bowler, new_bat, next_index]
+#
+#   t           seconds since state["t0"] (match creation, epoch seconds)
+#   code        index into OUTCOMES
+#   x           extra runs: WD runs, NB runs off the bat, BY/LB runs
+#   wkt         index into WICKET_TYPES (0 = no wicket)
+#   striker ..  player ids from state["roster"] (-1 = none)
+#   next_index  batting["next_index"] before this ball (-1 = unknown)
+#
+# Names are only looked up when a ball is rendered (see roster.expand_ball).
+
+T, INN, CODE, X, WKT, S, NS, BW, NB, NI = range(10)
+
+OUTCOMES = ["0", "1", "2", "3", "4", "6", "W", "WD", "NB", "BY", "LB", "."]
+CODE_OF = {o: i for i, o in enumerate(OUTCOMES)}
+ALIASES = {"Wicket": "W", "Wide": "WD", "NoBall": "NB", "Bye": "BY", "LegBye": "LB", "dot": "0", "": "0"}
+RUN_CODES = {CODE_OF[o]: int(o) for o in ["0", "1", "2", "3", "4", "6"]}
+C_W, C_WD, C_NB, C_BY, C_LB, C_OTHER = (CODE_OF[o] for o in ["W", "WD", "NB", "BY", "LB", "."])
+
+WICKET_TYPES = ["", "out", "Bowled", "Caught", "LBW", "Run Out", "Stumped", "Hit Wicket", "Other"]
+# dismissals the bowler gets no credit for ("Other" covers retired, obstructing the field, ...)
+NOT_BOWLERS_WICKETS = {WICKET_TYPES.index("Run Out"), WICKET_TYPES.index("Other")}
+
+
+def outcome_code(outcome):
+    o = str(outcome)
+    o = ALIASES.get(o, o)
+    return CODE_OF.get(o, C_OTHER)
+
+
+def wicket_code(wicket_info):
+    if not wicket_info:
+        return 0
+    wt = str(wicket_info.get("type", "out") or "out")
+    return WICKET_TYPES.index(wt) if wt in WICKET_TYPES else WICKET_TYPES.index("Other")
+
+
+def extra_runs(code, extras):
+    extras = extras or {}
+    if code == C_WD or code in (C_BY, C_LB):
+        return int(extras.get("runs", 1))
+    if code == C_NB:
+        return int(extras.get("runs_off_bat", 0))
+    return 0
+
+
+def extras_dict(rec):
+    code = rec[CODE]
+    if code in (C_WD, C_BY, C_LB):
+        return {"runs": rec[X]}
+    if code == C_NB:
+        return {"runs_off_bat": rec[X]}
+    return {}
+
+
+def is_legal(rec):
+    return rec[CODE] not in (C_WD, C_NB)
+
+
+def deltas(rec):
+    """(team_runs, wkts, legal, bat_runs, faced, bowl_runs, bowl_balls, bowl_wkts, fours, sixes)."""
+    code, x = rec[CODE], rec[X]
+    if code in RUN_CODES:
+        r = RUN_CODES[code]
+        return (r, 0, 1, r, 1, r, 1, 0, int(r == 4), int(r == 6))
+    if code == C_W:
+        return (0, 1, 1, 0, 1, 0, 1, 1, 0, 0)
+    if code == C_WD:
+        return (x, 0, 0, 0, 0, x, 0, 0, 0, 0)
+    if code == C_NB:
+        return (1 + x, 0, 0, x, 0, 1 + x, 0, 0, 0, 0)
+    if code in (C_BY, C_LB):
+        return (x, 0, 1, 0, 1, 0, 1, 0, 0, 0)
+    return (0, 0, 1, 0, 1, 0, 1, 0, 0, 0)
+
+
+def bowlers_wicket(rec):
+    """True when the record is a dismissal credited to the bowler."""
+    return rec[CODE] == C_W and rec[WKT] not in NOT_BOWLERS_WICKETS
+
+
+def swaps_strike(rec):
+    code = rec[CODE]
+    if code in RUN_CODES:
+        return RUN_CODES[code] % 2 == 1
+    if code in (C_BY, C_LB):
+        return rec[X] % 2 == 1
+    return False
+
+
+def ball_symbol(rec):
+    code = rec[CODE]
+    if code in RUN_CODES:
+        return "•" if RUN_CODES[code] == 0 else str(RUN_CODES[code])
+    if code == C_W:
+        return "W"
+    if code == C_WD:
+        return "wd" if rec[X] == 1 else f"{rec[X]}wd"
+    if code == C_NB:
+        return "nb" if rec[X] == 0 else f"{rec[X]}nb"
+    if code in (C_BY, C_LB):
+        return f"{rec[X]}{'b' if code == C_BY else 'lb'}"
+    return "•"
@@ -0,0 +1,119 @@
+# mpgb/bench.py - offline benchmarks for the scoring engine (MPGB Cricket Club - Sagar)
+#
+#   python -m mpgb.bench serializers [--overs 20] [--repeat 20]
+#
+# Everything runs against MemoryStore / in-memory states, no Streamlit needed.
+
+import sys
+import time
+import random
+import argparse
+
+from .engine import ScoringEngine
+from .match import TEAM_A, TEAM_B
+from .serialize import Serializer, FORMATS
+from .storage import MemoryStore
+
+# rough club-cricket distribution of outcomes per delivery
+OUTCOME_WEIGHTS = [("0", 32), ("1", 30), ("2", 9), ("3", 1), ("4", 11), ("6", 4), ("W", 5), ("WD", 5), ("NB", 1), ("BY", 1), ("LB", 1)]
+WICKET_KINDS = ["Bowled", "Caught", "LBW", "Run Out", "Stumped"]
+
+
+def create_sim_match(engine, overs=20, players=11, seed=1):
+    teamA = [f"A Player {i}" for i in range(1, players + 1)]
+    teamB = [f"B Player {i}" for i in range(1, players + 1)]
+    return engine.create_match(f"Sim {seed}", overs, teamA, teamB)
+
+
+def random_delivery(rng):
+    """(outcome, extras, wicket_info) drawn from OUTCOME_WEIGHTS."""
+    outcome = rng.choices([o for o, _ in OUTCOME_WEIGHTS], [w for _, w in OUTCOME_WEIGHTS])[0]
+    extras = {"runs": 1} if outcome in ("WD", "NB", "BY", "LB") else None
+    wicket = {"type": rng.choice(WICKET_KINDS)} if outcome == "W" else None
+    return outcome, extras, wicket
+
+
+def ensure_bowler(engine, match, turn):
+    """Bring on the next of five bowlers when an over starts; returns the updated turn counter."""
+    if match.current_bowler < 0 or match.state.get("bowling", {}).get("over_needs_change"):
+        bowlers = match.teams[match.bowl_team][-5:]  # five bowlers take turns
+        engine.set_next_bowler(match, bowlers[turn % len(bowlers)])
+        turn += 1
+    return turn
+
+
+def simulate_match(overs=20, players=11, seed=1, engine=None):
+    """Score a complete two-innings match through the engine; returns the Match."""
+    rng = random.Random(seed)
+    engine = engine or ScoringEngine(MemoryStore())
+    match = create_sim_match(engine, overs, players, seed)
+    bowler_turn = 0
+    while match.status in ("INNINGS1", "INNINGS2"):
+        bowler_turn = ensure_bowler(engine, match, bowler_turn)
+        outcome, extras, wicket = random_delivery(rng)
+        engine.record_ball(match, outcome, extras=extras, wicket_info=wicket)
+    return match
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def serializer_specs():
+    specs = [Serializer(fmt) for fmt in FORMATS] + [Serializer(fmt, "gzip") for fmt in ("json-compact", "binary")]
+    try:
+        specs += [Serializer(fmt, "zstd") for fmt in ("json-compact", "binary")]
+    except RuntimeError:
+        pass  # zstandard not installed
+    return specs
+
+
+def bench_serializers(state, repeat=20, serializers=None):
+    """[{format, bytes, encode_ms, decode_ms}] for one state, best of ``repeat`` runs."""
+    rows = []
+    for ser in serializers or serializer_specs():
+        data = ser.dumps(state)
+        assert ser.loads(data) == state, ser.name
+        rows.append({
+            "format": ser.name,
+            "bytes": len(data),
+            "encode_ms": _best(lambda: ser.dumps(state), repeat) * 1000,
+            "decode_ms": _best(lambda: ser.loads(data), repeat) * 1000,
+        })
+    return rows
+
+
+def format_table(rows, columns):
+    widths = [max(len(c), *(len(f"{r[c]:.3f}" if isinstance(r[c], float) else str(r[c])) for r in rows)) for c in columns]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    for r in rows:
+        cells = [f"{r[c]:.3f}" if isinstance(r[c], float) else str(r[c]) for c in columns]
+        lines.append("  ".join(v.ljust(w) for v, w in zip(cells, widths)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mpgb.bench")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serializers", help="size and encode/decode time of each state format")
+    p.add_argument("--overs", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serializers":
+        match = simulate_match(overs=args.overs, seed=args.seed)
+        st = match.state
+        print(f"{args.overs}-over match: {len(st['balls_log'])} balls, "
+              f"{st['score'][TEAM_A]['runs']}/{st['score'][TEAM_A]['wkts']} v {st['score'][TEAM_B]['runs']}/{st['score'][TEAM_B]['wkts']}")
+        print(format_table(bench_serializers(st, repeat=args.repeat), ["format", "bytes", "encode_ms", "decode_ms"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
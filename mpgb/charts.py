@@ -0,0 +1,133 @@
+# mpgb/charts.py - worm and Manhattan charts from state["overs_detail"]
+#
+# Series come straight from the per-over aggregates. Rendered PNGs are cached
+# per (mid, state version, chart), so viewers refreshing an unchanged match
+# get the same bytes without re-plotting. matplotlib is imported on first render.
+
+import io
+import threading
+from collections import OrderedDict
+
+from .match import TEAM_A, TEAM_B
+from .metrics import get_metrics, timed
+from .overs import ensure_overs_detail
+
+INNINGS_COLORS = {1: "#0b6efd", 2: "#d97b10"}
+CHART_CACHE_SIZE = 64
+
+
+def innings_teams(state):
+    first = TEAM_A
+    for rec in state.get("overs_detail", []):
+        if rec.get("innings") == 1:
+            first = rec.get("team", TEAM_A)
+            break
+    return {1: first, 2: TEAM_B if first == TEAM_A else TEAM_A}
+
+
+def manhattan_series(state):
+    """{innings: [(over_no, runs, wkts), ...]} with over_no starting at 1."""
+    out = {1: [], 2: []}
+    for rec in ensure_overs_detail(state):
+        out.setdefault(rec.get("innings", 1), []).append((rec["over"] + 1, rec["runs"], rec["wkts"]))
+    return out
+
+
+def worm_series(state):
+    """{innings: [(over_no, cumulative_runs, wkts_in_over), ...]} starting from (0, 0, 0)."""
+    out = {}
+    for inn, overs in manhattan_series(state).items():
+        total = 0
+        pts = [(0, 0, 0)]
+        for over_no, runs, wkts in overs:
+            total += runs
+            pts.append((over_no, total, wkts))
+        out[inn] = pts if overs else []
+    return out
+
+
+def _figure():
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(6.4, 3.2), dpi=100)
+    ax = fig.add_subplot(111)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    return fig, ax
+
+
+def _png(fig):
+    out = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(out, format="png")
+    return out.getvalue()
+
+
+def render_worm_png(state):
+    teams = innings_teams(state)
+    fig, ax = _figure()
+    for inn, pts in worm_series(state).items():
+        if not pts:
+            continue
+        xs = [p[0] for p in pts]
+        ys = [p[1] for p in pts]
+        color = INNINGS_COLORS.get(inn, "#555")
+        ax.plot(xs, ys, color=color, linewidth=2, label=teams.get(inn, f"Innings {inn}"))
+        wx = [p[0] for p in pts if p[2]]
+        wy = [p[1] for p in pts if p[2]]
+        if wx:
+            ax.scatter(wx, wy, color="#d9534f", zorder=3, s=28)
+    ax.set_xlabel("Overs")
+    ax.set_ylabel("Runs")
+    ax.set_title("Worm")
+    ax.set_xlim(left=0)
+    ax.set_ylim(bottom=0)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(loc="upper left", frameon=False)
+    return _png(fig)
+
+
+def render_manhattan_png(state):
+    teams = innings_teams(state)
+    series = manhattan_series(state)
+    fig, ax = _figure()
+    width = 0.4 if series.get(2) else 0.8
+    for inn, overs in series.items():
+        if not overs:
+            continue
+        offset = 0 if width == 0.8 else (-width / 2 if inn == 1 else width / 2)
+        xs = [o[0] + offset for o in overs]
+        ax.bar(xs, [o[1] for o in overs], width=width, color=INNINGS_COLORS.get(inn, "#555"), label=teams.get(inn, f"Innings {inn}"))
+        for x, (_, runs, wkts) in zip(xs, overs):
+            for k in range(wkts):
+                ax.scatter([x], [runs + 0.8 + k * 1.2], color="#d9534f", s=24, zorder=3)
+    ax.set_xlabel("Over")
+    ax.set_ylabel("Runs")
+    ax.set_title("Manhattan")
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(loc="upper left", frameon=False)
+    return _png(fig)
+
+
+RENDERERS = {"worm": render_worm_png, "manhattan": render_manhattan_png}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def chart_png(mid, state, kind):
+    """PNG bytes for ``kind`` ("worm" / "manhattan"), cached by (mid, state version)."""
+    key = (mid, int(state.get("version", 0) or 0), kind)
+    with _cache_lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            get_metrics().incr("chart_cache_hits")
+            return png
+    with timed(f"charts.render_{kind}"):
+        png = RENDERERS[kind](state)
+    with _cache_lock:
+        _cache[key] = png
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    get_metrics().incr("chart_renders")
+    return png
@@ -0,0 +1,168 @@
+# mpgb/commentary.py - commentary templates and picker
+#
+# The state keeps only a bounded ring buffer of references, one per recent
+# ball: [ball index, template id, seed]. The template is picked from the
+# match's commentary seed and the ball index, so text for any ball (the live
+# window, the full recap, exports) is rebuilt on demand from the ball log and
+# always comes out the same.
+
+import random
+
+from .balls import OUTCOMES, CODE
+from .roster import recent_balls, all_balls
+from .util import format_over_ball
+
+COMMENTARY_WINDOW = 24  # refs kept in state; the UIs show at most the last 20
+
+RUN_TEMPLATES = [
+    "Quick push and a run taken.",
+    "Good placement and a run.",
+    "Worked away for a couple.",
+    "Nice timing, that'll be a quick two.",
+    "Smart running between the wickets."
+]
+
+WICKET_TEMPLATES = [
+    "Clean bowled! That's a beauty.",
+    "Caught — taken safely.",
+    "LBW! The umpire raises his finger.",
+    "Edge and taken — batsman walks.",
+    "Run out! Direct hit.",
+    "Stumped — beaten by the bowler."
+]
+
+EXTRA_TEMPLATES = {
+    "WD": ["Wide called — extra run.", "Wide — one extra."],
+    "NB": ["No ball — free hit coming!", "No ball — extra run awarded."],
+    "BY": ["Byes added to the total.", "Byes — runs to the batting side."],
+    "LB": ["Leg-byes added.", "Leg-bye — runs added."]
+}
+
+GENERIC_COMMENTS = [
+    "Good over, tight bowling.",
+    "Pressure building on the batsman.",
+    "Crowd enjoying the contest."
+]
+
+
+def pick_commentary(outcome, striker, bowler, extras=None):
+    extras = extras or {}
+    striker = striker or "Batsman"
+    bowler = bowler or "Bowler"
+    o = str(outcome)
+
+    if o == "6":
+        text = "It's a HUGE SIX!"
+    elif o == "4":
+        text = "That's a FOUR!"
+    elif o in ["1", "2", "3"]:
+        text = random.choice(RUN_TEMPLATES)
+    elif o in ["0", "dot", ""]:
+        text = random.choice(["No runs. Dot ball.", "Tight bowling — dot ball."])
+    elif o in ["W", "Wicket"]:
+        text = random.choice(WICKET_TEMPLATES)
+    elif o in ["WD", "Wide"]:
+        text = random.choice(EXTRA_TEMPLATES["WD"])
+    elif o in ["NB", "NoBall"]:
+        text = random.choice(EXTRA_TEMPLATES["NB"])
+    elif o in ["BY", "LB", "Bye", "LegBye"]:
+        text = random.choice(EXTRA_TEMPLATES["BY"])
+    else:
+        text = random.choice(GENERIC_COMMENTS)
+
+    return f"{bowler} to {striker} — {text}"
+
+
+DOT_TEMPLATES = ["No runs. Dot ball.", "Tight bowling — dot ball."]
+
+# flat, append-only template table: a stored template id must keep its meaning
+TEMPLATES = ["It's a HUGE SIX!", "That's a FOUR!"] + RUN_TEMPLATES + DOT_TEMPLATES + WICKET_TEMPLATES \
+    + EXTRA_TEMPLATES["WD"] + EXTRA_TEMPLATES["NB"] + EXTRA_TEMPLATES["BY"] + EXTRA_TEMPLATES["LB"] + GENERIC_COMMENTS
+
+
+def _ids(group):
+    return [TEMPLATES.index(t) for t in group]
+
+
+# outcome -> template ids it may use (same choices as pick_commentary)
+TEMPLATE_POOLS = {
+    "6": [0],
+    "4": [1],
+    "1": _ids(RUN_TEMPLATES), "2": _ids(RUN_TEMPLATES), "3": _ids(RUN_TEMPLATES),
+    "0": _ids(DOT_TEMPLATES),
+    "W": _ids(WICKET_TEMPLATES),
+    "WD": _ids(EXTRA_TEMPLATES["WD"]),
+    "NB": _ids(EXTRA_TEMPLATES["NB"]),
+    "BY": _ids(EXTRA_TEMPLATES["BY"]),
+    "LB": _ids(EXTRA_TEMPLATES["LB"]),
+}
+GENERIC_POOL = _ids(GENERIC_COMMENTS)
+
+
+def commentary_seed(state):
+    return int(state.get("commentary_seed", 0) or 0)
+
+
+def template_for(outcome, seed, idx):
+    pool = TEMPLATE_POOLS.get(str(outcome), GENERIC_POOL)
+    if len(pool) == 1:
+        return pool[0]
+    return pool[random.Random(seed * 100003 + idx).randrange(len(pool))]
+
+
+def commentary_ref(state, idx):
+    """Ring-buffer entry for ball ``idx`` of the log."""
+    seed = commentary_seed(state)
+    rec = state["balls_log"][idx]
+    return [idx, template_for(OUTCOMES[rec[CODE]], seed, idx), seed]
+
+
+def push_commentary(state, idx):
+    """Reference ball ``idx`` in the ring buffer (called after the ball is logged)."""
+    buf = state.setdefault("commentary", [])
+    buf.append(commentary_ref(state, idx))
+    if len(buf) > COMMENTARY_WINDOW:
+        del buf[:len(buf) - COMMENTARY_WINDOW]
+
+
+def pop_commentary(state):
+    """Drop the ref of the ball just undone and refill the window from the log."""
+    buf = state.get("commentary")
+    n = len(state.get("balls_log", []))
+    while buf and buf[-1][0] >= n:
+        buf.pop()
+    while buf and len(buf) < COMMENTARY_WINDOW and buf[0][0] > 0:
+        buf.insert(0, commentary_ref(state, buf[0][0] - 1))
+
+
+def rebuild_commentary(state):
+    n = len(state.get("balls_log", []))
+    state["commentary"] = [commentary_ref(state, i) for i in range(max(0, n - COMMENTARY_WINDOW), n)]
+
+
+def render_commentary(ball, tid):
+    """Text for an expanded ball (see mpgb.roster.expand_ball) and template id."""
+    text = TEMPLATES[tid] if 0 <= tid < len(TEMPLATES) else GENERIC_COMMENTS[0]
+    over = format_over_ball(ball.get("post_score", {}).get("balls", 0))
+    return f"{over} — {ball.get('bowler') or 'Bowler'} to {ball.get('striker') or 'Batsman'} — {text}"
+
+
+def recent_commentary(state, n):
+    """Last ``n`` commentary lines, newest first, rendered from the ring buffer."""
+    refs = state.get("commentary", [])[-n:] if n else []
+    if not refs:
+        return []
+    log_len = len(state.get("balls_log", []))
+    balls = recent_balls(state, log_len - refs[0][0])  # newest first
+    out = []
+    for idx, tid, _seed in reversed(refs):
+        pos = log_len - 1 - idx
+        if 0 <= pos < len(balls):
+            out.append(render_commentary(balls[pos], tid))
+    return out
+
+
+def full_commentary(state):
+    """Commentary for every ball in order, generated from the log (recap / export)."""
+    seed = commentary_seed(state)
+    return [render_commentary(b, template_for(b["outcome"], seed, i)) for i, b in enumerate(all_balls(state))]
@@ -0,0 +1,677 @@
+# mpgb/engine.py - UI-free scoring engine
+#
+# The functions at module level are pure state transitions on a match state
+# dict (no I/O). ScoringEngine wraps them with persistence through a
+# MatchStore, so Streamlit, batch jobs and load tests share one code path.
+
+import copy
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .balls import INN, CODE, S, NS, BW, NB, NI, C_W, outcome_code, wicket_code, extra_runs, deltas, swaps_strike, is_legal
+from .commentary import push_commentary, pop_commentary
+from .match import Match, TEAM_A, TEAM_B, empty_score, other_team
+from .metrics import get_metrics, instrumented
+from .overs import add_ball as add_ball_to_overs, remove_ball as remove_ball_from_overs, ensure_overs_detail
+from .partnerships import add_ball as add_ball_to_partnerships, remove_ball as remove_ball_from_partnerships, ensure_partnerships
+from .roster import UNKNOWN_BOWLER, name_of, team_ids, innings_team, intern_player, resolve_player, expand_ball
+from .schema import migrate_state
+from .storage import MatchStore
+
+SCORER_LOCK_MINUTES = 15
+SHARED_CACHE_SIZE = 32  # parsed states kept for load_shared()
+COMMAND_WINDOW = 64     # recent client command IDs remembered per match
+
+
+def new_match_id():
+    return datetime.now().strftime("%Y%m%d") + "-" + uuid.uuid4().hex[:6].upper()
+
+
+# ---------------- State transitions ----------------
+def _bump(stats, key, vals, sign):
+    rec = stats.setdefault(key, dict.fromkeys(vals, 0))
+    for k, v in vals.items():
+        if v:
+            rec[k] = rec.get(k, 0) + sign * v
+
+
+def apply_stats(state, rec, sign=1):
+    """Add (sign=1) or remove (sign=-1) one ball record's effect on score and player stats."""
+    team_runs, wkts, legal, bat_runs, faced, bowl_runs, bowl_balls, bowl_wkts, fours, sixes = deltas(rec)
+    sc = state.setdefault("score", {}).setdefault(innings_team(state, rec[INN]), empty_score())
+    sc["runs"] = sc.get("runs", 0) + sign * team_runs
+    sc["wkts"] = sc.get("wkts", 0) + sign * wkts
+    sc["balls"] = sc.get("balls", 0) + sign * legal
+    if rec[S] >= 0:
+        _bump(state.setdefault("batsman_stats", {}), str(rec[S]), {"R": bat_runs, "B": faced, "4": fours, "6": sixes}, sign)
+    if rec[BW] >= 0:
+        _bump(state.setdefault("bowler_stats", {}), str(rec[BW]), {"B": bowl_balls, "R": bowl_runs, "W": bowl_wkts, "M": 0}, sign)
+
+
+def _next_batsman(state, rec):
+    """(incoming id, next_index after the wicket) for a wicket record."""
+    nxt = rec[NI] if rec[NI] >= 0 else state.get("batting", {}).get("next_index", 0)
+    if rec[NB] >= 0:
+        return rec[NB], nxt
+    order = state.get("batting", {}).get("order", [])
+    while nxt < len(order):
+        cand = order[nxt]
+        nxt += 1
+        if cand not in (rec[S], rec[NS]):
+            return cand, nxt
+    return -1, nxt
+
+
+def advance_crease(state, rec):
+    """Move the batsmen after ``rec`` (strike rotation, incoming batsman)."""
+    batting = state.setdefault("batting", {})
+    if swaps_strike(rec):
+        batting["striker"], batting["non_striker"] = rec[NS], rec[S]
+    else:
+        batting["striker"], batting["non_striker"] = rec[S], rec[NS]
+    if rec[CODE] == C_W:
+        incoming, nxt = _next_batsman(state, rec)
+        batting["next_index"] = nxt
+        if incoming >= 0:
+            batting["striker"] = incoming
+            state.setdefault("batsman_stats", {}).setdefault(str(incoming), {"R": 0, "B": 0, "4": 0, "6": 0})
+
+
+def apply_ball(state, outcome, extras=None, wicket_info=None, at=None):
+    """Apply one delivery to ``state`` in place; returns the expanded ball (or a stop dict).
+
+    ``at`` is when it was bowled (epoch seconds, default now) - queued deliveries keep their own time.
+    """
+    if extras is None:
+        extras = {}
+
+    if state.get("status") == "COMPLETED":
+        return {"stopped": True, "reason": "Match already completed"}
+    if state.get("status") not in ("INNINGS1", "INNINGS2"):
+        return {"stopped": True, "reason": "Innings not active"}
+
+    bat_team = state.get("bat_team", TEAM_A)
+    batting = state.setdefault("batting", {})
+    bowling = state.setdefault("bowling", {})
+    striker = batting.get("striker", -1)
+    non_striker = batting.get("non_striker", -1)
+    bowler = bowling.get("current_bowler", -1)
+    if bowler is None or bowler < 0:
+        bowler = intern_player(state, UNKNOWN_BOWLER, other_team(bat_team))
+
+    code = outcome_code(outcome)
+    new_bat = -1
+    if code == C_W and wicket_info and wicket_info.get("new_batsman") not in (None, ""):
+        new_bat = resolve_player(state, wicket_info.get("new_batsman"), bat_team)
+    rec = [
+        max(0, int((time.time() if at is None else float(at)) - float(state.get("t0", 0) or 0))),
+        int(state.get("innings", 1) or 1),
+        code,
+        extra_runs(code, extras),
+        wicket_code(wicket_info) if code == C_W else 0,
+        striker,
+        non_striker,
+        bowler,
+        new_bat,
+        batting.get("next_index", -1),
+    ]
+    sc = apply_record(state, rec)
+    return expand_ball(state, rec, post_score=dict(sc))
+
+
+def apply_record(state, rec):
+    """Apply a built ball record to ``state`` in place (live scoring and replay); returns the batting score."""
+    bat_team = innings_team(state, rec[INN])
+    bowling = state.setdefault("bowling", {})
+    for pid in (rec[S], rec[NS]):
+        if pid >= 0:
+            state.setdefault("batsman_stats", {}).setdefault(str(pid), {"R": 0, "B": 0, "4": 0, "6": 0})
+    apply_stats(state, rec)
+    advance_crease(state, rec)
+
+    overs = ensure_overs_detail(state)
+    ensure_partnerships(state)
+    state.setdefault("balls_log", []).append(rec)
+    over = add_ball_to_overs(overs, rec, bat_team)
+    if over["maiden"]:
+        _bump(state["bowler_stats"], str(over["bowler"]), {"M": 1}, 1)
+
+    sc = state["score"][bat_team]
+    add_ball_to_partnerships(state, rec, sc)
+    push_commentary(state, len(state["balls_log"]) - 1)
+
+    if is_legal(rec) and sc.get("balls", 0) % 6 == 0:
+        bowling["over_needs_change"] = True
+
+    check_innings_end(state)
+    return sc
+
+
+def check_innings_end(state):
+    bat_team = state.get("bat_team", TEAM_A)
+    sc = state.get("score", {}).get(bat_team, empty_score())
+    team_size = len(state.get("teams", {}).get(bat_team, []))
+    overs_limit = int(state.get("overs_limit", 0) or 0)
+    overs_reached = overs_limit > 0 and sc.get("balls", 0) >= overs_limit * 6
+    all_out = team_size > 0 and sc.get("wkts", 0) >= max(0, team_size - 1)
+    if overs_reached or all_out:
+        if state.get("status") == "INNINGS1":
+            start_second_innings(state)
+        else:
+            state["status"] = "COMPLETED"
+
+
+def start_second_innings(state):
+    chasing = other_team(state.get("bat_team", TEAM_A))
+    order = team_ids(state, chasing)
+    state["status"] = "INNINGS2"
+    state["innings"] = 2
+    state["bat_team"] = chasing
+    state["batting"] = {"striker": order[0] if len(order)>0 else -1, "non_striker": order[1] if len(order)>1 else -1, "order": order[:], "next_index": 2}
+    state["bowling"] = {"current_bowler": -1, "last_over_bowler": state.get("bowling", {}).get("current_bowler", -1), "over_needs_change": False}
+
+
+def undo_ball(state):
+    """Revert the last delivery in place; returns False when there is nothing to undo."""
+    if not state.get("balls_log"):
+        return False
+    ensure_overs_detail(state)
+    ensure_partnerships(state)
+    rec = state["balls_log"].pop()
+    last = state["overs_detail"][-1] if state["overs_detail"] else None
+    if last is not None and last["maiden"]:
+        _bump(state.setdefault("bowler_stats", {}), str(last["bowler"]), {"M": 1}, -1)  # the over is no longer complete
+    remove_ball_from_overs(state["overs_detail"], rec)
+    remove_ball_from_partnerships(state, rec)
+    apply_stats(state, rec, sign=-1)
+
+    team = innings_team(state, rec[INN])
+    state["status"] = f"INNINGS{rec[INN]}"
+    state["innings"] = rec[INN]
+    state["bat_team"] = team
+    state["batting"] = {
+        "striker": rec[S],
+        "non_striker": rec[NS],
+        "order": team_ids(state, team),
+        "next_index": rec[NI] if rec[NI] >= 0 else state.get("batting", {}).get("next_index", 0),
+    }
+    # who walked in on this wicket, worked out as advance_crease() did (the innings may have moved on since)
+    incoming = _next_batsman(state, rec)[0] if rec[CODE] == C_W else -1
+
+    # drop stat lines a replay of the remaining log would not have: empty ones
+    # of batsmen in no remaining record (openers before the first ball, the
+    # batsman who walked in on this wicket) - unless the previous ball was a
+    # wicket that brought them in - and an empty bowler line
+    log = state["balls_log"]
+    walked_in = bool(log) and log[-1][INN] == rec[INN] and log[-1][CODE] == C_W
+    for pid in {rec[S], rec[NS], incoming}:
+        vals = state.get("batsman_stats", {}).get(str(pid))
+        if vals is None or any(vals.values()) or (walked_in and pid in (rec[S], rec[NS])):
+            continue
+        if not any(pid in (r[S], r[NS]) for r in log):
+            state["batsman_stats"].pop(str(pid), None)
+    vals = state.get("bowler_stats", {}).get(str(rec[BW]))
+    if vals is not None and not any(vals.values()):
+        state["bowler_stats"].pop(str(rec[BW]), None)
+    state["bowling"] = bowling_after_log(state, rec[INN])
+    pop_commentary(state)
+    return True
+
+
+def bowling_after_log(state, innings):
+    """The bowling block as it stood right after the log's last ball of ``innings``.
+
+    Same rules as a replay (replay.replay_record): the bowler of the last ball
+    is current, the last different bowler of the innings is last_over_bowler,
+    and a completed over needs a change. With no ball of ``innings`` left it is
+    the block the innings started with.
+    """
+    log = state.get("balls_log", [])
+    i = len(log) - 1
+    if i < 0 or log[i][INN] != innings:
+        # innings 1: nobody has bowled; innings 2: start_second_innings() kept the last bowler
+        return {"current_bowler": -1, "last_over_bowler": log[i][BW] if i >= 0 else -1, "over_needs_change": False}
+    current = log[i][BW]
+    j = i
+    while j >= 0 and log[j][INN] == innings and log[j][BW] == current:
+        j -= 1
+    last = log[j][BW] if j >= 0 and log[j][INN] == innings else -1
+    balls = state.get("score", {}).get(innings_team(state, innings), {}).get("balls", 0)
+    return {"current_bowler": current, "last_over_bowler": last,
+            "over_needs_change": is_legal(log[i]) and balls > 0 and balls % 6 == 0}
+
+
+def set_next_bowler(state, bowler):
+    """``bowler`` is a roster id or a name (interned into the bowling side)."""
+    bowling = state.setdefault("bowling", {})
+    bowling["last_over_bowler"] = bowling.get("current_bowler", -1)
+    bowling["current_bowler"] = resolve_player(state, bowler, other_team(state.get("bat_team", TEAM_A)))
+    bowling["over_needs_change"] = False
+
+
+@instrumented("scoring.compute_man_of_match")
+def compute_man_of_match(state):
+    best = None
+    best_score = -10**9
+    for p, vals in state.get("batsman_stats", {}).items():
+        runs = int(vals.get("R", 0) or 0)
+        score = runs
+        if score > best_score:
+            best_score = score
+            best = p
+    for p, vals in state.get("bowler_stats", {}).items():
+        wk = int(vals.get("W", 0) or 0)
+        runs_conceded = int(vals.get("R", 0) or 0)
+        score = wk * 25 - (runs_conceded // 10)
+        if score > best_score:
+            best_score = score
+            best = p
+    return name_of(state, best) if best is not None else state.get("man_of_match_override", "")
+
+
+def match_result(state):
+    ta = TEAM_A; tb = TEAM_B
+    ra = int(state.get("score", {}).get(ta, {}).get("runs", 0) or 0)
+    rb = int(state.get("score", {}).get(tb, {}).get("runs", 0) or 0)
+    wa = int(state.get("score", {}).get(ta, {}).get("wkts", 0) or 0)
+    wb = int(state.get("score", {}).get(tb, {}).get("wkts", 0) or 0)
+
+    names = state.get("team_names") or {}
+    if ra == rb:
+        result_text = "Match tied"
+    else:
+        if ra > rb:
+            margin = ra - rb
+            result_text = f"{names.get(TEAM_A, TEAM_A)} won by {margin} runs"
+        else:
+            team_size = max(0, len(team_ids(state, TEAM_A)))  # Team A's squad, as the app always counted
+            wickets_remaining = max(0, team_size - 1 - wb)
+            result_text = f"{names.get(TEAM_B, TEAM_B)} won by {wickets_remaining} wickets"
+
+    motm_auto = compute_man_of_match(state)
+    return {
+        "result_text": result_text,
+        "runs": {TEAM_A: ra, TEAM_B: rb},
+        "wkts": {TEAM_A: wa, TEAM_B: wb},
+        "man_of_match_auto": motm_auto,
+        "completed_at": datetime.utcnow().isoformat()
+    }
+
+
+def acquire_scorer_lock(state, phone, now=None):
+    lock = state.get("scorer_lock", {})
+    now = now or datetime.utcnow()
+    new_lock = {"locked_by": phone, "locked_at": now.isoformat(), "expires_at": (now + timedelta(minutes=SCORER_LOCK_MINUTES)).isoformat()}
+    if not lock or not lock.get("locked_by"):
+        state["scorer_lock"] = new_lock
+        return True
+    try:
+        expires = datetime.fromisoformat(lock.get("expires_at"))
+        if expires < now:
+            state["scorer_lock"] = new_lock
+            return True
+    except:
+        pass
+    return False
+
+
+def release_scorer_lock(state, phone):
+    lock = state.get("scorer_lock", {})
+    if lock.get("locked_by") == phone:
+        state["scorer_lock"] = {}
+        return True
+    return False
+
+
+# ---------------- Idempotent commands ----------------
+def remember_command(state, command_id):
+    """Keep ``command_id`` in the state's window of recent commands (saved with the match)."""
+    recent = state.setdefault("recent_commands", [])
+    recent.append(command_id)
+    del recent[:-COMMAND_WINDOW]
+
+
+def apply_command(state, cmd):
+    """Apply one queued command dict to ``state`` in place; returns {"ok": bool, ...}.
+
+    {"action": "ball", "outcome", "extras", "wicket", "at"} | {"action": "undo"} | {"action": "bowler", "bowler"}
+    """
+    action = cmd.get("action", "ball")
+    if action == "ball":
+        entry = apply_ball(state, str(cmd.get("outcome", "")), extras=cmd.get("extras") or {},
+                           wicket_info=cmd.get("wicket"), at=cmd.get("at"))
+        if entry.get("stopped"):
+            return {"ok": False, "reason": entry.get("reason", "not accepted")}
+        return {"ok": True, "ball": entry}
+    if action == "undo":
+        return {"ok": True} if undo_ball(state) else {"ok": False, "reason": "no ball to undo"}
+    if action == "bowler":
+        if cmd.get("bowler") in (None, ""):
+            return {"ok": False, "reason": "bowler is required"}
+        set_next_bowler(state, cmd["bowler"])
+        return {"ok": True}
+    return {"ok": False, "reason": f"unknown action {action!r}"}
+
+
+class CommandWindow:
+    """Recent command IDs of one match: a set for O(1) lookups, a FIFO for eviction."""
+
+    def __init__(self, size=COMMAND_WINDOW):
+        self.size = size
+        self.ids = set()
+        self.order = deque()
+        self.version = None  # state version the window last merged
+
+    def __contains__(self, command_id):
+        return command_id in self.ids
+
+    def add(self, command_id):
+        if command_id in self.ids:
+            return
+        self.ids.add(command_id)
+        self.order.append(command_id)
+        while len(self.order) > self.size:
+            self.ids.discard(self.order.popleft())
+
+    def discard(self, command_id):
+        if command_id in self.ids:
+            self.ids.discard(command_id)
+            self.order.remove(command_id)
+
+    def sync(self, state):
+        # another process (API, restart) may have saved commands this window never saw
+        version = state.get("version")
+        if version != self.version:
+            for command_id in state.get("recent_commands", []):
+                self.add(command_id)
+            self.version = version
+
+
+# ---------------- Engine (state transitions + persistence) ----------------
+class ScoringEngine:
+    """Scoring commands over a MatchStore. Every mutating call persists the match.
+
+    Listeners are called with the Match after every save (static scoreboards,
+    live-update notifiers); a listener with a ``remove(mid)`` method is also
+    told when a match is deleted, and one with ``finalized(match, summary)``
+    when a match is finalized (tournament tables).
+
+    Scoring commands take an optional client ``command_id``. A command whose
+    ID is among the match's last COMMAND_WINDOW is a repeat (double tap,
+    replayed rerun, client retry) and is dropped without touching the state.
+    """
+
+    def __init__(self, store: MatchStore, listeners=None):
+        self.store = store
+        self.listeners = list(listeners or [])
+        self._shared = OrderedDict()  # mid -> (stamp, read-only Match)
+        self._shared_lock = threading.Lock()
+        self._loading = {}            # mid -> lock held while one reader parses it
+        self._commands = {}           # mid -> CommandWindow
+        self._commands_lock = threading.Lock()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def list_matches(self) -> dict:
+        return self.store.load_index()
+
+    def create_match(self, title, overs, teamA, teamB, venue="", mid=None, extra=None) -> Match:
+        """``extra`` is merged into the new state (e.g. ``team_names``, ``tournament`` link)."""
+        mid = mid or new_match_id()
+        idx = self.store.load_index()
+        idx[mid] = {"title": title, "venue": venue, "overs": int(overs), "teamA": teamA, "teamB": teamB, "created_at": datetime.now().isoformat()}
+        if extra and extra.get("tournament"):
+            idx[mid]["tournament"] = extra["tournament"].get("tid")
+        self.store.save_index(idx)
+        match = Match.new(mid, title, overs, teamA, teamB, venue=venue)
+        match.state.update(extra or {})
+        self.save(match)
+        return match
+
+    def delete_match(self, mid):
+        idx = self.store.load_index()
+        idx.pop(mid, None)
+        self.store.save_index(idx)
+        self.store.delete_state(mid)
+        with self._shared_lock:
+            self._shared.pop(mid, None)
+        with self._commands_lock:
+            self._commands.pop(mid, None)
+        for listener in self.listeners:
+            if hasattr(listener, "remove"):
+                listener.remove(mid)
+
+    def load_match(self, mid) -> Optional[Match]:
+        state = self.store.load_state(mid)
+        if not state:
+            return None
+        migrate_state(state)
+        return Match(mid, state)
+
+    def load_shared(self, mid) -> Optional[Match]:
+        """Read-only Match for viewers, shared across sessions and threads.
+
+        Cached per (mid, store.state_stamp(mid)), so each saved version is
+        parsed once however many public pages, API clients or stats readers
+        ask for it. Scorers use load_match() for a private mutable copy.
+        """
+        stamp = self.store.state_stamp(mid)
+        if stamp is None:
+            return self._load_read_only(mid)
+        with self._shared_lock:
+            hit = self._shared.get(mid)
+            if hit is not None and hit[0] == stamp:
+                self._shared.move_to_end(mid)
+                get_metrics().incr("shared_state_hits")
+                return hit[1]
+            loading = self._loading.setdefault(mid, threading.Lock())
+        with loading:
+            # readers woken by the same ball queue here; only the first one parses
+            with self._shared_lock:
+                hit = self._shared.get(mid)
+                if hit is not None and hit[0] == stamp:
+                    get_metrics().incr("shared_state_hits")
+                    return hit[1]
+            match = self._load_read_only(mid)
+            with self._shared_lock:
+                if match is None:
+                    self._shared.pop(mid, None)
+                else:
+                    self._shared[mid] = (stamp, match)
+                    self._shared.move_to_end(mid)
+                    while len(self._shared) > SHARED_CACHE_SIZE:
+                        self._shared.popitem(last=False)
+            return match
+
+    def _load_read_only(self, mid):
+        get_metrics().incr("shared_state_loads")
+        match = self.load_match(mid)
+        if match is not None:
+            match.read_only = True
+        return match
+
+    def _writable(self, match: Match):
+        if match.read_only:
+            raise ValueError("shared read-only match; use load_match() to change it")
+
+    def save(self, match: Match, command_id=None):
+        self._writable(match)
+        if command_id:
+            remember_command(match.state, command_id)
+        with self._commands_lock:
+            window = self._commands.get(match.mid)
+            if window is not None:
+                window.sync(match.state)
+        # version identifies this exact state for caches (charts, summaries)
+        match.state["version"] = int(match.state.get("version", 0) or 0) + 1
+        self.store.save_state(match.mid, match.state)
+        if window is not None:
+            with self._commands_lock:
+                window.version = match.state["version"]
+        for listener in self.listeners:
+            listener(match)
+
+    # ---- idempotent commands ----
+    def _claim(self, match: Match, command_id) -> bool:
+        """False when ``command_id`` was already applied to this match; otherwise reserve it."""
+        if not command_id:
+            return True
+        with self._commands_lock:
+            window = self._commands.get(match.mid)
+            if window is None:
+                window = self._commands[match.mid] = CommandWindow()
+            window.sync(match.state)
+            if command_id in window:
+                get_metrics().incr("duplicate_commands")
+                return False
+            window.add(command_id)
+            return True
+
+    def _release(self, match: Match, command_id):
+        # the command did not change the match: a retry with the same ID must still work
+        if command_id:
+            with self._commands_lock:
+                window = self._commands.get(match.mid)
+                if window is not None:  # gone if the match was deleted meanwhile
+                    window.discard(command_id)
+
+    def save_status(self, mid) -> dict:
+        return self.store.save_status(mid)
+
+    @instrumented("scoring.record_ball")
+    def record_ball(self, match: Match, outcome, extras=None, wicket_info=None, command_id=None) -> dict:
+        self._writable(match)
+        if not self._claim(match, command_id):
+            return {"stopped": True, "duplicate": True, "reason": "Duplicate command (ball already recorded)"}
+        try:
+            entry = apply_ball(match.state, outcome, extras=extras, wicket_info=wicket_info)
+        except Exception:
+            self._release(match, command_id)
+            raise
+        if entry.get("stopped"):
+            self._release(match, command_id)
+        else:
+            self.save(match, command_id)
+        return entry
+
+    @instrumented("scoring.apply_batch")
+    def apply_batch(self, match: Match, commands) -> list:
+        """Apply queued commands (see apply_command) in order and persist once.
+
+        Returns one result per command; a repeated ``command_id`` gives
+        {"duplicate": True}. Nothing is saved when no command changed the match.
+        The batch runs on a copy of the state, so if a command or the save
+        raises, ``match`` is left as it was and every ID is free for a retry.
+        """
+        self._writable(match)
+        work = copy.deepcopy(match.state)
+        results, claimed, applied = [], [], 0
+        try:
+            for cmd in commands:
+                cid = cmd.get("command_id")
+                if not self._claim(match, cid):
+                    results.append({"command_id": cid, "ok": True, "duplicate": True})
+                    continue
+                claimed.append(cid)
+                res = apply_command(work, cmd)
+                if res["ok"]:
+                    applied += 1
+                    if cid:
+                        remember_command(work, cid)
+                else:
+                    claimed.pop()
+                    self._release(match, cid)
+                results.append({"command_id": cid, **res})
+            if applied:
+                original, match.state = match.state, work
+                try:
+                    self.save(match)
+                except Exception:
+                    match.state = original
+                    raise
+        except Exception:
+            for cid in claimed:
+                self._release(match, cid)  # nothing was saved: a retry must apply them
+            raise
+        get_metrics().incr("batched_commands", applied)
+        return results
+
+    @instrumented("scoring.undo_last_ball")
+    def undo_last_ball(self, match: Match, command_id=None) -> bool:
+        """True when a ball was undone - or when this command already undid one."""
+        self._writable(match)
+        if not self._claim(match, command_id):
+            return True
+        if not undo_ball(match.state):
+            self._release(match, command_id)
+            return False
+        self.save(match, command_id)
+        return True
+
+    def set_next_bowler(self, match: Match, bowler, command_id=None):
+        self._writable(match)
+        if not self._claim(match, command_id):
+            return
+        try:
+            set_next_bowler(match.state, bowler)
+        except Exception:
+            self._release(match, command_id)
+            raise
+        self.save(match, command_id)
+
+    @instrumented("scoring.finalize_match")
+    def finalize(self, match: Match) -> dict:
+        self._writable(match)
+        state = match.state
+        if state.get("status") != "COMPLETED":
+            state["status"] = "COMPLETED"
+        summary = match_result(state)
+        state["man_of_match_auto"] = summary["man_of_match_auto"]
+        state["final_summary"] = summary
+
+        self.store.write_final(match.mid, state)
+
+        idx = self.store.load_index()
+        if match.mid in idx:
+            idx[match.mid]["completed_at"] = summary["completed_at"]
+            idx[match.mid]["final_summary_brief"] = {"result": summary["result_text"], "motm": summary["man_of_match_auto"]}
+            self.store.save_index(idx)
+
+        self.save(match)
+        for listener in self.listeners:
+            if hasattr(listener, "finalized"):
+                listener.finalized(match, summary)
+        return summary
+
+    @instrumented("scoring.restore_to_ball")
+    def restore_to_ball(self, match: Match, n, timeline=None) -> Match:
+        """Rewind ``match`` to how it stood after ball ``n`` (replayed from its own log) and save it."""
+        from .replay import Timeline, META_FIELDS  # replay builds on this module
+        self._writable(match)
+        restored = (timeline or Timeline(match.state)).state_at(n)
+        for key in META_FIELDS:
+            if key in match.state:
+                restored[key] = match.state[key]
+        match.state.clear()
+        match.state.update(restored)
+        self.save(match)
+        return match
+
+    def try_acquire_scorer_lock(self, match: Match, phone) -> bool:
+        self._writable(match)
+        if acquire_scorer_lock(match.state, phone):
+            self.save(match)
+            return True
+        return False
+
+    def release_scorer_lock(self, match: Match, phone) -> bool:
+        self._writable(match)
+        if release_scorer_lock(match.state, phone):
+            self.save(match)
+            return True
+        return False
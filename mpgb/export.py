@@ -0,0 +1,46 @@
+# mpgb/export.py - scorecard export helpers (JSON / CSV bytes, no pandas)
+
+import io
+import csv
+import json
+
+from .commentary import full_commentary
+from .roster import all_balls
+
+
+def export_match_json(state):
+    # the state keeps commentary as refs; downloads get the full text
+    return json.dumps(dict(state, commentary=full_commentary(state)), indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def ball_rows(state, with_scores=False):
+    rows = []
+    for b, text in zip(all_balls(state), full_commentary(state)):
+        row = {
+            "time": b.get("time"),
+            "outcome": b.get("outcome"),
+            "striker": b.get("striker"),
+            "non_striker": b.get("non_striker"),
+            "bowler": b.get("bowler"),
+            "extras": json.dumps(b.get("extras", {}), ensure_ascii=False),
+            "wicket": json.dumps(b.get("wicket", {}), ensure_ascii=False),
+            "commentary": text,
+        }
+        if with_scores:
+            row["prev_runs"] = b.get("prev_score", {}).get("runs")
+            row["post_runs"] = b.get("post_score", {}).get("runs")
+        rows.append(row)
+    return rows
+
+
+def rows_to_csv(rows):
+    out = io.StringIO()
+    if rows:
+        w = csv.DictWriter(out, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        w.writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+def export_match_csv(state):
+    return rows_to_csv(ball_rows(state))
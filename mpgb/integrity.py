@@ -0,0 +1,375 @@
+# mpgb/integrity.py - data-directory integrity check and derived-stats rebuild
+#
+#   python -m mpgb.integrity [--dir data] [--rebuild] [--workers N] [--json]
+#
+# The app's loaders are forgiving (load_json returns {} on any error, a
+# missing state just looks like "no match"), so a crash or a hand edit can
+# corrupt data/ without anyone noticing. This scans every match state,
+# backup and CSV and reports what it finds:
+#
+#   unreadable  file cannot be read or decoded (any state format)
+#   schema      missing/mistyped keys, ball records that are not 10 ints,
+#               player ids outside the roster, schema newer than this code
+#   score       team score differs from the sum of the ball log's deltas
+#   totals      batsman runs + extras, or bowler runs + byes/leg byes, do not
+#               add up to the innings total
+#   derived     stats, overs_detail, partnerships, fow or commentary differ
+#               from a replay of the ball log (mpgb/replay.py)
+#   index       matches_index.json entry without a state file, state file
+#               missing from the index, or a state whose mid is not its file's
+#   csv / json  members.csv, Members_Paid.csv, tournaments.json, matchups.json
+#
+# State files and backups are checked in a process pool (one file per task,
+# replay is CPU bound), so a season of a few hundred matches takes seconds.
+# --rebuild writes the replayed aggregates back over the derived fields of
+# states that need it (ball log and match setup are never touched) and
+# re-indexes matchups.json. Run it with the app stopped, or at least with no
+# match being scored.
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .balls import INN, S, NS, BW, NB, deltas
+from .match import TEAM_A, TEAM_B, SCHEMA_VERSION
+from .members import FIELDS as MEMBER_FIELDS, parse_member_id
+from .metrics import get_metrics
+from .replay import initial_state, replay_record
+from .roster import innings_team
+from .schema import migrate_state
+from .serialize import detect_format, get_serializer, loads
+from .storage import read_bytes, write_bytes_atomic
+from .util import normalize_mobile
+
+STATE_FILE = re.compile(r"^match_(.+)_state\.json$")
+BACKUP_FILE = re.compile(r"^match_(.+?)_(backup|final)_\d{8}T\d{6}Z\.(json|csv)$")
+DERIVED_FIELDS = ("score", "batsman_stats", "bowler_stats", "overs_detail", "partnerships", "fow", "commentary")
+REQUIRED = {"mid": str, "teams": dict, "roster": list, "balls_log": list, "score": dict,
+            "batsman_stats": dict, "bowler_stats": dict}
+STATUSES = ("INNINGS1", "INNINGS2", "COMPLETED")
+JSON_DOCS = ("matchups.json", "tournaments.json")
+MAX_ISSUES_PER_FILE = 20
+
+
+def _issue(path, kind, detail):
+    return {"path": path, "kind": kind, "detail": detail}
+
+
+# ---------------- one match state ----------------
+def _schema_issues(state):
+    out = []
+    for key, typ in REQUIRED.items():
+        if not isinstance(state.get(key), typ):
+            out.append(f"{key!r} missing or not a {typ.__name__}")
+    if out:
+        return out
+    if int(state.get("schema", SCHEMA_VERSION) or 1) > SCHEMA_VERSION:
+        out.append(f"schema {state['schema']} is newer than this code ({SCHEMA_VERSION})")
+    if state.get("status") not in STATUSES:
+        out.append(f"unknown status {state.get('status')!r}")
+    n = len(state["roster"])
+    for team in (TEAM_A, TEAM_B):
+        ids = state["teams"].get(team)
+        if not isinstance(ids, list) or any(not isinstance(p, int) or not 0 <= p < n for p in ids):
+            out.append(f"teams[{team!r}] is not a list of roster ids")
+    for i, rec in enumerate(state["balls_log"]):
+        if not isinstance(rec, list) or len(rec) != 10 or any(not isinstance(v, int) for v in rec):
+            out.append(f"ball {i + 1}: not a 10-int record")
+        elif rec[INN] not in (1, 2) or any(p >= n for p in (rec[S], rec[NS], rec[BW], rec[NB])):
+            out.append(f"ball {i + 1}: innings or player id out of range")
+        if len(out) >= MAX_ISSUES_PER_FILE:
+            break
+    return out
+
+
+def _nonzero(stats):
+    return {k: {f: v for f, v in vals.items() if v} for k, vals in stats.items() if any(vals.values())}
+
+
+def _totals_issues(state):
+    """Score vs the log, and player totals vs innings totals (per innings)."""
+    out = []
+    expect, players = {}, {}
+    for rec in state["balls_log"]:
+        team_runs, wkts, legal, bat_runs, _, bowl_runs = deltas(rec)[:6]
+        team = innings_team(state, rec[INN])
+        t = expect.setdefault(team, [0, 0, 0, 0, 0])  # runs, wkts, balls, extras, runs not off the bowler
+        t[0] += team_runs
+        t[1] += wkts
+        t[2] += legal
+        t[3] += team_runs - bat_runs
+        t[4] += team_runs - bowl_runs
+        bats, bowls = players.setdefault(team, (set(), set()))
+        bats.update(p for p in (rec[S], rec[NS]) if p >= 0)
+        bowls.add(rec[BW])
+    bat, bowl = state["batsman_stats"], state["bowler_stats"]
+    for team, (runs, wkts, balls, extras, unbowled) in expect.items():
+        sc = state["score"].get(team, {})
+        got = (sc.get("runs", 0), sc.get("wkts", 0), sc.get("balls", 0))
+        if got != (runs, wkts, balls):
+            out.append(("score", f"{team}: score {got[0]}/{got[1]} in {got[2]} balls, ball log says {runs}/{wkts} in {balls}"))
+        bats, bowls = players[team]
+        bat_runs = sum(bat.get(str(p), {}).get("R", 0) for p in bats)
+        if bat_runs + extras != sc.get("runs", 0):
+            out.append(("totals", f"{team}: batsmen {bat_runs} + extras {extras} != {sc.get('runs', 0)}"))
+        bowlers = [bowl.get(str(p), {}) for p in bowls if p >= 0]
+        bowl_runs = sum(b.get("R", 0) for b in bowlers)
+        if bowl_runs + unbowled != sc.get("runs", 0):
+            out.append(("totals", f"{team}: bowlers {bowl_runs} + byes/leg byes {unbowled} != {sc.get('runs', 0)}"))
+        if sum(b.get("B", 0) for b in bowlers) != sc.get("balls", 0):
+            out.append(("totals", f"{team}: bowlers' balls do not add up to {sc.get('balls', 0)}"))
+    return out
+
+
+def replay_derived(state):
+    """{field: value} of DERIVED_FIELDS recomputed from the ball log alone."""
+    cur = initial_state(state)
+    for rec in state.get("balls_log", []):
+        replay_record(cur, rec)
+    return {key: cur.get(key) for key in DERIVED_FIELDS}
+
+
+def _same(key, a, b):
+    if key in ("batsman_stats", "bowler_stats"):
+        return _nonzero(a or {}) == _nonzero(b or {})  # empty lines of batsmen who never faced are harmless
+    if key == "score":
+        return {t: s for t, s in (a or {}).items() if any(s.values())} == {t: s for t, s in (b or {}).items() if any(s.values())}
+    return (a or []) == (b or [])
+
+
+def _content_issues(state):
+    """([(kind, detail)] for score, totals and derived fields, replayed derived fields)."""
+    found = _totals_issues(state)
+    fresh = replay_derived(state)
+    stale = [key for key in DERIVED_FIELDS if not _same(key, state.get(key), fresh[key])]
+    if stale:
+        found.append(("derived", "differs from a replay of the ball log: " + ", ".join(stale)))
+    return found, fresh
+
+
+def check_state_file(path, rebuild=False):
+    """Report for one match_<mid>_state.json (runs in a pool worker)."""
+    report = {"path": path, "mid": None, "balls": 0, "issues": [], "rebuilt": False}
+    try:
+        data = read_bytes(path)
+        state = loads(data)
+    except Exception as e:
+        report["issues"].append(_issue(path, "unreadable", f"{type(e).__name__}: {e}"))
+        return report
+    if not isinstance(state, dict) or not state:
+        report["issues"].append(_issue(path, "unreadable", "empty or not an object"))
+        return report
+    report["mid"] = state.get("mid")
+    try:
+        migrated = migrate_state(state)  # older schemas are checked as the app would load them
+    except Exception as e:
+        report["issues"].append(_issue(path, "schema", f"cannot be migrated: {type(e).__name__}: {e}"))
+        return report
+    problems = _schema_issues(state)
+    if problems:
+        report["issues"] += [_issue(path, "schema", p) for p in problems]
+        return report  # nothing below is safe on a malformed state
+    report["balls"] = len(state["balls_log"])
+    try:
+        found, fresh = _content_issues(state)
+    except Exception as e:
+        report["issues"].append(_issue(path, "derived", f"ball log does not replay: {type(e).__name__}: {e}"))
+        return report
+    report["issues"] += [_issue(path, kind, p) for kind, p in found]
+    if rebuild and (found or migrated):
+        state.update(fresh)
+        state["version"] = int(state.get("version", 0) or 0) + 1  # caches keyed by version must re-read it
+        fmt, compression = detect_format(data)
+        if fmt == "json" and not data.lstrip().startswith(b"{\n"):
+            fmt = "json-compact"
+        write_bytes_atomic(path, get_serializer(fmt + ("+" + compression if compression else "")).dumps(state), fsync=True)
+        report["rebuilt"] = True
+        # only what the rebuilt state no longer shows counts as fixed (a bad ball log stays bad)
+        left = set(_content_issues(state)[0])
+        for i in report["issues"]:
+            i["fixed"] = (i["kind"], i["detail"]) not in left
+        report["issues"] += [_issue(path, kind, p) for kind, p in sorted(left - set(found))]
+    return report
+
+
+def check_backup_file(path):
+    """Issues for one file under backups/ (runs in a pool worker)."""
+    try:
+        data = read_bytes(path)
+        if path.endswith(".csv"):
+            rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+            if rows and len({len(r) for r in rows}) > 1:
+                return [_issue(path, "backup", "rows have different numbers of columns")]
+            return []
+        state = loads(data)
+    except Exception as e:
+        return [_issue(path, "backup", f"unreadable: {type(e).__name__}: {e}")]
+    if not isinstance(state, dict) or not isinstance(state.get("balls_log"), list):
+        return [_issue(path, "backup", "not a match state")]
+    return []
+
+
+# ---------------- CSVs, JSON documents, index ----------------
+def check_members_csv(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        reader = csv.DictReader(io.StringIO(read_bytes(path).decode("utf-8-sig")))
+        rows = list(reader)
+    except Exception as e:
+        return [_issue(path, "csv", f"unreadable: {type(e).__name__}: {e}")]
+    out = []
+    header = reader.fieldnames or []
+    if header != MEMBER_FIELDS:
+        out.append(_issue(path, "csv", f"header {header} != {MEMBER_FIELDS}"))
+    current = {}
+    for line, r in enumerate(rows, start=2):
+        if parse_member_id(r.get("MemberID")) is None:
+            out.append(_issue(path, "csv", f"line {line}: bad MemberID {r.get('MemberID')!r}"))
+            continue
+        if len(normalize_mobile(r.get("Mobile"))) != 10:
+            out.append(_issue(path, "csv", f"line {line}: mobile {r.get('Mobile')!r} is not 10 digits"))
+        current[r["MemberID"]] = r  # append-only file: the last line for an ID wins
+    owners = {}
+    for member_id, r in current.items():
+        owners.setdefault(normalize_mobile(r.get("Mobile")), []).append(member_id)
+    for mobile, ids in owners.items():
+        if mobile and len(ids) > 1:
+            out.append(_issue(path, "csv", f"mobile {mobile} is registered to {', '.join(sorted(ids))}"))
+    seq_path = os.path.splitext(path)[0] + ".seq"
+    top = max((parse_member_id(k) for k in current), default=0)
+    if os.path.exists(seq_path):
+        try:
+            with open(seq_path, encoding="utf-8") as f:
+                seq = int(f.read().strip() or 0)
+        except ValueError:
+            out.append(_issue(seq_path, "csv", "sequence file is not a number"))
+        else:
+            if seq < top:
+                out.append(_issue(seq_path, "csv", f"sequence {seq} is behind the highest MemberID {top}"))
+    return out
+
+
+def check_paid_csv(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        rows = list(csv.reader(io.StringIO(read_bytes(path).decode("utf-8-sig"))))
+    except Exception as e:
+        return [_issue(path, "csv", f"unreadable: {type(e).__name__}: {e}")]
+    bad = [r[0] for r in rows[1:] if r and r[0].strip() and len(normalize_mobile(r[0])) != 10]
+    return [_issue(path, "csv", f"{len(bad)} entries are not 10-digit mobiles, e.g. {bad[0]!r}")] if bad else []
+
+
+def check_json_doc(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        doc = json.loads(read_bytes(path).decode("utf-8"))
+    except Exception as e:
+        return [_issue(path, "json", f"unreadable: {type(e).__name__}: {e}")]
+    return [] if isinstance(doc, dict) else [_issue(path, "json", "not an object")]
+
+
+def check_index(data_dir, state_mids):
+    """Index entries vs state files on disk; ``state_mids`` maps file mid -> mid stored inside."""
+    path = os.path.join(data_dir, "matches_index.json")
+    if not os.path.exists(path):
+        return [_issue(path, "index", "missing")] if state_mids else []
+    try:
+        idx = json.loads(read_bytes(path).decode("utf-8"))
+    except Exception as e:
+        return [_issue(path, "index", f"unreadable: {type(e).__name__}: {e}")]
+    out = []
+    for mid in sorted(set(idx) - set(state_mids)):
+        out.append(_issue(path, "index", f"{mid} is listed but has no state file"))
+    for mid in sorted(set(state_mids) - set(idx)):
+        out.append(_issue(path, "index", f"state file for {mid} is not in the index"))
+    for mid, inner in sorted(state_mids.items()):
+        if inner is not None and inner != mid:
+            out.append(_issue(path, "index", f"match_{mid}_state.json holds match {inner!r}"))
+    return out
+
+
+# ---------------- whole directory ----------------
+def check_data_dir(data_dir="data", rebuild=False, workers=None, backups=True):
+    """Check everything under ``data_dir``; returns a report dict (see format_report)."""
+    t0 = time.perf_counter()
+    names = sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []
+    state_files = {m.group(1): os.path.join(data_dir, n) for n in names for m in [STATE_FILE.match(n)] if m}
+    backup_dir = os.path.join(data_dir, "backups")
+    backup_files = []
+    if backups and os.path.isdir(backup_dir):
+        backup_files = [os.path.join(backup_dir, n) for n in sorted(os.listdir(backup_dir)) if BACKUP_FILE.match(n)]
+
+    issues, states = [], []
+    paths = list(state_files.values())
+    # spawn, not fork: the app calls this from a process whose other threads (state writer,
+    # watcher, API) may hold locks that a forked child would inherit locked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        n = max(1, (workers or os.cpu_count() or 1) * 4)
+        states = list(pool.map(check_state_file, paths, [rebuild] * len(paths), chunksize=max(1, len(paths) // n)))
+        for found in pool.map(check_backup_file, backup_files, chunksize=max(1, len(backup_files) // n)):
+            issues += found
+    for r in states:
+        issues += r["issues"]
+
+    issues += check_index(data_dir, {mid: r["mid"] for mid, r in zip(state_files, states)})
+    issues += check_members_csv(os.path.join(data_dir, "members.csv"))
+    issues += check_paid_csv(os.path.join(data_dir, "Members_Paid.csv"))
+    for name in JSON_DOCS:
+        issues += check_json_doc(os.path.join(data_dir, name))
+
+    rebuilt = [r["mid"] for r in states if r["rebuilt"]]
+    if rebuild:
+        from .engine import ScoringEngine
+        from .matchups import MatchupIndex
+        from .storage import FileStore
+        MatchupIndex(os.path.join(data_dir, "matchups.json")).build(ScoringEngine(FileStore(data_dir, async_writes=False)))
+    get_metrics().incr("integrity_checks")
+    return {"dir": data_dir, "matches": len(state_files), "balls": sum(r["balls"] for r in states),
+            "backups": len(backup_files), "issues": issues, "rebuilt": rebuilt,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def format_report(report):
+    lines = [f"{report['dir']}: {report['matches']} matches ({report['balls']} balls), "
+             f"{report['backups']} backups checked in {report['seconds']} s"]
+    by_kind = {}
+    for i in report["issues"]:
+        by_kind.setdefault(i["kind"], []).append(i)
+    for kind, found in sorted(by_kind.items()):
+        lines.append(f"\n{kind} ({len(found)})")
+        lines += [f"  {os.path.basename(i['path'])}: {i['detail']}" + (" [rebuilt]" if i.get("fixed") else "") for i in found]
+    if report["rebuilt"]:
+        lines.append(f"\nrebuilt derived stats of {len(report['rebuilt'])} match(es): {', '.join(map(str, report['rebuilt']))}")
+    if not report["issues"]:
+        lines.append("no problems found")
+    elif all(i.get("fixed") for i in report["issues"]):
+        lines.append("all problems fixed by the rebuild")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mpgb.integrity")
+    ap.add_argument("--dir", default="data", help="data directory (default: data)")
+    ap.add_argument("--rebuild", action="store_true", help="rewrite derived stats from the ball log and re-index matchups")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--skip-backups", action="store_true", help="do not decode every file under backups/")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    report = check_data_dir(args.dir, rebuild=args.rebuild, workers=args.workers, backups=not args.skip_backups)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 1 if any(not i.get("fixed") for i in report["issues"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
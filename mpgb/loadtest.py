@@ -0,0 +1,180 @@
+# mpgb/loadtest.py - one scorer plus N public viewers against the engine (no external services)
+#
+#   python -m mpgb.loadtest --viewers 200 [--mode poll|push] [--poll 5] [--ball-interval 1]
+#   python -m mpgb.loadtest --sweep 0,50,100,200,400     # one run per viewer count, one table
+#
+# Streamlit runs every browser session as a thread of one server process, so
+# this does the same: the scorer thread re-loads its match and records a ball
+# every --ball-interval seconds (what a tap on the Live Scorer costs), and
+# each viewer thread re-reads the shared match and builds what the public
+# page shows - every --poll seconds (the old st_autorefresh loop) or, with
+# --mode push, whenever the ChangeNotifier reports a new ball (the current
+# page). The store is a FileStore in a temporary directory with the app's
+# settings (background writes, json-compact, static scoreboards), unless
+# --memory or --dir say otherwise.
+#
+# Reported: scorer tap latency p50/p99/max, balls and viewer renders per
+# second, viewer render latency, bytes written to disk and process CPU.
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from .bench import create_sim_match, ensure_bowler, format_table, random_delivery
+from .commentary import recent_commentary
+from .engine import ScoringEngine
+from .metrics import get_metrics, percentile
+from .notify import ChangeNotifier
+from .overs import over_rows
+from .partnerships import partnership_rows
+from .publish import StaticPublisher
+from .roster import batting_rows, bowling_rows
+from .storage import FileStore, MemoryStore
+from .summary import live_summary
+
+POLL_SECONDS = 5.0          # the public page's old st_autorefresh interval
+PUSH_HEARTBEAT_SECONDS = 1.0  # the public page's LIVE_HEARTBEAT_S: a waiting viewer wakes this often
+MODES = ("poll", "push")
+
+
+def render_public(engine, mid):
+    """The public page's work for one rerun, minus Streamlit itself."""
+    match = engine.load_shared(mid)
+    if match is None:
+        return None
+    state = match.state
+    live_summary(mid, state)
+    recent_commentary(state, 12)
+    batting_rows(state)
+    bowling_rows(state)
+    partnership_rows(state)
+    over_rows(state)
+    return int(state.get("version", 0) or 0)
+
+
+def _viewer(engine, notifier, mid, mode, poll, done, timings, rng):
+    version = None
+    if mode == "poll":
+        done.wait(rng.uniform(0, poll))  # sessions do not all start on the same tick
+    while not done.is_set():
+        if mode == "push":
+            latest = notifier.wait(mid, version, timeout=PUSH_HEARTBEAT_SECONDS)
+            if done.is_set() or latest == version:
+                continue
+        t0 = time.perf_counter()
+        version = render_public(engine, mid)
+        timings.append(time.perf_counter() - t0)
+        if mode == "poll":
+            done.wait(poll)
+
+
+def run_load(viewers=50, mode="poll", poll=POLL_SECONDS, ball_interval=1.0, overs=2, max_balls=None,
+             data_dir=None, memory=False, serializer="json-compact", async_writes=True, publish=True, seed=1):
+    """Score one match at ``ball_interval`` pace while ``viewers`` threads watch it; returns a report dict."""
+    if mode not in MODES:
+        raise ValueError(f"unknown mode {mode!r}; expected one of {MODES}")
+    tmp = None
+    if not memory and data_dir is None:
+        tmp = data_dir = tempfile.mkdtemp(prefix="mpgb-load-")
+    store = MemoryStore(serializer) if memory else FileStore(data_dir, async_writes=async_writes, serializer=serializer)
+    notifier = ChangeNotifier()
+    listeners = [notifier]
+    if publish and not memory:
+        listeners.append(StaticPublisher(os.path.join(data_dir, "live")))
+    engine = ScoringEngine(store, listeners=listeners)
+    rng = random.Random(seed)
+    mid = create_sim_match(engine, overs, seed=seed).mid
+
+    done = threading.Event()
+    view_times = []
+    threads = [threading.Thread(target=_viewer, args=(engine, notifier, mid, mode, poll, done, view_times, random.Random(seed + i)),
+                                name=f"viewer-{i}", daemon=True) for i in range(viewers)]
+    metrics = get_metrics()
+    bytes0 = metrics.counter("bytes_written")
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for t in threads:
+        t.start()
+
+    taps, turn = [], 0
+    try:
+        while max_balls is None or len(taps) < max_balls:
+            due = time.perf_counter() + ball_interval
+            t0 = time.perf_counter()
+            match = engine.load_match(mid)  # the scorer page re-reads its match on every rerun
+            if match.status not in ("INNINGS1", "INNINGS2"):
+                break
+            turn = ensure_bowler(engine, match, turn)
+            outcome, extras, wicket = random_delivery(rng)
+            engine.record_ball(match, outcome, extras=extras, wicket_info=wicket)
+            taps.append(time.perf_counter() - t0)
+            time.sleep(max(0.0, due - time.perf_counter()))
+    finally:
+        done.set()
+        notifier.publish(mid, -1)  # wake push viewers so they see ``done``
+        for t in threads:
+            t.join(PUSH_HEARTBEAT_SECONDS)
+        store.flush()
+        wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+        store.close()
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    taps.sort()
+    view_times.sort()
+    return {
+        "viewers": viewers,
+        "mode": mode,
+        "balls": len(taps),
+        "seconds": round(wall, 2),
+        "tap_p50_ms": percentile(taps, 50) * 1000,
+        "tap_p99_ms": percentile(taps, 99) * 1000,
+        "tap_max_ms": (taps[-1] if taps else 0.0) * 1000,
+        "balls_per_s": len(taps) / wall if wall else 0.0,
+        "renders": len(view_times),
+        "renders_per_s": len(view_times) / wall if wall else 0.0,
+        "render_p50_ms": percentile(view_times, 50) * 1000,
+        "render_p99_ms": percentile(view_times, 99) * 1000,
+        "disk_bytes": metrics.counter("bytes_written") - bytes0,
+        "cpu_s": round(cpu, 2),
+        "cpu_pct": round(cpu / wall * 100, 1) if wall else 0.0,
+    }
+
+
+COLUMNS = ["viewers", "mode", "balls", "tap_p50_ms", "tap_p99_ms", "tap_max_ms", "balls_per_s",
+           "renders_per_s", "render_p99_ms", "disk_bytes", "cpu_pct"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mpgb.loadtest")
+    ap.add_argument("--viewers", type=int, default=50)
+    ap.add_argument("--sweep", default="", help="comma-separated viewer counts, one run each (overrides --viewers)")
+    ap.add_argument("--mode", choices=MODES, default="poll", help="poll every --poll seconds, or wait for each ball")
+    ap.add_argument("--poll", type=float, default=POLL_SECONDS)
+    ap.add_argument("--ball-interval", type=float, default=1.0, help="seconds between deliveries (real matches: ~30)")
+    ap.add_argument("--overs", type=int, default=2)
+    ap.add_argument("--balls", type=int, default=None, help="stop after this many deliveries")
+    ap.add_argument("--dir", default=None, help="data directory to write into (default: a temporary one)")
+    ap.add_argument("--memory", action="store_true", help="MemoryStore: no disk at all")
+    ap.add_argument("--format", default="json-compact", help="state serializer, e.g. binary+gzip")
+    ap.add_argument("--sync-writes", action="store_true", help="write state inline instead of on the background writer")
+    ap.add_argument("--no-publish", action="store_true", help="skip the static scoreboard files")
+    args = ap.parse_args(argv)
+
+    counts = [int(v) for v in args.sweep.split(",") if v.strip()] or [args.viewers]
+    rows = []
+    for n in counts:
+        rows.append(run_load(n, mode=args.mode, poll=args.poll, ball_interval=args.ball_interval, overs=args.overs,
+                             max_balls=args.balls, data_dir=args.dir, memory=args.memory, serializer=args.format,
+                             async_writes=not args.sync_writes, publish=not args.no_publish))
+        print(f"{n} viewers: {rows[-1]['balls']} balls in {rows[-1]['seconds']} s", file=sys.stderr)
+    print(format_table(rows, COLUMNS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# mpgb/match.py - typed view over a persisted match state dict
+
+import time
+import random
+from typing import Dict, List, Optional
+
+from .util import format_over_ball
+
+TEAM_A = "Team A"
+TEAM_B = "Team B"
+
+
+def other_team(team: str) -> str:
+    return TEAM_B if team == TEAM_A else TEAM_A
+
+
+def empty_score() -> Dict[str, int]:
+    return {"runs": 0, "wkts": 0, "balls": 0}
+
+
+SCHEMA_VERSION = 5  # 2 = roster ids + compact ball records (mpgb/balls.py), 3 = commentary refs (mpgb/commentary.py),
+                    # 4 = full per-over records (mpgb/overs.py), 5 = partnerships + fall of wickets (mpgb/partnerships.py)
+
+
+def new_match_state(mid: str, title: str, overs: int, teamA: List[str], teamB: List[str], venue: str = "") -> dict:
+    # player ids are roster indexes: Team A first, then Team B
+    idsA = list(range(len(teamA)))
+    idsB = list(range(len(teamA), len(teamA) + len(teamB)))
+    return {
+        "schema": SCHEMA_VERSION,
+        "mid": mid,
+        "title": title,
+        "venue": venue,
+        "overs_limit": int(overs),
+        "status": "INNINGS1",
+        "innings": 1,
+        "bat_team": TEAM_A,
+        "t0": int(time.time()),
+        "roster": [[n, TEAM_A] for n in teamA] + [[n, TEAM_B] for n in teamB],
+        "teams": {TEAM_A: idsA, TEAM_B: idsB},
+        "score": {TEAM_A: empty_score(), TEAM_B: empty_score()},
+        "batting": {"striker": idsA[0] if len(idsA)>0 else -1, "non_striker": idsA[1] if len(idsA)>1 else -1, "order": idsA[:], "next_index": 2},
+        "bowling": {"current_bowler": -1, "last_over_bowler": -1, "over_needs_change": False},
+        "batsman_stats": {},
+        "bowler_stats": {},
+        "balls_log": [],
+        "commentary": [],
+        "commentary_seed": random.randrange(1 << 30),
+        "overs_detail": [],
+        "partnerships": [],
+        "fow": [],
+        "man_of_match_override": "",
+        "scorer_lock": {}
+    }
+
+
+class Match:
+    """A match: its id plus the JSON-serializable state dict that gets persisted.
+
+    The engine mutates ``state`` in place; the properties below are typed
+    read accessors for front ends. Players are roster ids in the state; the
+    *_name properties resolve them for display.
+
+    ``read_only`` matches come from ScoringEngine.load_shared(): one state
+    object shared by every reader in the process. Engine commands reject
+    them, and callers must not mutate their state.
+    """
+
+    __slots__ = ("mid", "state", "read_only")
+
+    def __init__(self, mid: str, state: dict, read_only: bool = False):
+        self.mid = mid
+        self.state = state
+        self.read_only = read_only
+
+    @classmethod
+    def new(cls, mid: str, title: str, overs: int, teamA: List[str], teamB: List[str], venue: str = "") -> "Match":
+        return cls(mid, new_match_state(mid, title, overs, teamA, teamB, venue=venue))
+
+    def __repr__(self) -> str:
+        return f"Match({self.mid!r}, {self.status}, {self.bat_team} {self.score_line(self.bat_team)})"
+
+    @property
+    def title(self) -> str:
+        return self.state.get("title", "Match")
+
+    @property
+    def status(self) -> str:
+        return self.state.get("status", "")
+
+    @property
+    def is_live(self) -> bool:
+        return self.status in ("INNINGS1", "INNINGS2")
+
+    @property
+    def is_completed(self) -> bool:
+        return self.status == "COMPLETED"
+
+    @property
+    def innings(self) -> int:
+        return int(self.state.get("innings", 1) or 1)
+
+    @property
+    def overs_limit(self) -> int:
+        return int(self.state.get("overs_limit", 0) or 0)
+
+    @property
+    def bat_team(self) -> str:
+        return self.state.get("bat_team", TEAM_A)
+
+    @property
+    def bowl_team(self) -> str:
+        return other_team(self.bat_team)
+
+    def team_name(self, team: str) -> str:
+        """Display name of TEAM_A/TEAM_B (tournament matches carry the real team names)."""
+        return (self.state.get("team_names") or {}).get(team, team)
+
+    @property
+    def teams(self) -> Dict[str, List[int]]:
+        return self.state.get("teams", {})
+
+    @property
+    def roster(self) -> List[list]:
+        return self.state.get("roster", [])
+
+    def name(self, pid) -> str:
+        try:
+            return self.roster[int(pid)][0] if int(pid) >= 0 else ""
+        except (IndexError, TypeError, ValueError):
+            return ""
+
+    @property
+    def striker(self) -> int:
+        return self.state.get("batting", {}).get("striker", -1)
+
+    @property
+    def non_striker(self) -> int:
+        return self.state.get("batting", {}).get("non_striker", -1)
+
+    @property
+    def current_bowler(self) -> int:
+        return self.state.get("bowling", {}).get("current_bowler", -1)
+
+    @property
+    def striker_name(self) -> str:
+        return self.name(self.striker)
+
+    @property
+    def non_striker_name(self) -> str:
+        return self.name(self.non_striker)
+
+    @property
+    def current_bowler_name(self) -> str:
+        return self.name(self.current_bowler)
+
+    @property
+    def version(self) -> int:
+        return int(self.state.get("version", 0) or 0)
+
+    @property
+    def balls_log(self) -> List[list]:
+        return self.state.get("balls_log", [])
+
+    def commentary(self, n: int = 20) -> List[str]:
+        """Last ``n`` commentary lines, newest first."""
+        from .commentary import recent_commentary  # commentary -> roster -> match
+        return recent_commentary(self.state, n)
+
+    def score(self, team: Optional[str] = None) -> Dict[str, int]:
+        return self.state.get("score", {}).get(team or self.bat_team, empty_score())
+
+    def score_line(self, team: Optional[str] = None) -> str:
+        s = self.score(team)
+        return f"{s.get('runs',0)}/{s.get('wkts',0)} ({format_over_ball(s.get('balls',0))})"
+
+    def to_dict(self) -> dict:
+        return self.state
@@ -0,0 +1,210 @@
+# mpgb/matchups.py - batter-vs-bowler head-to-head index across matches
+#
+# MatchupIndex holds, for every (batter, bowler) pair that met, the counts
+# [balls, runs, outs, dots, fours, sixes, wkts], plus inverted lists batter ->
+# bowlers and bowler -> batters, so "X against Y this season" and "everyone X
+# has faced" are dictionary lookups. It is built once from all completed
+# matches (build()), saved to one JSON file, and afterwards only the match
+# being finalized is folded in - ScoringEngine calls finalized() on its
+# listeners. Each match's contribution is remembered, so re-finalizing or
+# deleting a match takes it back out exactly. Like TournamentBook, it re-reads
+# the file when its mtime changes, so an index rebuilt elsewhere (python -m
+# mpgb.integrity --rebuild) is picked up instead of being overwritten.
+#
+# "outs" counts every dismissal of the batter (run-outs included), as the
+# scorecard does; "wkts" only those credited to the bowler, for the bowler's
+# side of the pair. Rows saved before "wkts" existed read it as 0 until the
+# index is rebuilt.
+#
+# Players are matched across matches by mobile number when the roster entry
+# is one, otherwise by case-insensitive name.
+
+import json
+import os
+import threading
+
+from .balls import S, BW, bowlers_wicket, deltas, is_legal
+from .metrics import get_metrics, instrumented
+from .roster import name_of
+from .storage import load_json, write_bytes_atomic
+from .util import normalize_mobile
+
+FIELDS = ("balls", "runs", "outs", "dots", "4s", "6s", "wkts")
+SEP = "\t"
+
+
+def player_key(name):
+    s = str(name or "").strip()
+    digits = normalize_mobile(s)
+    return digits if len(digits) == 10 else s.casefold()
+
+
+def ball_counts(rec):
+    """[balls, runs, outs, dots, fours, sixes, wkts] credited to the striker/bowler pair for one record."""
+    team_runs, wkts, legal, bat_runs, faced, _, _, _, fours, sixes = deltas(rec)
+    return [faced, bat_runs, wkts, int(is_legal(rec) and team_runs == 0), fours, sixes, int(bowlers_wicket(rec))]
+
+
+def match_matchups(state):
+    """({pair_key: counts}, {player_key: display name}) for one match state."""
+    pairs, names = {}, {}
+    for rec in state.get("balls_log", []):
+        if rec[S] < 0 or rec[BW] < 0:
+            continue
+        bat, bowl = name_of(state, rec[S]), name_of(state, rec[BW])
+        kb, kw = player_key(bat), player_key(bowl)
+        names[kb], names[kw] = bat, bowl
+        row = pairs.setdefault(kb + SEP + kw, [0] * len(FIELDS))
+        for i, v in enumerate(ball_counts(rec)):
+            row[i] += v
+    return pairs, names
+
+
+def _row(counts):
+    return list(counts) + [0] * (len(FIELDS) - len(counts))  # files from before a field was added
+
+
+def _as_dict(counts, bowling=False):
+    """Counts as a dict plus SR and Avg (per batter dismissal, or per bowler wicket when ``bowling``)."""
+    row = dict(zip(FIELDS, _row(counts)))
+    row["SR"] = round(row["runs"] / row["balls"] * 100, 1) if row["balls"] else 0.0
+    outs = row["wkts"] if bowling else row["outs"]
+    row["Avg"] = round(row["runs"] / outs, 1) if outs else None
+    return row
+
+
+class MatchupIndex:
+    """Persistent inverted index of batter-vs-bowler counts (thread-safe)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._reset({})
+        self._load()
+
+    def _reset(self, doc):
+        self.built = bool(doc.get("built"))
+        self.pairs = {k: _row(v) for k, v in doc.get("pairs", {}).items()}
+        self.names = dict(doc.get("names", {}))
+        self.applied = {mid: dict(c) for mid, c in doc.get("applied", {}).items()}  # mid -> its pairs
+        self._by_batter, self._by_bowler = {}, {}
+        for key in self.pairs:
+            self._link(key)
+
+    def _load(self):
+        # re-read when the file changed under us (another process, or an integrity --rebuild)
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            self._reset(load_json(self.path) if mtime is not None else {})
+            self._mtime = mtime
+
+    def _link(self, key):
+        bat, bowl = key.split(SEP, 1)
+        self._by_batter.setdefault(bat, set()).add(bowl)
+        self._by_bowler.setdefault(bowl, set()).add(bat)
+
+    def _add(self, pairs, sign):
+        for key, counts in pairs.items():
+            row = self.pairs.get(key)
+            if row is None:
+                row = self.pairs[key] = [0] * len(FIELDS)
+                self._link(key)
+            for i, v in enumerate(counts):
+                row[i] += sign * v
+            if not any(row):
+                del self.pairs[key]
+                bat, bowl = key.split(SEP, 1)
+                self._by_batter[bat].discard(bowl)
+                self._by_bowler[bowl].discard(bat)
+
+    def _apply(self, mid, state):
+        if mid in self.applied:
+            self._add(self.applied.pop(mid), -1)
+        pairs, names = match_matchups(state)
+        self._add(pairs, +1)
+        self.applied[mid] = pairs
+        self.names.update(names)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            doc = {"built": self.built, "pairs": self.pairs, "names": self.names, "applied": self.applied}
+            data = json.dumps(doc, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            write_bytes_atomic(self.path, data)
+            self._mtime = os.path.getmtime(self.path)
+
+    # ---- bulk build ----
+    @instrumented("matchups.build")
+    def build(self, engine):
+        """(Re)index every completed match in ``engine``'s store."""
+        with self._lock:
+            self.pairs, self.names, self.applied = {}, {}, {}
+            self._by_batter, self._by_bowler = {}, {}
+            for mid, info in engine.list_matches().items():
+                if not (info.get("completed_at") or info.get("final_summary_brief")):
+                    continue
+                m = engine.load_shared(mid)
+                if m is not None:
+                    self._apply(mid, m.state)
+            self.built = True
+        self.save()
+        return len(self.applied)
+
+    def ensure_built(self, engine):
+        with self._lock:
+            self._load()
+            built = self.built
+        if not built:
+            self.build(engine)
+
+    # ---- engine listener protocol ----
+    def __call__(self, match):
+        pass  # ball-by-ball saves do not count; only finalized matches do
+
+    def finalized(self, match, summary):
+        with self._lock:
+            self._load()
+            self._apply(match.mid, match.state)
+        get_metrics().incr("matchup_updates")
+        self.save()
+
+    def remove(self, mid):
+        with self._lock:
+            self._load()
+            if mid not in self.applied:
+                return
+            self._add(self.applied.pop(mid), -1)
+        self.save()
+
+    # ---- lookups ----
+    def players(self):
+        """{player_key: display name} of everyone in the index."""
+        with self._lock:
+            self._load()
+            keys = {k for k, v in self._by_batter.items() if v} | {k for k, v in self._by_bowler.items() if v}
+            return {k: self.names.get(k, k) for k in keys}
+
+    def matchup(self, batter, bowler):
+        """Counts for ``batter`` facing ``bowler`` (names, mobiles or player keys)."""
+        key = player_key(batter) + SEP + player_key(bowler)
+        with self._lock:
+            self._load()
+            return _as_dict(self.pairs.get(key, [0] * len(FIELDS)))
+
+    def against_bowlers(self, batter):
+        """[{bowler, balls, runs, ...}] for everyone ``batter`` has faced, most balls first."""
+        kb = player_key(batter)
+        with self._lock:
+            self._load()
+            rows = [{"bowler": self.names.get(w, w), **_as_dict(self.pairs[kb + SEP + w])} for w in self._by_batter.get(kb, ())]
+        return sorted(rows, key=lambda r: (-r["balls"], r["bowler"]))
+
+    def against_batters(self, bowler):
+        """[{batter, balls, runs, ...}] for everyone ``bowler`` has bowled to, most balls first."""
+        kw = player_key(bowler)
+        with self._lock:
+            self._load()
+            rows = [{"batter": self.names.get(b, b), **_as_dict(self.pairs[b + SEP + kw], bowling=True)} for b in self._by_bowler.get(kw, ())]
+        return sorted(rows, key=lambda r: (-r["balls"], r["batter"]))
@@ -0,0 +1,336 @@
+# mpgb/members.py - member registry (members.csv) for MPGB Cricket Club - Sagar
+#
+# The CSV stays the source of truth and keeps its columns, but it is written
+# append-only: a registration or an update adds one line, and the last line
+# for a MemberID wins. Once enough superseded lines pile up the file is
+# compacted (rewritten atomically, one line per member).
+#
+# MemberIDs come from a persisted sequence (members.seq next to the CSV).
+# Allocation, appends and compaction all run under one file lock, so
+# concurrent registrations - other sessions or other processes - can neither
+# get the same ID nor register the same mobile twice.
+
+import os
+import io
+import csv
+import heapq
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from .metrics import get_metrics, instrumented
+from .storage import write_bytes_atomic, write_text_atomic
+from .util import normalize_mobile
+
+FIELDS = ["MemberID", "Name", "Mobile", "Paid"]
+COMPACT_AFTER = 200  # superseded lines tolerated before the CSV is rewritten
+SEARCH_TOP_K = 10
+
+
+def format_member_id(n):
+    return f"M{int(n):03d}"
+
+
+def parse_member_id(member_id):
+    s = str(member_id or "").strip()
+    if s.startswith("M") and s[1:].isdigit():
+        return int(s[1:])
+    return None
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on ``path`` (created if missing), across processes."""
+    with open(path, "a+") as f:
+        try:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except ImportError:  # Windows
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _clean(row):
+    out = {k: str(row.get(k, "") or "").strip() for k in FIELDS}
+    out["Mobile"] = normalize_mobile(out["Mobile"])
+    out["Paid"] = "Y" if out["Paid"].upper() == "Y" else "N"
+    return out
+
+
+def _csv_lines(rows):
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore", lineterminator="\n")
+    for r in rows:
+        w.writerow(r)
+    return buf.getvalue()
+
+
+class MemberRegistry:
+    """Append-only members.csv with an atomic MemberID sequence and an in-memory index."""
+
+    def __init__(self, csv_path, compact_after=COMPACT_AFTER):
+        self.path = csv_path
+        base = os.path.splitext(csv_path)[0]
+        self.seq_path = base + ".seq"
+        self.lock_path = base + ".lock"
+        self.compact_after = compact_after
+        self._mutex = threading.Lock()
+        self._reset_index()
+
+    def _reset_index(self):
+        self._rows = {}        # MemberID -> latest row
+        self._by_mobile = {}   # mobile -> MemberID
+        self._lines = 0        # data lines in the file, superseded ones included
+        self._max_id = 0
+        self._offset = 0       # bytes of the file already indexed
+        self._ident = None     # (inode, device): a compaction elsewhere replaces the file
+
+    @contextmanager
+    def _locked(self):
+        with self._mutex, file_lock(self.lock_path):
+            self._refresh()
+            yield
+
+    # ---- index maintenance (lock held) ----
+    def _refresh(self):
+        if not os.path.exists(self.path):
+            write_text_atomic(self.path, ",".join(FIELDS) + "\n")
+        st = os.stat(self.path)
+        ident = (st.st_ino, st.st_dev)
+        if ident != self._ident or st.st_size < self._offset:
+            self._reset_index()
+            self._ident = ident
+            with open(self.path, "rb") as f:
+                data = f.read()
+            get_metrics().incr("bytes_read", len(data))
+            self._index_rows(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+            self._offset = len(data)
+        elif st.st_size > self._offset:
+            # another process appended: read just the new tail
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            get_metrics().incr("bytes_read", len(data))
+            self._index_rows(csv.DictReader(io.StringIO(data.decode("utf-8")), fieldnames=FIELDS))
+            self._offset += len(data)
+
+    def _index_rows(self, rows):
+        for raw in rows:
+            row = _clean(raw)
+            mid = row["MemberID"]
+            if not mid:
+                continue
+            self._lines += 1
+            old = self._rows.get(mid)
+            if old is not None and self._by_mobile.get(old["Mobile"]) == mid:
+                del self._by_mobile[old["Mobile"]]
+            self._rows[mid] = row
+            if row["Mobile"]:
+                self._by_mobile[row["Mobile"]] = mid
+            n = parse_member_id(mid)
+            if n is not None and n > self._max_id:
+                self._max_id = n
+
+    def _append(self, rows):
+        data = _csv_lines(rows).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        get_metrics().incr("bytes_written", len(data))
+        self._offset += len(data)
+        self._index_rows(rows)
+        if self._lines - len(self._rows) > self.compact_after:
+            self._compact()
+
+    def _allocate(self, n):
+        try:
+            with open(self.seq_path, "r", encoding="utf-8") as f:
+                last = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            last = 0
+        # rows added by hand (or before the sequence existed) still count
+        first = max(last, self._max_id) + 1
+        write_text_atomic(self.seq_path, str(first + n - 1), fsync=True)
+        return [format_member_id(i) for i in range(first, first + n)]
+
+    def _compact(self):
+        rows = sorted(self._rows.values(), key=lambda r: (parse_member_id(r["MemberID"]) or 0, r["MemberID"]))
+        data = (",".join(FIELDS) + "\n" + _csv_lines(rows)).encode("utf-8")
+        write_bytes_atomic(self.path, data, fsync=True)
+        st = os.stat(self.path)
+        self._ident = (st.st_ino, st.st_dev)
+        self._offset = len(data)
+        self._lines = len(rows)
+        get_metrics().incr("members_compactions")
+
+    # ---- public API ----
+    def allocate_ids(self, n=1):
+        with self._locked():
+            return self._allocate(n)
+
+    @instrumented("members.register")
+    def register(self, name, mobile, paid="N"):
+        """(row, created): a new member, or the existing row if the mobile is registered."""
+        mobile = normalize_mobile(mobile)
+        with self._locked():
+            existing = self._by_mobile.get(mobile)
+            if existing:
+                return dict(self._rows[existing]), False
+            row = _clean({"MemberID": self._allocate(1)[0], "Name": name, "Mobile": mobile, "Paid": paid})
+            self._append([row])
+            return dict(row), True
+
+    def update(self, rows):
+        """Append new versions of existing members (e.g. Paid flags); returns how many changed."""
+        with self._locked():
+            changed = []
+            for r in rows:
+                cur = self._rows.get(str(r.get("MemberID", "")))
+                if cur is None:
+                    continue
+                new = _clean(dict(cur, **{k: v for k, v in r.items() if k in FIELDS}))
+                if new != cur:
+                    changed.append(new)
+            if changed:
+                self._append(changed)
+            return len(changed)
+
+    @instrumented("members.import")
+    def import_rows(self, rows):
+        """Bulk add/upgrade members keyed by mobile, in one locked append.
+
+        New mobiles get consecutive IDs from the sequence; known mobiles are
+        upgraded to Paid=Y when the import says so (imports never revoke Paid
+        or rename anyone). Returns {"inserted", "updated", "skipped"} lists of
+        rows, the skipped ones carrying a "Reason".
+        """
+        report = {"inserted": [], "updated": [], "skipped": []}
+        with self._locked():
+            new, changed, batch = [], [], set()
+            for r in rows:
+                row = _clean(r)
+                mid = self._by_mobile.get(row["Mobile"])
+                if not row["Mobile"] or row["Mobile"] in batch:
+                    report["skipped"].append(dict(row, Reason="missing or repeated mobile"))
+                elif mid is None:
+                    batch.add(row["Mobile"])
+                    new.append(row)
+                elif row["Paid"] == "Y" and self._rows[mid]["Paid"] != "Y":
+                    changed.append(dict(self._rows[mid], Paid="Y"))
+                else:
+                    report["skipped"].append(dict(row, MemberID=mid, Reason="already registered"))
+            for row, member_id in zip(new, self._allocate(len(new)) if new else []):
+                row["MemberID"] = member_id
+            if new or changed:
+                self._append(new + changed)
+            report["inserted"] = [dict(r) for r in new]
+            report["updated"] = [dict(r) for r in changed]
+        return report
+
+    def stamp(self):
+        """Changes whenever the registry does (cache key for derived views like MemberIndex)."""
+        with self._locked():
+            return (self._ident, self._offset)
+
+    def members(self):
+        """Current rows, one per member, in MemberID order."""
+        with self._locked():
+            rows = list(self._rows.values())
+        return sorted(rows, key=lambda r: (parse_member_id(r["MemberID"]) or 0, r["MemberID"]))
+
+    def by_mobile(self, mobile):
+        with self._locked():
+            mid = self._by_mobile.get(normalize_mobile(mobile))
+            return dict(self._rows[mid]) if mid else None
+
+    def replace_all(self, rows):
+        """Rewrite the registry from ``rows`` (admin edits); IDs keep counting from the sequence."""
+        with self._locked():
+            self._reset_index()
+            self._index_rows(rows)
+            self._compact()
+
+    def compact(self):
+        with self._locked():
+            self._compact()
+
+
+# ---------------- type-ahead search ----------------
+def name_tokens(name):
+    """Lower-case word tokens of a name ("D'Souza, R." -> ["d", "souza", "r"])."""
+    return "".join(c if c.isalnum() else " " for c in str(name or "").casefold()).split()
+
+
+class MemberIndex:
+    """Immutable search index over member rows: name/MemberID token prefixes and mobile prefixes.
+
+    Build it once per registry version (see MemberRegistry.stamp) and share it;
+    search() is a few bisects plus a top-k, independent of the registry size
+    for selective queries.
+    """
+
+    def __init__(self, rows):
+        # named members alphabetically (then by ID); bare paid-list mobiles last
+        self.entries = sorted((dict(r) for r in rows), key=lambda r: (not r.get("Name"), str(r.get("Name", "")).casefold(),
+                                                                      parse_member_id(r.get("MemberID")) or 0, str(r.get("Mobile", ""))))
+        self.by_mobile = {e["Mobile"]: e for e in self.entries if e.get("Mobile")}
+        tokens = sorted((t, i) for i, e in enumerate(self.entries) for t in set(name_tokens(e.get("Name")) + name_tokens(e.get("MemberID"))))
+        self._tok = [t for t, _ in tokens]
+        self._tok_idx = [i for _, i in tokens]
+        mobiles = sorted((e["Mobile"], i) for i, e in enumerate(self.entries) if e.get("Mobile"))
+        self._mob = [m for m, _ in mobiles]
+        self._mob_idx = [i for _, i in mobiles]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def label(self, mobile):
+        """"Name (M0xx)" for a mobile; the bare mobile if it is not a registered member."""
+        e = self.by_mobile.get(mobile)
+        if not e or not e.get("Name"):
+            return str(mobile)
+        return f"{e['Name']} ({e['MemberID']})" if e.get("MemberID") else e["Name"]
+
+    @staticmethod
+    def _prefix(keys, idx, prefix):
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + "\uffff")
+        return idx[lo:hi]
+
+    def search(self, query, k=SEARCH_TOP_K):
+        """Top ``k`` entries matching ``query`` (name words, mobile digits or a MemberID), best first."""
+        q = str(query or "").strip()
+        if not q:
+            return self.entries[:k]
+        digits = normalize_mobile(q)
+        if digits and len(digits) == len(q.replace(" ", "").replace("+", "").replace("-", "")):
+            hits = set(self._prefix(self._mob, self._mob_idx, digits))
+            return [self.entries[i] for i in sorted(hits)[:k]]
+        qt = name_tokens(q)
+        hits = None
+        exact = {}
+        for t in qt:
+            found = set()
+            lo = bisect_left(self._tok, t)
+            while lo < len(self._tok) and self._tok[lo].startswith(t):
+                i = self._tok_idx[lo]
+                found.add(i)
+                if self._tok[lo] == t:
+                    exact[i] = exact.get(i, 0) + 1
+                lo += 1
+            hits = found if hits is None else hits & found
+            if not hits:
+                return []
+        # whole-word matches first, then alphabetical (entry order)
+        return [self.entries[i] for i in heapq.nsmallest(k, hits, key=lambda i: (-exact.get(i, 0), i))]
@@ -0,0 +1,112 @@
+# mpgb/metrics.py - lightweight hot-path instrumentation (MPGB Cricket Club - Sagar)
+# One process-wide registry: rolling timings per operation plus counters.
+
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class PerfMetrics:
+    """Rolling timings per operation plus simple counters (thread-safe)."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._timings = {}   # op -> deque of seconds
+        self._counts = {}    # op -> total calls
+        self._counters = {}  # name -> value
+        self._reruns = deque(maxlen=5000)
+        self.started_at = datetime.utcnow()
+
+    def observe(self, op, seconds):
+        with self._lock:
+            self._timings.setdefault(op, deque(maxlen=self._window)).append(seconds)
+            self._counts[op] = self._counts.get(op, 0) + 1
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def mark_rerun(self):
+        with self._lock:
+            self._reruns.append(time.time())
+            self._counters["reruns"] = self._counters.get("reruns", 0) + 1
+
+    def reruns_per_minute(self):
+        cutoff = time.time() - 60
+        with self._lock:
+            return sum(1 for t in self._reruns if t >= cutoff)
+
+    def snapshot(self):
+        with self._lock:
+            timings = {op: sorted(v) for op, v in self._timings.items()}
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+        rows = []
+        for op in sorted(timings):
+            vals = timings[op]
+            rows.append({
+                "op": op,
+                "count": counts.get(op, 0),
+                "p50_ms": percentile(vals, 50) * 1000,
+                "p95_ms": percentile(vals, 95) * 1000,
+                "max_ms": vals[-1] * 1000 if vals else 0.0,
+            })
+        return {"ops": rows, "counters": counters, "reruns_per_min": self.reruns_per_minute()}
+
+    def export_text(self):
+        snap = self.snapshot()
+        lines = [f"# MPGB Cricket Club metrics — {datetime.utcnow().isoformat()}Z (since {self.started_at.isoformat()}Z)"]
+        for r in snap["ops"]:
+            op = r["op"]
+            lines.append(f'mpgb_op_count{{op="{op}"}} {r["count"]}')
+            lines.append(f'mpgb_op_ms{{op="{op}",quantile="0.5"}} {r["p50_ms"]:.3f}')
+            lines.append(f'mpgb_op_ms{{op="{op}",quantile="0.95"}} {r["p95_ms"]:.3f}')
+            lines.append(f'mpgb_op_ms{{op="{op}",quantile="1"}} {r["max_ms"]:.3f}')
+        for name, val in sorted(snap["counters"].items()):
+            lines.append(f'mpgb_counter{{name="{name}"}} {val}')
+        lines.append(f"mpgb_reruns_per_minute {snap['reruns_per_min']}")
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = PerfMetrics()
+
+
+def get_metrics():
+    # module-level, so it survives Streamlit reruns and is shared by all sessions
+    return _METRICS
+
+
+@contextmanager
+def timed(op):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _METRICS.observe(op, time.perf_counter() - t0)
+
+
+def instrumented(op):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(op):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
@@ -0,0 +1,88 @@
+# mpgb/notify.py - "a ball was recorded" notifications for live viewers
+#
+# ChangeNotifier is an engine listener: every save publishes (mid, version) and
+# wakes whoever is waiting on that match - Streamlit public pages, API
+# long-polls and server-sent event streams. Nothing wakes while no ball is
+# recorded, so idle viewers cost nothing.
+#
+# Saves made by another process (e.g. a standalone `python -m mpgb.api` taking
+# scoring commands) are picked up by watch(store): one thread stats the state
+# of matches that currently have waiters, once per ``interval`` seconds.
+
+import time
+import threading
+
+from .metrics import get_metrics
+
+WATCH_INTERVAL = 1.0
+
+
+class ChangeNotifier:
+    """Per-match version board with blocking waits (thread-safe)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}   # mid -> last published version (-1 = deleted)
+        self._waiters = {}    # mid -> number of threads waiting
+        self._watcher = None
+
+    # engine listener protocol
+    def __call__(self, match):
+        self.publish(match.mid, match.version)
+
+    def remove(self, mid):
+        self.publish(mid, -1)
+
+    def publish(self, mid, version):
+        with self._cond:
+            if self._versions.get(mid) == version:
+                return
+            self._versions[mid] = version
+            self._cond.notify_all()
+        get_metrics().incr("live_notifications")
+
+    def version(self, mid, default=None):
+        with self._cond:
+            return self._versions.get(mid, default)
+
+    def wait(self, mid, since, timeout=None):
+        """Block until ``mid`` moves past version ``since`` (or ``timeout``); returns the current version."""
+        with self._cond:
+            self._waiters[mid] = self._waiters.get(mid, 0) + 1
+            try:
+                self._cond.wait_for(lambda: self._versions.get(mid, since) != since, timeout=timeout)
+                return self._versions.get(mid, since)
+            finally:
+                self._waiters[mid] -= 1
+                if not self._waiters[mid]:
+                    del self._waiters[mid]
+
+    def watched(self):
+        with self._cond:
+            return list(self._waiters)
+
+    # cross-process changes
+    def watch(self, store, interval=WATCH_INTERVAL):
+        """Start (once) a daemon thread publishing changes other processes make to ``store``."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, args=(store, interval), name="mpgb-state-watch", daemon=True)
+            self._watcher.start()
+        return self._watcher
+
+    def _watch(self, store, interval):
+        stamps = {}
+        while True:
+            time.sleep(interval)
+            for mid in self.watched():
+                try:
+                    stamp = store.state_stamp(mid)
+                    if stamp is None or stamps.get(mid) == stamp:
+                        continue
+                    first = mid not in stamps
+                    stamps[mid] = stamp
+                    if first and self.version(mid) is not None:
+                        continue  # already tracked through the engine listener
+                    state = store.load_state(mid)
+                    self.publish(mid, int(state.get("version", 0) or 0) if state else -1)
+                except Exception:
+                    get_metrics().incr("live_watch_errors")
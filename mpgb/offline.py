@@ -0,0 +1,143 @@
+# mpgb/offline.py - optimistic scoring with batched, idempotent flushes
+#
+# OfflineScorer scores a private copy of one match: every delivery is applied
+# locally at once (same apply_command() the engine runs) and queued with a
+# command ID and the time it was bowled. Queued commands go to
+# ScoringEngine.apply_batch() every BATCH_FLUSH_BALLS deliveries, at the end
+# of an over, or on flush() - one state save and one round of listeners
+# (scoreboards, notifier) per batch instead of per ball. Flushes run on a
+# background thread, so the scorer never waits for them between deliveries.
+#
+# A failed flush keeps the queue and is retried with the same IDs, so a batch
+# that did reach the store is not applied twice. After a flush the local copy
+# is rebased on the engine's state plus whatever was queued meanwhile.
+#
+# It exposes record_ball / undo_last_ball / set_next_bowler with the engine's
+# signatures, so a scorer UI can drive either one.
+
+import threading
+import time
+import uuid
+
+from .engine import CommandWindow, apply_command, undo_ball
+from .match import Match
+from .metrics import get_metrics
+from .overs import over_complete
+
+BATCH_FLUSH_BALLS = 6
+
+
+def new_command_id():
+    return uuid.uuid4().hex
+
+
+class OfflineScorer:
+    """Local, optimistic scorer for one match over a ScoringEngine (thread-safe)."""
+
+    def __init__(self, engine, mid, flush_every=BATCH_FLUSH_BALLS, background=True):
+        self.engine = engine
+        self.mid = mid
+        self.flush_every = flush_every
+        self.background = background
+        self.queue = []          # commands not yet accepted by the engine, oldest first
+        self.last_error = None
+        self.revision = 0        # bumped by every local change; a UI can key its screen on it
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._seen = CommandWindow()  # IDs queued here or already saved with the match
+        self.match = engine.load_match(mid)
+        if self.match is None:
+            raise KeyError(f"unknown match {mid}")
+
+    @property
+    def state(self):
+        return self.match.state
+
+    def pending(self):
+        with self._lock:
+            return len(self.queue)
+
+    # ---- scoring (engine-compatible) ----
+    def _queue(self, cmd, command_id):
+        cmd["command_id"] = command_id or new_command_id()
+        with self._lock:
+            self._seen.sync(self.match.state)
+            if cmd["command_id"] in self._seen:
+                get_metrics().incr("duplicate_commands")
+                return {"ok": True, "duplicate": True}
+            res = apply_command(self.match.state, cmd)
+            if res["ok"]:
+                self.queue.append(cmd)
+                self._seen.add(cmd["command_id"])
+                self.revision += 1
+                get_metrics().incr("offline_queued")
+            due = len(self.queue) >= self.flush_every or over_complete(self.match.state) \
+                or self.match.state.get("status") == "COMPLETED"
+        if res["ok"] and due:
+            self.flush(wait=not self.background)
+        return res
+
+    def record_ball(self, match=None, outcome="0", extras=None, wicket_info=None, command_id=None):
+        cmd = {"action": "ball", "outcome": str(outcome), "extras": extras or {}, "wicket": wicket_info, "at": time.time()}
+        res = self._queue(cmd, command_id)
+        if res.get("duplicate"):
+            return {"stopped": True, "duplicate": True, "reason": "Duplicate command (ball already recorded)"}
+        return res["ball"] if res["ok"] else {"stopped": True, "reason": res["reason"]}
+
+    def undo_last_ball(self, match=None, command_id=None):
+        with self._lock:
+            if self.queue and self.queue[-1]["action"] == "ball" and not self._flushing():
+                # the ball never left this device: drop it instead of queueing an undo
+                self._seen.discard(self.queue.pop()["command_id"])
+                self.revision += 1
+                return undo_ball(self.match.state)
+        return self._queue({"action": "undo"}, command_id)["ok"]
+
+    def set_next_bowler(self, match=None, bowler=None, command_id=None):
+        self._queue({"action": "bowler", "bowler": bowler}, command_id)
+
+    # ---- flushing ----
+    def _flushing(self):
+        return self._flush_lock.locked()
+
+    def flush(self, wait=True):
+        """Send queued commands to the engine (on a background thread unless ``wait``); True when sent."""
+        if not wait:
+            with self._lock:
+                if self._flusher is not None and self._flusher.is_alive():
+                    # still running: it re-reads the queue under this lock before it exits
+                    return False
+                self._flusher = threading.Thread(target=self.flush, name=f"mpgb-offline-{self.mid}", daemon=True)
+                self._flusher.start()
+            return False
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(self.queue)
+                    if not batch:
+                        if self._flusher is threading.current_thread():
+                            self._flusher = None  # decided under the lock, so a new ball starts a new flusher
+                        return True
+                try:
+                    server = self.engine.load_match(self.mid)
+                    results = self.engine.apply_batch(server, batch)
+                except Exception as e:
+                    self.last_error = str(e)
+                    get_metrics().incr("offline_flush_errors")
+                    return False
+                self.last_error = next((r["reason"] for r in results if not r.get("ok")), None)
+                with self._lock:
+                    del self.queue[:len(batch)]
+                    # rebase: the engine's state plus what was scored while the batch was out
+                    for cmd in self.queue:
+                        apply_command(server.state, cmd)
+                    self.match = Match(self.mid, server.state)
+                get_metrics().incr("offline_flushes")
+
+    def close(self, timeout=None):
+        """Flush what is left and wait for it."""
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.join(timeout)
+        return self.flush()
@@ -0,0 +1,120 @@
+# mpgb/overs.py - per-over aggregates kept in state["overs_detail"]
+#
+# One record per (innings, over), appended/updated as balls are recorded and
+# reverted on undo, so charts, "this over", maidens and over-by-over recaps
+# never rescan balls_log:
+#
+#   {"innings", "team", "over" (0-based), "bowler" (roster id of the first
+#    ball), "runs", "wkts", "extras", "bowler_runs", "balls" (legal),
+#    "deliveries", "symbols" (ball_symbol per delivery), "maiden"}
+#
+# A maiden is six legal balls with nothing conceded by the bowler (byes and
+# leg byes do not spoil it); the bowler's "M" in bowler_stats is kept in step
+# by the engine.
+
+from .balls import INN, BW, deltas, ball_symbol
+from .roster import innings_team, name_of
+
+BALLS_PER_OVER = 6
+
+
+def new_over(innings, team, over, bowler=-1):
+    return {"innings": innings, "team": team, "over": over, "bowler": bowler, "runs": 0, "wkts": 0, "extras": 0,
+            "bowler_runs": 0, "balls": 0, "deliveries": 0, "symbols": [], "maiden": False}
+
+
+def _is_maiden(over):
+    return over["balls"] >= BALLS_PER_OVER and over["bowler_runs"] == 0
+
+
+def add_ball(overs, rec, team):
+    """Fold one ball record into the over list (in place); returns the over it landed in."""
+    inn = rec[INN]
+    last = overs[-1] if overs else None
+    if last is None or last.get("innings") != inn:
+        over = 0
+    else:
+        over = last["over"] + (1 if last["balls"] >= BALLS_PER_OVER else 0)
+    if last is None or last.get("innings") != inn or last.get("over") != over:
+        last = new_over(inn, team, over, rec[BW])
+        overs.append(last)
+    d = deltas(rec)
+    last["runs"] += d[0]
+    last["wkts"] += d[1]
+    last["balls"] += d[2]
+    last["extras"] += d[0] - d[3]
+    last["bowler_runs"] += d[5]
+    last["deliveries"] += 1
+    last["symbols"].append(ball_symbol(rec))
+    last["maiden"] = _is_maiden(last)
+    return last
+
+
+def remove_ball(overs, rec):
+    """Revert add_ball for the last recorded ball (in place); returns the over, None if it is gone."""
+    if not overs:
+        return None
+    last = overs[-1]
+    d = deltas(rec)
+    last["runs"] -= d[0]
+    last["wkts"] -= d[1]
+    last["balls"] -= d[2]
+    last["extras"] -= d[0] - d[3]
+    last["bowler_runs"] -= d[5]
+    last["deliveries"] -= 1
+    if last["symbols"]:
+        last["symbols"].pop()
+    last["maiden"] = _is_maiden(last)
+    if last["deliveries"] <= 0:
+        overs.pop()
+        return None
+    return last
+
+
+def rebuild_overs_detail(state):
+    """Recompute overs_detail (and bowlers' maiden counts) from balls_log."""
+    overs = []
+    for rec in state.get("balls_log", []):
+        add_ball(overs, rec, innings_team(state, rec[INN]))
+    state["overs_detail"] = overs
+    maidens = {}
+    for o in overs:
+        if o["maiden"]:
+            maidens[str(o["bowler"])] = maidens.get(str(o["bowler"]), 0) + 1
+    for pid, vals in state.get("bowler_stats", {}).items():
+        vals["M"] = maidens.get(pid, 0)
+    return overs
+
+
+def ensure_overs_detail(state):
+    overs = state.get("overs_detail")
+    if state.get("balls_log") and (not overs or "symbols" not in overs[-1]):
+        rebuild_overs_detail(state)
+    return state.setdefault("overs_detail", [])
+
+
+def current_over(state):
+    """The over in progress (or just finished) of the current innings, or None before its first ball."""
+    overs = state.get("overs_detail") or []
+    if overs and overs[-1].get("innings") == int(state.get("innings", 1) or 1):
+        return overs[-1]
+    return None
+
+
+def over_complete(state):
+    """True right after the sixth legal ball of an over (a new bowler is due)."""
+    over = current_over(state)
+    return over is not None and over["balls"] >= BALLS_PER_OVER
+
+
+def over_rows(state, innings=None):
+    """Over-by-over recap rows (1-based over numbers), optionally for one innings."""
+    return [{"Inn": o["innings"], "Over": o["over"] + 1, "Bowler": name_of(state, o["bowler"]), "Runs": o["runs"],
+             "Wkts": o["wkts"], "Extras": o["extras"], "Maiden": "M" if o["maiden"] else "", "Balls": " ".join(o["symbols"])}
+            for o in state.get("overs_detail", []) if innings is None or o["innings"] == innings]
+
+
+def economy(vals):
+    """Runs per over from a bowler_stats entry."""
+    balls = int(vals.get("B", 0) or 0)
+    return round(int(vals.get("R", 0) or 0) / (balls / BALLS_PER_OVER), 2) if balls else 0.0
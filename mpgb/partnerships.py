@@ -0,0 +1,117 @@
+# mpgb/partnerships.py - partnerships and fall of wickets, kept on the scoring path
+#
+# state["partnerships"]: one record per (innings, wicket), the open one last:
+#   {"innings", "wicket" (1 = opening stand), "bat1", "bat2" (roster ids),
+#    "runs", "balls" (legal), "deliveries", "contrib": {pid: [runs, balls]},
+#    "out" (roster id dismissed, -1 while unbroken)}
+# state["fow"]: one record per wicket:
+#   {"innings", "wicket", "runs", "balls" (team score when it fell), "batter", "how"}
+#
+# add_ball() runs after the ball's stats are applied and remove_ball() undoes
+# it, so the scorecard recap and public page read them without touching
+# balls_log.
+
+from .balls import INN, CODE, WKT, S, NS, C_W, WICKET_TYPES, deltas
+from .match import empty_score
+from .roster import innings_team, name_of
+from .util import format_over_ball
+
+
+def _new(inn, wicket, a, b):
+    return {"innings": inn, "wicket": wicket, "bat1": a, "bat2": b, "runs": 0, "balls": 0, "deliveries": 0,
+            "contrib": {str(a): [0, 0], str(b): [0, 0]}, "out": -1}
+
+
+def add_ball(state, rec, post_score):
+    """Fold one ball record into partnerships/fow (in place); ``post_score`` is the batting side's score after it."""
+    parts = state.setdefault("partnerships", [])
+    inn = rec[INN]
+    last = parts[-1] if parts else None
+    if last is None or last["innings"] != inn or last["out"] >= 0:
+        wicket = last["wicket"] + 1 if last is not None and last["innings"] == inn else 1
+        last = _new(inn, wicket, rec[S], rec[NS])
+        parts.append(last)
+    team_runs, wkts, legal, bat_runs, faced = deltas(rec)[:5]
+    last["runs"] += team_runs
+    last["balls"] += legal
+    last["deliveries"] += 1
+    c = last["contrib"].setdefault(str(rec[S]), [0, 0])
+    c[0] += bat_runs
+    c[1] += faced
+    if rec[CODE] == C_W:
+        last["out"] = rec[S]
+        state.setdefault("fow", []).append({"innings": inn, "wicket": last["wicket"], "runs": post_score.get("runs", 0),
+                                            "balls": post_score.get("balls", 0), "batter": rec[S], "how": WICKET_TYPES[rec[WKT]] or "out"})
+
+
+def remove_ball(state, rec):
+    """Revert add_ball for the last recorded ball (in place)."""
+    parts = state.get("partnerships") or []
+    if not parts:
+        return
+    last = parts[-1]
+    if rec[CODE] == C_W:
+        last["out"] = -1
+        fow = state.get("fow") or []
+        if fow:
+            fow.pop()
+    team_runs, wkts, legal, bat_runs, faced = deltas(rec)[:5]
+    last["runs"] -= team_runs
+    last["balls"] -= legal
+    last["deliveries"] -= 1
+    c = last["contrib"].get(str(rec[S]))
+    if c is not None:
+        c[0] -= bat_runs
+        c[1] -= faced
+    if last["deliveries"] <= 0:
+        parts.pop()
+
+
+def rebuild_partnerships(state):
+    """Recompute partnerships and fow from balls_log."""
+    state["partnerships"] = []
+    state["fow"] = []
+    totals = {}
+    for rec in state.get("balls_log", []):
+        # fow wants the score after each wicket: replay team totals alongside
+        sc = totals.setdefault(innings_team(state, rec[INN]), empty_score())
+        d = deltas(rec)
+        sc["runs"] += d[0]
+        sc["wkts"] += d[1]
+        sc["balls"] += d[2]
+        add_ball(state, rec, sc)
+    return state["partnerships"]
+
+
+def ensure_partnerships(state):
+    if state.get("balls_log") and "partnerships" not in state:
+        rebuild_partnerships(state)
+    state.setdefault("fow", [])
+    return state.setdefault("partnerships", [])
+
+
+def current_partnership(state):
+    """The unbroken stand of the current innings, or None."""
+    parts = state.get("partnerships") or []
+    if parts and parts[-1]["innings"] == int(state.get("innings", 1) or 1) and parts[-1]["out"] < 0:
+        return parts[-1]
+    return None
+
+
+def partnership_rows(state, innings=None):
+    rows = []
+    for p in state.get("partnerships", []):
+        if innings is not None and p["innings"] != innings:
+            continue
+        a, b = (p["contrib"].get(str(pid), [0, 0]) for pid in (p["bat1"], p["bat2"]))
+        rows.append({"Inn": p["innings"], "Wkt": p["wicket"], "Runs": p["runs"], "Balls": p["balls"],
+                     "Batter 1": f"{name_of(state, p['bat1'])} {a[0]} ({a[1]})",
+                     "Batter 2": f"{name_of(state, p['bat2'])} {b[0]} ({b[1]})",
+                     "Status": "unbroken" if p["out"] < 0 else ""})
+    return rows
+
+
+def fow_text(state, innings):
+    """"1-23 (Ravi, 3.4 ov), 2-40 (Amit, 6.1 ov)" for one innings."""
+    return ", ".join(f"{f['wicket']}-{f['runs']} ({name_of(state, f['batter'])}, {format_over_ball(f['balls'])} ov)"
+                     for f in state.get("fow", []) if f["innings"] == innings)
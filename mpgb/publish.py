@@ -0,0 +1,205 @@
+# mpgb/publish.py - static scoreboard files for spectators (MPGB Cricket Club - Sagar)
+#
+# StaticPublisher is an engine listener: after every save it writes
+#   <out_dir>/<mid>.json   live_summary() of the match (a few hundred bytes)
+#   <out_dir>/<mid>.html   a self-refreshing scoreboard that polls the JSON, or
+#                          listens to the API's event stream when ``events_base``
+#                          is set (falling back to polling if that drops)
+# Any static web server can host the directory, so spectators never touch the
+# Streamlit process. For local use:
+#
+#   python -m mpgb.publish serve --dir data/live --port 8600
+#
+# serves it with Cache-Control and ETag headers (304s for unchanged files).
+
+import os
+import sys
+import json
+import argparse
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+
+from .metrics import get_metrics, instrumented
+from .storage import write_bytes_atomic
+from .summary import live_summary
+
+LIVE_REFRESH_SECONDS = 5
+JSON_MAX_AGE = 2      # proxies/CDNs may absorb bursts of identical polls
+HTML_MAX_AGE = 300
+
+SCOREBOARD_HTML = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title} — live score</title>
+<noscript><meta http-equiv="refresh" content="{refresh}"></noscript>
+<style>
+body {{ margin:0; font-family:system-ui,-apple-system,Segoe UI,Roboto,sans-serif; background:#f2f6fa; color:#111; }}
+.card {{ max-width:420px; margin:12px auto; background:#fff; border-radius:12px; box-shadow:0 10px 30px rgba(10,20,40,.06); overflow:hidden; }}
+.head {{ background:#0b6efd; color:#fff; padding:16px; text-align:center; }}
+.title {{ font-size:14px; opacity:.9; }}
+.score {{ font-size:36px; font-weight:900; margin-top:4px; }}
+.sub {{ font-size:13px; margin-top:4px; }}
+.row {{ display:flex; justify-content:space-between; padding:8px 16px; border-bottom:1px solid #eef1f5; font-size:14px; }}
+.balls span {{ display:inline-block; min-width:26px; padding:2px 4px; margin-right:4px; border-radius:6px; background:#eef1f5; text-align:center; font-family:monospace; }}
+.comm {{ padding:8px 16px; font-size:13px; color:#374151; }}
+.comm div {{ margin-bottom:6px; }}
+.foot {{ padding:6px 16px 10px; font-size:11px; color:#6b7280; }}
+</style>
+</head>
+<body>
+<div class="card">
+  <div class="head"><div class="title" id="title">{title}</div><div class="score" id="score">-</div><div class="sub" id="sub"></div></div>
+  <div class="row"><span id="striker"></span><span id="non_striker"></span></div>
+  <div class="row"><span id="bowler"></span><span class="balls" id="balls"></span></div>
+  <div class="row" id="chase" style="display:none"></div>
+  <div class="comm" id="comm"></div>
+  <div class="foot" id="foot"></div>
+</div>
+<script>
+const SRC = {src};
+const EVENTS = {events};
+const EVERY = {refresh} * 1000;
+function esc(s) {{ return String(s == null ? "" : s).replace(/[&<>"]/g, c => ({{"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;"}})[c]); }}
+function bat(b, star) {{ return b ? esc(b.name) + (star ? "*" : "") + " " + b.R + " (" + b.B + ")" : ""; }}
+let version = -1;
+function render(d) {{
+  if (d.version === version) return;
+  version = d.version;
+  const sc = d.score[d.bat_team];
+  document.getElementById("title").textContent = d.title;
+  document.getElementById("score").textContent = (d.team_names ? d.team_names[d.bat_team] : d.bat_team) + ": " + sc.runs + "/" + sc.wkts;
+  document.getElementById("sub").textContent = "Overs: " + sc.overs + (d.overs_limit ? " (" + d.overs_limit + ")" : "") + " • RR " + d.run_rate.toFixed(2);
+  document.getElementById("striker").innerHTML = bat(d.striker, true);
+  document.getElementById("non_striker").innerHTML = bat(d.non_striker, false);
+  document.getElementById("bowler").innerHTML = d.bowler ? esc(d.bowler.name) + " " + d.bowler.W + "-" + d.bowler.R + " (" + d.bowler.overs + ")" : "";
+  document.getElementById("balls").innerHTML = d.last_balls.map(s => "<span>" + esc(s) + "</span>").join("");
+  const chase = document.getElementById("chase");
+  if (d.result) {{ chase.style.display = ""; chase.textContent = d.result; }}
+  else if (d.required) {{ chase.style.display = ""; chase.textContent = "Target " + d.target + " • need " + d.required.runs + (d.required.balls != null ? " from " + d.required.balls + " balls" : ""); }}
+  else {{ chase.style.display = "none"; }}
+  document.getElementById("comm").innerHTML = d.commentary.map(t => "<div>" + esc(t) + "</div>").join("");
+  document.getElementById("foot").textContent = "Updated " + d.updated_at;
+}}
+async function poll() {{
+  try {{
+    // no-cache = revalidate: an unchanged file costs a 304, not a download
+    const r = await fetch(SRC, {{cache: "no-cache"}});
+    if (r.ok) render(await r.json());
+  }} catch (e) {{}}
+  setTimeout(poll, EVERY);
+}}
+if (EVENTS && window.EventSource) {{
+  // pushed by the API on every ball; nothing is fetched while play is idle
+  const es = new EventSource(EVENTS);
+  es.addEventListener("update", e => render(JSON.parse(e.data)));
+  es.onerror = () => {{ if (es.readyState === EventSource.CLOSED) poll(); }};
+}} else {{
+  poll();
+}}
+</script>
+</body>
+</html>
+"""
+
+
+def scoreboard_html(mid, title, refresh=LIVE_REFRESH_SECONDS, events_base=""):
+    from html import escape
+    events = f"{events_base.rstrip('/')}/api/matches/{mid}/events" if events_base else ""
+    return SCOREBOARD_HTML.format(title=escape(title), src=json.dumps(f"{mid}.json"), events=json.dumps(events), refresh=int(refresh))
+
+
+class StaticPublisher:
+    """Engine listener that mirrors each saved match into ``out_dir`` as JSON + HTML."""
+
+    def __init__(self, out_dir, refresh=LIVE_REFRESH_SECONDS, events_base=""):
+        self.out_dir = out_dir
+        self.refresh = refresh
+        self.events_base = events_base
+        self._pages = set()  # mids whose HTML this process has written (settings may have changed since)
+        os.makedirs(out_dir, exist_ok=True)
+
+    def json_path(self, mid):
+        return os.path.join(self.out_dir, f"{mid}.json")
+
+    def html_path(self, mid):
+        return os.path.join(self.out_dir, f"{mid}.html")
+
+    @instrumented("publish.static_scoreboard")
+    def __call__(self, match):
+        try:
+            data = json.dumps(live_summary(match.mid, match.state), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            write_bytes_atomic(self.json_path(match.mid), data)
+            if match.mid not in self._pages:
+                write_bytes_atomic(self.html_path(match.mid), scoreboard_html(match.mid, match.title, self.refresh, self.events_base).encode("utf-8"))
+                self._pages.add(match.mid)
+        except Exception:
+            # spectators falling behind must never break scoring
+            get_metrics().incr("publish_errors")
+
+    def remove(self, mid):
+        self._pages.discard(mid)
+        for path in (self.json_path(mid), self.html_path(mid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ---------------- local static server with caching headers ----------------
+class CachingHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler plus Cache-Control and ETag / If-None-Match."""
+
+    _etag = None
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        self._etag = None
+        if os.path.isfile(path):
+            st = os.stat(path)
+            self._etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+            if self._etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self._etag is not None:
+            max_age = JSON_MAX_AGE if self.path.split("?")[0].endswith(".json") else HTML_MAX_AGE
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+            self.send_header("ETag", self._etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, host="0.0.0.0", port=8600):
+    httpd = ThreadingHTTPServer((host, port), partial(CachingHandler, directory=directory))
+    print(f"Serving {directory} on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mpgb.publish")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="serve published scoreboards with caching headers")
+    p.add_argument("--dir", default=os.path.join("data", "live"))
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8600)
+    args = ap.parse_args(argv)
+    if args.cmd == "serve":
+        serve(args.dir, args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# mpgb/replay.py - point-in-time match states rebuilt from the ball log
+#
+# balls_log is the event sequence: every record carries the batters, bowler
+# and incoming batsman it was bowled with, so replaying records 0..n-1 onto a
+# fresh state (same roster, t0 and commentary seed) reproduces the match as it
+# stood after ball n - deterministically, through the engine's own
+# apply_record().
+#
+# Timeline keeps a serialized checkpoint every CHECKPOINT_EVERY balls, so any
+# point is at most CHECKPOINT_EVERY - 1 replayed records away. sync() follows a
+# live match: new balls extend it, an undo only drops checkpoints past the
+# change. TimelineCache shares one Timeline per match between viewers.
+
+import json
+import threading
+from collections import OrderedDict
+
+from .balls import INN, S, NS, BW
+from .commentary import commentary_seed
+from .engine import apply_record, start_second_innings
+from .match import TEAM_A, empty_score, new_match_state
+from .metrics import get_metrics
+from .roster import team_ids
+
+CHECKPOINT_EVERY = 6
+TIMELINE_CACHE_SIZE = 16
+
+# fields that set the match up rather than record its progress (a new player joins roster/teams)
+SETUP_FIELDS = ("title", "venue", "overs_limit", "roster", "teams", "t0", "commentary_seed", "team_names", "tournament")
+# ... plus live bookkeeping: a restore keeps the current values of all of these
+META_FIELDS = SETUP_FIELDS + ("man_of_match_override", "scorer_lock", "version", "recent_commands")
+
+
+def initial_state(state):
+    """``state`` as it was before its first ball (roster, seed and settings kept)."""
+    start = new_match_state(state.get("mid", ""), state.get("title", "Match"), int(state.get("overs_limit", 0) or 0), [], [],
+                            venue=state.get("venue", ""))
+    for key in SETUP_FIELDS:
+        if key in state:
+            start[key] = json.loads(json.dumps(state[key]))
+    start["commentary_seed"] = commentary_seed(state)  # not new_match_state's random one
+    order = team_ids(start, TEAM_A)
+    start["batting"] = {"striker": order[0] if order else -1, "non_striker": order[1] if len(order) > 1 else -1,
+                        "order": order, "next_index": 2}
+    start["score"] = {t: empty_score() for t in start["teams"]}
+    return start
+
+
+def replay_record(state, rec):
+    """Apply one logged record, restoring the crease and bowler it was bowled with."""
+    if int(state.get("innings", 1) or 1) < rec[INN]:
+        start_second_innings(state)  # innings closed by the scorer rather than by the rules
+    state.setdefault("batting", {}).update(striker=rec[S], non_striker=rec[NS])
+    bowling = state.setdefault("bowling", {})
+    if bowling.get("current_bowler", -1) != rec[BW]:
+        bowling["last_over_bowler"] = bowling.get("current_bowler", -1)  # as set_next_bowler() would
+    bowling.update(current_bowler=rec[BW], over_needs_change=False)
+    state.setdefault("balls_log", [])
+    apply_record(state, list(rec))
+
+
+def _dump(state):
+    return json.dumps(state, separators=(",", ":")).encode("utf-8")
+
+
+class Timeline:
+    """Checkpointed replay of one match's balls_log."""
+
+    def __init__(self, state):
+        self.setup = None
+        self._lock = threading.Lock()
+        self.sync(state)
+
+    def __len__(self):
+        return len(self.log)
+
+    def sync(self, state):
+        """Follow ``state``'s log: keep checkpoints up to the first differing ball, replay the rest."""
+        with self._lock:
+            self._sync(state)
+
+    def _sync(self, state):
+        setup = _dump({k: state.get(k) for k in SETUP_FIELDS})
+        if setup != self.setup:
+            # first sync, or a player was added: every checkpoint needs the new roster
+            self.setup = setup
+            self.log = []
+            self.checkpoints = [_dump(initial_state(state))]  # checkpoints[i] = state after i * CHECKPOINT_EVERY balls
+        log = state.get("balls_log", [])
+        same = 0
+        for a, b in zip(self.log, log):
+            if a != b:
+                break
+            same += 1
+        keep = same // CHECKPOINT_EVERY
+        del self.checkpoints[keep + 1:]
+        n = keep * CHECKPOINT_EVERY
+        if len(log) // CHECKPOINT_EVERY > keep:
+            cur = json.loads(self.checkpoints[-1])
+            while n < len(log):
+                replay_record(cur, log[n])
+                n += 1
+                if n % CHECKPOINT_EVERY == 0:
+                    self.checkpoints.append(_dump(cur))
+            get_metrics().incr("replay_balls", len(log) - keep * CHECKPOINT_EVERY)
+        self.log = [list(r) for r in log]
+
+    def state_at(self, n):
+        """State after the first ``n`` balls (clamped to the log)."""
+        with self._lock:
+            n = max(0, min(int(n), len(self.log)))
+            k = n // CHECKPOINT_EVERY
+            data, recs = self.checkpoints[k], self.log[k * CHECKPOINT_EVERY:n]
+        state = json.loads(data)
+        for rec in recs:
+            replay_record(state, rec)
+        return state
+
+
+class TimelineCache:
+    """One Timeline per match, synced to whatever state a reader brings (thread-safe, LRU)."""
+
+    def __init__(self, size=TIMELINE_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()   # mid -> (version, Timeline)
+        self._lock = threading.Lock()
+
+    def get(self, mid, state):
+        version = int(state.get("version", 0) or 0)
+        with self._lock:
+            hit = self._items.get(mid)
+            if hit is None:
+                hit = (version, Timeline(state))
+            elif hit[0] != version:
+                hit[1].sync(state)
+                hit = (version, hit[1])
+            self._items[mid] = hit
+            self._items.move_to_end(mid)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+            return hit[1]
+
+    def remove(self, mid):
+        with self._lock:
+            self._items.pop(mid, None)
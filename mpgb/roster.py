@@ -0,0 +1,176 @@
+# mpgb/roster.py - per-match player table and render-time expansion
+#
+# state["roster"] is a list of [name, team]; a player's id is its index.
+# Teams, the crease, stats and ball records all hold ids; names are looked up
+# here when something is rendered or exported.
+
+from datetime import datetime
+
+from .balls import T, INN, CODE, WKT, S, NS, BW, NB, OUTCOMES, WICKET_TYPES, deltas, extras_dict, ball_symbol
+from .match import TEAM_A, TEAM_B
+from .util import same_player, format_over_ball
+
+UNKNOWN_BOWLER = "Unknown"
+
+
+def build_roster(teamA, teamB):
+    return [[n, TEAM_A] for n in teamA] + [[n, TEAM_B] for n in teamB]
+
+
+def name_of(state, pid):
+    try:
+        pid = int(pid)
+        if pid < 0:
+            return ""
+        return state["roster"][pid][0]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return ""
+
+
+def team_of(state, pid):
+    try:
+        return state["roster"][int(pid)][1]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def team_ids(state, team):
+    return list(state.get("teams", {}).get(team, []))
+
+
+def find_player(state, name, team=None):
+    """Id of ``name`` (same_player match, optionally within ``team``) or -1."""
+    if not name:
+        return -1
+    for pid, (n, t) in enumerate(state.get("roster", [])):
+        if (team is None or t == team) and same_player(n, name):
+            return pid
+    return -1
+
+
+def intern_player(state, name, team):
+    """Id for ``name`` in ``team``, adding it to the roster (and team) if new."""
+    pid = find_player(state, name, team)
+    if pid >= 0:
+        return pid
+    roster = state.setdefault("roster", [])
+    roster.append([str(name).strip(), team])
+    pid = len(roster) - 1
+    if name != UNKNOWN_BOWLER:
+        state.setdefault("teams", {}).setdefault(team, []).append(pid)
+    return pid
+
+
+def resolve_player(state, player, team):
+    """Accept an id (int) or a name (str, interned into ``team``); returns an id or -1."""
+    if player is None or player == "":
+        return -1
+    if isinstance(player, int):
+        return player if 0 <= player < len(state.get("roster", [])) else -1
+    return intern_player(state, player, team)
+
+
+def team_names(state, team):
+    return [name_of(state, pid) for pid in team_ids(state, team)]
+
+
+def innings_team(state, innings):
+    return TEAM_A if int(innings or 1) == 1 else TEAM_B
+
+
+# ---------------- Render-time expansion ----------------
+def ball_time(state, rec):
+    try:
+        return datetime.utcfromtimestamp(float(state.get("t0", 0)) + rec[T]).isoformat()
+    except Exception:
+        return ""
+
+
+def expand_ball(state, rec, prev_score=None, post_score=None):
+    """Old-style dict view of a compact ball record (names resolved)."""
+    wk = WICKET_TYPES[rec[WKT]] if rec[WKT] else ""
+    out = {
+        "time": ball_time(state, rec),
+        "innings": rec[INN],
+        "team": innings_team(state, rec[INN]),
+        "outcome": OUTCOMES[rec[CODE]],
+        "symbol": ball_symbol(rec),
+        "extras": extras_dict(rec),
+        "wicket": {"type": wk, "new_batsman": name_of(state, rec[NB])} if wk else None,
+        "striker": name_of(state, rec[S]),
+        "non_striker": name_of(state, rec[NS]),
+        "bowler": name_of(state, rec[BW]),
+    }
+    if prev_score is not None:
+        out["prev_score"] = prev_score
+    if post_score is not None:
+        out["post_score"] = post_score
+    return out
+
+
+def _sub(score, rec):
+    d = deltas(rec)
+    return {"runs": score["runs"] - d[0], "wkts": score["wkts"] - d[1], "balls": score["balls"] - d[2]}
+
+
+def _add(score, rec):
+    d = deltas(rec)
+    return {"runs": score["runs"] + d[0], "wkts": score["wkts"] + d[1], "balls": score["balls"] + d[2]}
+
+
+def recent_balls(state, n):
+    """Last ``n`` balls expanded, newest first, with prev/post scores (walks back from the live score)."""
+    log = state.get("balls_log", [])
+    out = []
+    running = {}
+    for rec in reversed(log[-n:] if n else []):
+        team = innings_team(state, rec[INN])
+        if team not in running:
+            sc = state.get("score", {}).get(team, {})
+            running[team] = {"runs": sc.get("runs", 0), "wkts": sc.get("wkts", 0), "balls": sc.get("balls", 0)}
+        post = running[team]
+        prev = _sub(post, rec)
+        out.append(expand_ball(state, rec, prev_score=prev, post_score=post))
+        running[team] = prev
+    return out
+
+
+def all_balls(state):
+    """Every ball expanded in order, with prev/post scores."""
+    out = []
+    running = {}
+    for rec in state.get("balls_log", []):
+        team = innings_team(state, rec[INN])
+        prev = running.get(team, {"runs": 0, "wkts": 0, "balls": 0})
+        post = _add(prev, rec)
+        out.append(expand_ball(state, rec, prev_score=prev, post_score=post))
+        running[team] = post
+    return out
+
+
+def batting_rows(state, team=None):
+    rows = []
+    for key, vals in state.get("batsman_stats", {}).items():
+        if team is not None and team_of(state, key) != team:
+            continue
+        R = int(vals.get("R", 0) or 0)
+        B = int(vals.get("B", 0) or 0)
+        rows.append({"Player": name_of(state, key), "R": R, "B": B, "4s": int(vals.get("4", 0) or 0), "6s": int(vals.get("6", 0) or 0), "SR": f"{(R / B * 100) if B > 0 else 0.0:.1f}"})
+    return rows
+
+
+def bowling_rows(state, team=None):
+    rows = []
+    for key, vals in state.get("bowler_stats", {}).items():
+        if team is not None and team_of(state, key) != team:
+            continue
+        balls = int(vals.get("B", 0) or 0)
+        runs = int(vals.get("R", 0) or 0)
+        rows.append({"Bowler": name_of(state, key), "Balls": format_over_ball(balls), "BallsRaw": balls, "M": int(vals.get("M", 0) or 0),
+                     "R": runs, "W": int(vals.get("W", 0) or 0), "Econ": round(runs / (balls / 6), 2) if balls else 0.0})
+    return rows
+
+
+def named_stats(state, key):
+    """{name: stats} for "batsman_stats" / "bowler_stats"."""
+    return {name_of(state, pid): vals for pid, vals in state.get(key, {}).items()}
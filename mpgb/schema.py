@@ -0,0 +1,117 @@
+# mpgb/schema.py - upgrade match states saved by older versions of the app
+#
+# Schema 1 (no "schema" key): players as raw names/mobiles everywhere and one
+# dict per ball with full prev/post snapshots. Schema 2: roster ids and compact
+# ball records (mpgb/balls.py). Schema 3: commentary as a ring buffer of refs
+# (mpgb/commentary.py). Schema 4: full per-over records (mpgb/overs.py).
+# Schema 5: partnerships and fall of wickets (mpgb/partnerships.py).
+# Migration runs once, when a state is loaded.
+
+import time
+from datetime import datetime
+
+from .commentary import rebuild_commentary
+from .balls import C_W, outcome_code, wicket_code, extra_runs
+from .match import TEAM_A, TEAM_B, SCHEMA_VERSION, other_team
+from .overs import rebuild_overs_detail
+from .partnerships import rebuild_partnerships
+from .roster import UNKNOWN_BOWLER, build_roster, find_player, intern_player
+
+
+def _epoch(iso):
+    try:
+        return (datetime.fromisoformat(iso) - datetime(1970, 1, 1)).total_seconds()
+    except Exception:
+        return None
+
+
+def migrate_state(state):
+    """Upgrade ``state`` in place to the current schema; returns True if it changed."""
+    schema = int(state.get("schema", 1) or 1) if state else SCHEMA_VERSION
+    if schema >= SCHEMA_VERSION:
+        return False
+    if schema < 2:
+        _to_v2(state)
+    if schema < 3:
+        # rendered strings -> refs; the text is regenerated from the ball log
+        state.setdefault("commentary_seed", 0)  # what commentary_seed() already assumed for it
+        rebuild_commentary(state)
+    if schema < 4:
+        # overs_detail gains bowler/extras/symbols/maiden; bowlers gain "M"
+        rebuild_overs_detail(state)
+    if schema < 5:
+        rebuild_partnerships(state)
+    state["schema"] = SCHEMA_VERSION
+    return True
+
+
+def _to_v2(state):
+    teams = state.get("teams", {})
+    state["roster"] = build_roster(teams.get(TEAM_A, []), teams.get(TEAM_B, []))
+    n_a = len(teams.get(TEAM_A, []))
+    state["teams"] = {TEAM_A: list(range(n_a)), TEAM_B: list(range(n_a, len(state["roster"])))}
+
+    def pid(name, team):
+        if not name:
+            return -1
+        found = find_player(state, name)  # same_player matching, any side
+        return found if found >= 0 else intern_player(state, name, team)
+
+    log = state.get("balls_log", [])
+    times = [t for t in (_epoch(b.get("time")) for b in log if isinstance(b, dict)) if t is not None]
+    t0 = int(min(times)) if times else int(time.time())
+    state["t0"] = t0
+
+    recs = []
+    innings, team, last_balls = 1, TEAM_A, 0
+    for b in log:
+        if not isinstance(b, dict):
+            recs.append(b)
+            continue
+        prev_balls = int(b.get("prev_score", {}).get("balls", 0) or 0)
+        if b.get("team"):
+            innings, team = int(b.get("innings", 1) or 1), b["team"]
+        elif prev_balls < last_balls:
+            # a reset ball count means the second innings started
+            innings, team = 2, other_team(team)
+        last_balls = int(b.get("post_score", {}).get("balls", 0) or 0)
+        code = outcome_code(b.get("outcome"))
+        wk = b.get("wicket") or {}
+        t = _epoch(b.get("time"))
+        recs.append([
+            max(0, int(t - t0)) if t is not None else 0,
+            innings,
+            code,
+            extra_runs(code, b.get("extras")),
+            wicket_code(wk) if code == C_W else 0,
+            pid(b.get("striker"), team),
+            pid(b.get("non_striker"), team),
+            pid(b.get("bowler") or UNKNOWN_BOWLER, other_team(team)),
+            pid(wk.get("new_batsman"), team) if code == C_W else -1,
+            int(b["next_index"]) if "next_index" in b else -1,
+        ])
+    state["balls_log"] = recs
+
+    bat_team = state.get("bat_team", TEAM_A)
+    for key, team_hint in (("batsman_stats", bat_team), ("bowler_stats", other_team(bat_team))):
+        converted = {}
+        for name, vals in state.get(key, {}).items():
+            p = pid(name, team_hint)
+            if p >= 0:
+                converted[str(p)] = vals
+        state[key] = converted
+
+    batting = state.get("batting", {})
+    state["batting"] = {
+        "striker": pid(batting.get("striker"), bat_team),
+        "non_striker": pid(batting.get("non_striker"), bat_team),
+        "order": list(state["teams"].get(bat_team, [])),
+        "next_index": int(batting.get("next_index", 2) or 0),
+    }
+    bowling = state.get("bowling", {})
+    state["bowling"] = {
+        "current_bowler": pid(bowling.get("current_bowler"), other_team(bat_team)),
+        "last_over_bowler": pid(bowling.get("last_over_bowler"), other_team(bat_team)),
+        "over_needs_change": bool(bowling.get("over_needs_change", False)),
+    }
+    rebuild_overs_detail(state)
@@ -0,0 +1,256 @@
+# mpgb/serialize.py - pluggable match-state serialization (MPGB Cricket Club - Sagar)
+#
+# Formats:
+#   json          pretty JSON (indent=2), the original on-disk format
+#   json-compact  JSON without whitespace
+#   binary        msgpack encoding behind a 4-byte marker (the real ``msgpack``
+#                 package is used when installed, otherwise a pure-python codec)
+# Each format can be framed with gzip (stdlib) or zstd (needs ``zstandard``),
+# written as "<format>+<compression>", e.g. "binary+zstd".
+#
+# Loading never needs to know the format: gzip/zstd frames, the binary marker
+# and plain JSON are told apart by their leading bytes, so files written by
+# older versions (or with another setting) stay readable.
+
+import gzip
+import json
+import struct
+
+FORMATS = ("json", "json-compact", "binary")
+COMPRESSIONS = (None, "gzip", "zstd")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BINARY_MAGIC = b"\xc1MP1"  # 0xc1 is never used by msgpack, so this cannot start a JSON or msgpack document
+
+
+def _msgpack():
+    try:
+        import msgpack
+        return msgpack
+    except Exception:
+        return None
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except Exception:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+
+
+# ---------------- msgpack subset (nil, bool, int, float, str, array, map) ----------------
+def _pack(obj, out):
+    if obj is None:
+        out.append(b"\xc0")
+    elif obj is True:
+        out.append(b"\xc3")
+    elif obj is False:
+        out.append(b"\xc2")
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(bytes((obj,)))
+        elif -32 <= obj < 0:
+            out.append(bytes((obj & 0xFF,)))
+        elif 0 <= obj <= 0xFF:
+            out.append(b"\xcc" + bytes((obj,)))
+        elif 0 <= obj <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xCD, obj))
+        elif 0 <= obj <= 0xFFFFFFFF:
+            out.append(struct.pack(">BI", 0xCE, obj))
+        elif obj > 0:
+            out.append(struct.pack(">BQ", 0xCF, obj))
+        elif obj >= -0x80:
+            out.append(struct.pack(">Bb", 0xD0, obj))
+        elif obj >= -0x8000:
+            out.append(struct.pack(">Bh", 0xD1, obj))
+        elif obj >= -0x80000000:
+            out.append(struct.pack(">Bi", 0xD2, obj))
+        else:
+            out.append(struct.pack(">Bq", 0xD3, obj))
+    elif isinstance(obj, float):
+        out.append(struct.pack(">Bd", 0xCB, obj))
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(bytes((0xA0 | n,)))
+        elif n <= 0xFF:
+            out.append(bytes((0xD9, n)))
+        elif n <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDA, n))
+        else:
+            out.append(struct.pack(">BI", 0xDB, n))
+        out.append(data)
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(bytes((0x90 | n,)))
+        elif n <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDC, n))
+        else:
+            out.append(struct.pack(">BI", 0xDD, n))
+        for v in obj:
+            _pack(v, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(bytes((0x80 | n,)))
+        elif n <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDE, n))
+        else:
+            out.append(struct.pack(">BI", 0xDF, n))
+        for k, v in obj.items():
+            _pack(k if isinstance(k, str) else str(k), out)  # JSON semantics: keys are strings
+            _pack(v, out)
+    else:
+        raise TypeError(f"cannot serialize {type(obj).__name__}")
+
+
+def pack(obj):
+    out = []
+    _pack(obj, out)
+    return b"".join(out)
+
+
+_FIXED = {0xCC: (">B", 1), 0xCD: (">H", 2), 0xCE: (">I", 4), 0xCF: (">Q", 8),
+          0xD0: (">b", 1), 0xD1: (">h", 2), 0xD2: (">i", 4), 0xD3: (">q", 8),
+          0xCA: (">f", 4), 0xCB: (">d", 8)}
+
+
+def _unpack(data, i):
+    b = data[i]
+    i += 1
+    if b < 0x80:
+        return b, i
+    if b >= 0xE0:
+        return b - 0x100, i
+    if 0xA0 <= b <= 0xBF:
+        n = b & 0x1F
+        return str(data[i:i + n], "utf-8"), i + n
+    if 0x90 <= b <= 0x9F:
+        return _unpack_array(data, i, b & 0x0F)
+    if 0x80 <= b <= 0x8F:
+        return _unpack_map(data, i, b & 0x0F)
+    if b == 0xC0:
+        return None, i
+    if b == 0xC2:
+        return False, i
+    if b == 0xC3:
+        return True, i
+    if b in _FIXED:
+        fmt, size = _FIXED[b]
+        return struct.unpack_from(fmt, data, i)[0], i + size
+    if b in (0xD9, 0xDA, 0xDB):
+        size = {0xD9: 1, 0xDA: 2, 0xDB: 4}[b]
+        n = int.from_bytes(data[i:i + size], "big")
+        i += size
+        return str(data[i:i + n], "utf-8"), i + n
+    if b in (0xDC, 0xDD):
+        size = 2 if b == 0xDC else 4
+        return _unpack_array(data, i + size, int.from_bytes(data[i:i + size], "big"))
+    if b in (0xDE, 0xDF):
+        size = 2 if b == 0xDE else 4
+        return _unpack_map(data, i + size, int.from_bytes(data[i:i + size], "big"))
+    raise ValueError(f"unsupported msgpack type 0x{b:02x}")
+
+
+def _unpack_array(data, i, n):
+    out = []
+    for _ in range(n):
+        v, i = _unpack(data, i)
+        out.append(v)
+    return out, i
+
+
+def _unpack_map(data, i, n):
+    out = {}
+    for _ in range(n):
+        k, i = _unpack(data, i)
+        v, i = _unpack(data, i)
+        out[k] = v
+    return out, i
+
+
+def unpack(data):
+    obj, i = _unpack(memoryview(data), 0)
+    if i != len(data):
+        raise ValueError("trailing bytes after msgpack document")
+    return obj
+
+
+# ---------------- format detection ----------------
+def detect_format(data):
+    """(format, compression) of serialized bytes; pretty and compact JSON both report "json"."""
+    compression = None
+    if data[:2] == GZIP_MAGIC:
+        compression, data = "gzip", gzip.decompress(data)
+    elif data[:4] == ZSTD_MAGIC:
+        compression, data = "zstd", _zstd().ZstdDecompressor().decompressobj().decompress(data)
+    fmt = "binary" if data[:4] == BINARY_MAGIC else "json"
+    return fmt, compression
+
+
+def loads(data):
+    """Decode bytes written in any supported format (auto-detected)."""
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    elif data[:4] == ZSTD_MAGIC:
+        data = _zstd().ZstdDecompressor().decompressobj().decompress(data)
+    if data[:4] == BINARY_MAGIC:
+        mp = _msgpack()
+        if mp is not None:
+            return mp.unpackb(data[4:], raw=False, strict_map_key=False)
+        return unpack(data[4:])
+    return json.loads(bytes(data).decode("utf-8-sig"))
+
+
+class Serializer:
+    """Encodes state as ``fmt`` (see FORMATS) with optional ``compression``; decoding auto-detects."""
+
+    def __init__(self, fmt="json-compact", compression=None, level=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression {compression!r} (expected gzip or zstd)")
+        if compression == "zstd":
+            _zstd()  # fail at configuration time, not on the first save
+        self.fmt = fmt
+        self.compression = compression
+        self.level = level
+
+    @property
+    def name(self):
+        return self.fmt + ("+" + self.compression if self.compression else "")
+
+    def __repr__(self):
+        return f"Serializer({self.name!r})"
+
+    def dumps(self, obj):
+        if self.fmt == "json":
+            data = json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+        elif self.fmt == "json-compact":
+            data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        else:
+            mp = _msgpack()
+            data = BINARY_MAGIC + (mp.packb(obj, use_bin_type=True) if mp is not None else pack(obj))
+        if self.compression == "gzip":
+            # mtime=0 keeps the output deterministic (same state -> same bytes)
+            data = gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+        elif self.compression == "zstd":
+            data = _zstd().ZstdCompressor(level=self.level or 3).compress(data)
+        return data
+
+    def loads(self, data):
+        return loads(data)
+
+
+def get_serializer(spec=None):
+    """Serializer from a "<format>[+<compression>]" string (or pass a Serializer through)."""
+    if isinstance(spec, Serializer):
+        return spec
+    if not spec:
+        return Serializer()
+    fmt, _, compression = str(spec).partition("+")
+    return Serializer(fmt, compression or None)
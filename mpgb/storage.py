@@ -0,0 +1,373 @@
+# mpgb/storage.py - match persistence (state files, index, backups)
+#
+# MatchStore is the interface the scoring engine talks to. FileStore keeps the
+# original on-disk layout under data/; MemoryStore keeps everything in RAM for
+# batch jobs, benchmarks and load tests. Both encode state with a pluggable
+# Serializer (mpgb.serialize); loads auto-detect the format.
+
+import os
+import json
+import queue
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from .export import ball_rows, rows_to_csv
+from .metrics import get_metrics, instrumented
+from .serialize import get_serializer
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    get_metrics().incr("bytes_read", len(data))
+    return data
+
+
+def load_json(path, default=None):
+    if default is None:
+        default = {}
+    try:
+        return json.loads(read_bytes(path).decode("utf-8"))
+    except FileNotFoundError:
+        return default
+    except:
+        get_metrics().incr("json_load_errors")  # corrupt file: python -m mpgb.integrity says which
+        return default
+
+
+def write_bytes_atomic(path, data, fsync=False):
+    # write to a temp file and rename over the target, so readers never see a half-written file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    try:
+        os.replace(tmp, path)
+    except:
+        os.rename(tmp, path)
+    get_metrics().incr("bytes_written", len(data))
+
+
+def write_text_atomic(path, text, fsync=False):
+    write_bytes_atomic(path, text.encode("utf-8"), fsync=fsync)
+
+
+def save_json(path, obj):
+    write_text_atomic(path, json.dumps(obj, indent=2, ensure_ascii=False))
+
+
+def dump_state(state):
+    return json.dumps(state, indent=2, ensure_ascii=False)
+
+
+# ---------------- Background persistence ----------------
+RETRY_SECONDS = 2.0  # how often a failed state write is retried
+
+
+class StateWriter:
+    """Writes match state off the caller's thread.
+
+    Each save is serialized immediately (so later mutations of the live dict
+    cannot leak into it) and parked per match; only the newest pending state
+    of a match is written, older ones are coalesced away. ``write_fn(mid, data)``
+    is expected to use fsync + atomic rename, so a crash leaves either the old
+    or the new state on disk, never a torn file. A state whose write fails
+    stays pending (reads keep seeing it) and is retried every
+    ``retry_seconds`` until a write succeeds or a newer state replaces it.
+    """
+
+    def __init__(self, write_fn, maxsize=32, retry_seconds=RETRY_SECONDS):
+        self._write_fn = write_fn
+        self._retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queue = queue.Queue(maxsize=maxsize)  # mids with a pending state
+        self._pending = {}   # mid -> serialized state waiting to be written
+        self._inflight = {}  # mid -> serialized state being written right now
+        self._status = {}    # mid -> {"state": "pending"|"saved"|"error", ...}
+        self._failed = set()  # mids whose pending state is a failed write awaiting retry
+        self._retry_at = 0.0
+        self._busy = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="mpgb-state-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, mid, data):
+        with self._lock:
+            if self._closed:
+                enqueue = None
+            else:
+                # a failed state is parked, not queued: queue its replacement now
+                enqueue = mid not in self._pending or mid in self._failed
+                self._failed.discard(mid)
+                self._pending[mid] = data
+                self._status[mid] = {"state": "pending", "at": datetime.utcnow().isoformat()}
+        if enqueue is None:
+            self._write_fn(mid, data)
+            return
+        if enqueue:
+            try:
+                self._queue.put_nowait(mid)
+            except queue.Full:
+                # writer is falling behind: apply backpressure by writing inline
+                self._write(mid)
+
+    def pending(self, mid):
+        # includes a write in progress: until os.replace lands, the file is still the old state
+        with self._lock:
+            data = self._pending.get(mid)
+            return data if data is not None else self._inflight.get(mid)
+
+    def discard(self, mid):
+        with self._idle:
+            self._pending.pop(mid, None)
+            self._inflight.pop(mid, None)
+            self._failed.discard(mid)
+            self._status.pop(mid, None)
+            self._idle.notify_all()
+
+    def status(self, mid):
+        with self._lock:
+            return dict(self._status.get(mid, {}))
+
+    def flush(self, timeout=None):
+        """Wait until nothing is queued or being written; False if states are still unsaved."""
+        with self._idle:
+            self._idle.wait_for(lambda: not self._busy and self._failed.issuperset(self._pending), timeout=timeout)
+            return not self._pending and not self._busy
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        # anything the thread did not get to is written inline
+        for mid in list(self._pending):
+            self._write(mid)
+
+    def _write(self, mid):
+        with self._lock:
+            data = self._pending.pop(mid, None)
+            if data is None:
+                return
+            self._failed.discard(mid)
+            self._inflight[mid] = data
+            self._busy += 1
+        try:
+            self._write_fn(mid, data)
+            result = {"state": "saved", "at": datetime.utcnow().isoformat()}
+        except Exception as e:
+            result = {"state": "error", "error": str(e), "retrying": True, "at": datetime.utcnow().isoformat()}
+            get_metrics().incr("state_write_errors")
+        with self._idle:
+            self._busy -= 1
+            if self._inflight.get(mid) is data:
+                del self._inflight[mid]
+            if mid not in self._pending:
+                if result["state"] == "error" and mid in self._status:
+                    # keep the state until a write lands, or load_state falls back to the old file
+                    self._pending[mid] = data
+                    self._failed.add(mid)
+                    self._retry_at = time.monotonic() + self._retry_seconds
+                self._status[mid] = result
+            self._idle.notify_all()
+
+    def _retry_failed(self):
+        with self._lock:
+            due = list(self._failed) if self._failed and time.monotonic() >= self._retry_at else []
+        for mid in due:
+            self._write(mid)
+
+    def _run(self):
+        while True:
+            try:
+                mid = self._queue.get(timeout=self._retry_seconds if self._failed else None)
+            except queue.Empty:
+                mid = ""
+            if mid is None:
+                break
+            if mid:
+                self._write(mid)
+            self._retry_failed()
+
+
+# ---------------- Storage interface ----------------
+class MatchStore:
+    """Storage interface used by ScoringEngine."""
+
+    def load_state(self, mid):
+        """Return the stored state dict for ``mid`` ({} if missing)."""
+        raise NotImplementedError
+
+    def save_state(self, mid, state):
+        raise NotImplementedError
+
+    def delete_state(self, mid):
+        raise NotImplementedError
+
+    def state_stamp(self, mid):
+        """Cheap token that changes whenever the stored state of ``mid`` changes (None = unknown)."""
+        return None
+
+    def load_index(self):
+        raise NotImplementedError
+
+    def save_index(self, idx):
+        raise NotImplementedError
+
+    def write_final(self, mid, state):
+        """Archive the final scorecard; returns (json_ref, csv_ref)."""
+        raise NotImplementedError
+
+    def save_status(self, mid):
+        return {"state": "saved"}
+
+    def flush(self, timeout=None):
+        return True
+
+    def close(self):
+        pass
+
+
+class FileStore(MatchStore):
+    """Files under ``data_dir`` (match_<mid>_state.json, matches_index.json, backups/).
+
+    State and backups are written with ``serializer`` (a Serializer or a spec
+    such as "binary+gzip"); file names stay the same whatever the format and
+    loads sniff the content, so switching formats needs no migration. The
+    index and final scorecards stay pretty JSON for people to open.
+    """
+
+    def __init__(self, data_dir, async_writes=True, serializer=None):
+        self.data_dir = data_dir
+        self.backup_dir = os.path.join(data_dir, "backups")
+        self.index_path = os.path.join(data_dir, "matches_index.json")
+        os.makedirs(self.data_dir, exist_ok=True)
+        os.makedirs(self.backup_dir, exist_ok=True)
+        self.serializer = get_serializer(serializer)
+        self._writer = StateWriter(self._write_files) if async_writes else None
+
+    def state_path(self, mid):
+        return os.path.join(self.data_dir, f"match_{mid}_state.json")
+
+    @instrumented("storage.write_match_files")
+    def _write_files(self, mid, data, fsync=True):
+        write_bytes_atomic(self.state_path(mid), data, fsync=fsync)
+        try:
+            ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+            write_bytes_atomic(os.path.join(self.backup_dir, f"match_{mid}_backup_{ts}.json"), data, fsync=fsync)
+        except:
+            pass
+
+    @instrumented("storage.load_match_state")
+    def load_state(self, mid):
+        if self._writer is not None:
+            pending = self._writer.pending(mid)
+            if pending is not None:
+                return self.serializer.loads(pending)
+        try:
+            return self.serializer.loads(read_bytes(self.state_path(mid)))
+        except:
+            return {}
+
+    @instrumented("storage.save_match_state")
+    def save_state(self, mid, state):
+        get_metrics().incr("match_state_saves")
+        data = self.serializer.dumps(state)
+        if self._writer is not None:
+            self._writer.submit(mid, data)
+        else:
+            self._write_files(mid, data, fsync=False)
+
+    def state_stamp(self, mid):
+        if self._writer is not None:
+            pending = self._writer.pending(mid)
+            if pending is not None:
+                return ("pending", len(pending), hash(pending))
+        try:
+            st = os.stat(self.state_path(mid))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def delete_state(self, mid):
+        if self._writer is not None:
+            self._writer.discard(mid)
+        try:
+            os.remove(self.state_path(mid))
+        except:
+            pass
+
+    def load_index(self):
+        return load_json(self.index_path, {})
+
+    def save_index(self, idx):
+        save_json(self.index_path, idx)
+
+    def write_final(self, mid, state):
+        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        base = os.path.join(self.backup_dir, f"match_{mid}_final_{ts}")
+        json_path = base + ".json"
+        csv_path = base + ".csv"
+        save_json(json_path, state)
+        try:
+            with open(csv_path, "wb") as f:
+                f.write(rows_to_csv(ball_rows(state, with_scores=True)))
+        except Exception:
+            pass
+        return json_path, csv_path
+
+    def save_status(self, mid):
+        if self._writer is None:
+            return {"state": "saved"}
+        return self._writer.status(mid)
+
+    def flush(self, timeout=None):
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class MemoryStore(MatchStore):
+    """Everything in RAM; states are stored serialized so callers cannot alias them."""
+
+    def __init__(self, serializer=None):
+        self.serializer = get_serializer(serializer)
+        self._states = {}
+        self._index = {}
+        self.finals = {}
+
+    def load_state(self, mid):
+        data = self._states.get(mid)
+        return self.serializer.loads(data) if data is not None else {}
+
+    def save_state(self, mid, state):
+        self._states[mid] = self.serializer.dumps(state)
+
+    def state_stamp(self, mid):
+        data = self._states.get(mid)
+        return None if data is None else (len(data), hash(data))
+
+    def delete_state(self, mid):
+        self._states.pop(mid, None)
+
+    def load_index(self):
+        return json.loads(json.dumps(self._index))
+
+    def save_index(self, idx):
+        self._index = json.loads(json.dumps(idx))
+
+    def write_final(self, mid, state):
+        self.finals[mid] = dump_state(state)
+        return f"memory:{mid}.json", f"memory:{mid}.csv"
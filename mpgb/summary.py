@@ -0,0 +1,128 @@
+# mpgb/summary.py - small JSON-ready views of a match for spectators and feeds
+#
+# live_summary() is what scoreboards, LED boards and bots need after each ball:
+# a few hundred bytes instead of the whole state. scorecard() and ball_range()
+# are the heavier views for recaps and feeds.
+
+from datetime import datetime
+
+from .balls import BW
+from .commentary import recent_commentary
+from .match import TEAM_A, TEAM_B, other_team
+from .roster import name_of, recent_balls, all_balls, batting_rows, bowling_rows
+from .partnerships import current_partnership, partnership_rows
+from .util import format_over_ball
+
+
+def _score(state, team):
+    sc = state.get("score", {}).get(team, {})
+    balls = int(sc.get("balls", 0) or 0)
+    return {"runs": int(sc.get("runs", 0) or 0), "wkts": int(sc.get("wkts", 0) or 0), "balls": balls, "overs": format_over_ball(balls)}
+
+
+def _batter(state, pid):
+    if pid is None or pid < 0:
+        return None
+    vals = state.get("batsman_stats", {}).get(str(pid), {})
+    return {"name": name_of(state, pid), "R": int(vals.get("R", 0) or 0), "B": int(vals.get("B", 0) or 0)}
+
+
+def _bowler(state, pid):
+    if pid is None or pid < 0:
+        return None
+    vals = state.get("bowler_stats", {}).get(str(pid), {})
+    return {"name": name_of(state, pid), "overs": format_over_ball(int(vals.get("B", 0) or 0)),
+            "R": int(vals.get("R", 0) or 0), "W": int(vals.get("W", 0) or 0)}
+
+
+def live_summary(mid, state, n_balls=6, n_commentary=6):
+    """Scoreboard view of ``state``: scores, crease, bowler, last balls, chase maths, result."""
+    bat = state.get("bat_team", TEAM_A)
+    sc = _score(state, bat)
+    batting = state.get("batting", {})
+    bowler = state.get("bowling", {}).get("current_bowler", -1)
+    log = state.get("balls_log", [])
+    if (bowler is None or bowler < 0) and log:
+        bowler = log[-1][BW]  # between overs: keep showing who bowled the last one
+    out = {
+        "mid": mid,
+        "title": state.get("title", "Match"),
+        "venue": state.get("venue", ""),
+        "status": state.get("status", ""),
+        "innings": int(state.get("innings", 1) or 1),
+        "version": int(state.get("version", 0) or 0),
+        "updated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "overs_limit": int(state.get("overs_limit", 0) or 0),
+        "bat_team": bat,
+        "bowl_team": other_team(bat),
+        "team_names": {t: (state.get("team_names") or {}).get(t, t) for t in (TEAM_A, TEAM_B)},
+        "score": {TEAM_A: _score(state, TEAM_A), TEAM_B: _score(state, TEAM_B)},
+        "run_rate": round(sc["runs"] / (sc["balls"] / 6), 2) if sc["balls"] else 0.0,
+        "striker": _batter(state, batting.get("striker", -1)),
+        "non_striker": _batter(state, batting.get("non_striker", -1)),
+        "bowler": _bowler(state, bowler),
+        "last_balls": [b["symbol"] for b in recent_balls(state, n_balls)][::-1],
+        "partnership": None,
+        "commentary": recent_commentary(state, n_commentary),
+        "target": None,
+        "required": None,
+        "result": (state.get("final_summary") or {}).get("result_text", ""),
+    }
+    stand = current_partnership(state)
+    if stand:
+        out["partnership"] = {"runs": stand["runs"], "balls": stand["balls"]}
+    if state.get("status") == "INNINGS2":
+        target = int(state.get("score", {}).get(other_team(bat), {}).get("runs", 0) or 0) + 1
+        out["target"] = target
+        need = max(0, target - sc["runs"])
+        limit = out["overs_limit"] * 6
+        if limit > 0:
+            left = max(0, limit - sc["balls"])
+            out["required"] = {"runs": need, "balls": left, "rate": round(need / (left / 6), 2) if left else None}
+        else:
+            out["required"] = {"runs": need, "balls": None, "rate": None}
+    return out
+
+
+def scorecard(mid, state):
+    """Full scorecard: both innings with batting/bowling figures and per-over totals."""
+    innings = []
+    for inn, team in ((1, TEAM_A), (2, TEAM_B)):
+        bowling = bowling_rows(state, other_team(team))
+        for row in bowling:
+            row.pop("BallsRaw", None)
+        innings.append({
+            "innings": inn,
+            "team": team,
+            "score": _score(state, team),
+            "batting": batting_rows(state, team),
+            "bowling": bowling,
+            "overs": [o for o in state.get("overs_detail", []) if o.get("innings") == inn],
+            "partnerships": partnership_rows(state, inn),
+            "fow": [{**f, "name": name_of(state, f["batter"]), "overs": format_over_ball(f["balls"])}
+                    for f in state.get("fow", []) if f["innings"] == inn],
+        })
+    fs = state.get("final_summary") or {}
+    return {
+        "mid": mid,
+        "title": state.get("title", "Match"),
+        "venue": state.get("venue", ""),
+        "status": state.get("status", ""),
+        "version": int(state.get("version", 0) or 0),
+        "overs_limit": int(state.get("overs_limit", 0) or 0),
+        "innings": innings,
+        "result": fs.get("result_text", ""),
+        "man_of_match": fs.get("man_of_the_match") or fs.get("man_of_match_auto") or state.get("man_of_match_override", ""),
+    }
+
+
+def ball_range(state, start=0, stop=None):
+    """Expanded balls ``start``..``stop`` (0-based, stop exclusive, clamped), each tagged with its index."""
+    balls = all_balls(state)
+    start = max(0, min(int(start), len(balls)))
+    stop = len(balls) if stop is None else max(start, min(int(stop), len(balls)))
+    out = []
+    for i in range(start, stop):
+        balls[i]["index"] = i
+        out.append(balls[i])
+    return out
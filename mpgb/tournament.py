@@ -0,0 +1,328 @@
+# mpgb/tournament.py - tournaments, fixtures and points tables (MPGB Cricket Club - Sagar)
+#
+# TournamentBook keeps named teams (reusable across tournaments) and each
+# tournament's fixtures and points table in one JSON document. It is an engine
+# listener: ScoringEngine.finalize() calls finalized(match, summary), and the
+# result of that one match is folded into the table - played/won/lost/tied,
+# points and the run/ball totals behind net run rate - without rescanning any
+# other match. Finalizing the same match again first takes its previous
+# contribution back out, so corrections never double count.
+#
+# Fixtures: round_robin() uses the circle method (one match per team per
+# round, a bye for odd counts); knockout_seeds() lays out a standard bracket
+# padded with byes to a power of two, and each next round is added as soon as
+# the current one is decided (and re-drawn if a decided winner changes).
+
+import os
+import threading
+from datetime import datetime
+
+from .match import TEAM_A, TEAM_B
+from .metrics import get_metrics, instrumented
+from .storage import load_json, save_json
+
+FORMATS = ("round_robin", "knockout")
+POINTS = {"W": 2, "T": 1, "L": 0}
+BYE = None
+
+
+def new_id(prefix):
+    return prefix + datetime.now().strftime("%Y%m%d%H%M%S%f")
+
+
+# ---------------- fixture generation ----------------
+def round_robin(team_ids, legs=1):
+    """[[(a, b), ...] per round]: every pair meets ``legs`` times (home/away swapped on the return leg)."""
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(BYE)
+    n = len(teams)
+    rounds = []
+    for leg in range(legs):
+        rot = teams[:]
+        for _ in range(n - 1):
+            pairs = []
+            for i in range(n // 2):
+                a, b = rot[i], rot[n - 1 - i]
+                if a is BYE or b is BYE:
+                    continue
+                pairs.append((b, a) if leg % 2 else (a, b))
+            rounds.append(pairs)
+            rot = [rot[0]] + [rot[-1]] + rot[1:-1]  # circle method: first team fixed
+    return rounds
+
+
+def bracket_order(size):
+    """Seed numbers (1-based) in bracket position order for a power-of-two ``size``: 1, 8, 4, 5, 2, 7, 3, 6 for 8.
+
+    Adjacent slots meet in round one and adjacent winners after that, so seeds
+    1 and 2 can only meet in the final, 1-4 and 2-3 in the semi-finals.
+    """
+    order = [1]
+    while len(order) < size:
+        n = len(order) * 2
+        order = [seed for s in order for seed in (s, n + 1 - s)]
+    return order
+
+
+def knockout_seeds(team_ids):
+    """First-round pairs in bracket order, padded with byes to a power of two (top seeds get the byes)."""
+    teams = list(team_ids)
+    size = 1
+    while size < len(teams):
+        size *= 2
+    teams += [BYE] * (size - len(teams))
+    slots = [teams[seed - 1] for seed in bracket_order(size)]
+    return [(slots[i], slots[i + 1]) for i in range(0, size, 2)]
+
+
+# ---------------- points table ----------------
+def empty_row():
+    return {"P": 0, "W": 0, "L": 0, "T": 0, "Pts": 0, "RF": 0, "BF": 0, "RA": 0, "BA": 0}
+
+
+def net_run_rate(row):
+    """Runs per over scored minus runs per over conceded (an all-out side counts its full quota of overs)."""
+    rf = row["RF"] / (row["BF"] / 6) if row["BF"] else 0.0
+    ra = row["RA"] / (row["BA"] / 6) if row["BA"] else 0.0
+    return round(rf - ra, 3)
+
+
+def match_contribution(state):
+    """{team_id: row delta} for one finished match, or None when it is not a linked tournament match."""
+    link = state.get("tournament") or {}
+    sides = link.get("teams") or {}
+    if TEAM_A not in sides or TEAM_B not in sides:
+        return None
+    quota = int(state.get("overs_limit", 0) or 0) * 6
+    score = state.get("score", {})
+    out = {}
+    for team, opp in ((TEAM_A, TEAM_B), (TEAM_B, TEAM_A)):
+        out[sides[team]] = row = empty_row()
+        row["P"] = 1
+        for key, side in (("RF", team), ("RA", opp)):
+            row[key] = int(score.get(side, {}).get("runs", 0) or 0)
+        for key, side in (("BF", team), ("BA", opp)):
+            sc = score.get(side, {})
+            balls = int(sc.get("balls", 0) or 0)
+            all_out = int(sc.get("wkts", 0) or 0) >= max(1, len(state.get("teams", {}).get(side, [])) - 1)
+            row[key] = quota if all_out and quota else balls
+    ra, rb = out[sides[TEAM_A]]["RF"], out[sides[TEAM_B]]["RF"]
+    for team, mine, theirs in ((TEAM_A, ra, rb), (TEAM_B, rb, ra)):
+        res = "T" if mine == theirs else ("W" if mine > theirs else "L")
+        out[sides[team]][res] = 1
+        out[sides[team]]["Pts"] = POINTS[res]
+    return out
+
+
+def _add(table, delta, sign):
+    for tid, d in delta.items():
+        row = table.setdefault(tid, empty_row())
+        for k, v in d.items():
+            row[k] = row.get(k, 0) + sign * v
+
+
+# ---------------- persistent book ----------------
+class TournamentBook:
+    """Teams and tournaments in one JSON file (``path=None`` keeps them in memory only)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._doc = None
+        self._mtime = None
+
+    # ---- storage ----
+    def _load(self):
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if self._doc is None or mtime != self._mtime:
+            doc = load_json(self.path) if mtime is not None else {}
+            doc.setdefault("teams", {})
+            doc.setdefault("tournaments", {})
+            self._doc, self._mtime = doc, mtime
+        return self._doc
+
+    def _save(self):
+        if self.path:
+            save_json(self.path, self._doc)
+            self._mtime = os.path.getmtime(self.path)
+
+    # ---- teams ----
+    def teams(self):
+        with self._lock:
+            return {k: dict(v) for k, v in self._load()["teams"].items()}
+
+    def save_team(self, name, players, team_id=None):
+        """Create or update a named team; ``players`` are mobiles or names, as for create_match."""
+        with self._lock:
+            doc = self._load()
+            team_id = team_id or new_id("T")
+            doc["teams"][team_id] = {"name": str(name).strip(), "players": [p for p in players if p]}
+            self._save()
+            return team_id
+
+    def team_name(self, team_id):
+        return self._load()["teams"].get(team_id, {}).get("name", team_id or "-")
+
+    # ---- tournaments ----
+    def tournaments(self):
+        with self._lock:
+            return {k: {"name": t["name"], "format": t["format"], "created_at": t["created_at"]}
+                    for k, t in self._load()["tournaments"].items()}
+
+    def get(self, tid):
+        with self._lock:
+            t = self._load()["tournaments"].get(tid)
+            return None if t is None else {**t, "fixtures": [dict(f) for f in t["fixtures"]],
+                                           "table": {k: dict(v) for k, v in t["table"].items()}}
+
+    def create(self, name, team_ids, fmt="round_robin", overs=10, legs=1):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown tournament format {fmt!r}; expected one of {FORMATS}")
+        with self._lock:
+            doc = self._load()
+            unknown = [t for t in team_ids if t not in doc["teams"]]
+            if unknown or len(team_ids) < 2:
+                raise ValueError("a tournament needs at least two saved teams")
+            tid = new_id("C")
+            t = {"name": name, "format": fmt, "overs": int(overs), "teams": list(team_ids),
+                 "created_at": datetime.now().isoformat(), "fixtures": [],
+                 "table": {team: empty_row() for team in team_ids}}
+            if fmt == "round_robin":
+                for rnd, pairs in enumerate(round_robin(team_ids, legs), start=1):
+                    for a, b in pairs:
+                        self._add_fixture(t, rnd, a, b)
+            else:
+                for a, b in knockout_seeds(team_ids):
+                    self._add_fixture(t, 1, a, b)
+                self._advance(t)
+            doc["tournaments"][tid] = t
+            self._save()
+            return tid
+
+    def delete(self, tid):
+        with self._lock:
+            if self._load()["tournaments"].pop(tid, None) is not None:
+                self._save()
+
+    def _add_fixture(self, t, rnd, a, b):
+        # fids are never reused: a dropped fixture's match may still carry its fid
+        t["next_fixture"] = seq = max(int(t.get("next_fixture", 0) or 0), len(t["fixtures"])) + 1
+        f = {"fid": f"F{seq:03d}", "round": rnd, "a": a, "b": b, "mid": None,
+             "status": "scheduled", "result": "", "winner": None, "applied": None}
+        if a is BYE or b is BYE:  # knockout bye: the other side walks through
+            f.update(status="bye", winner=a if b is BYE else b, result="bye")
+        t["fixtures"].append(f)
+        return f
+
+    def _advance(self, t):
+        # knockout: pair each decided round's winners into the next round. Walking
+        # from round one also repairs the bracket after a winner changed or was
+        # cleared: later fixtures built on the old winner are reset or dropped.
+        if t["format"] != "knockout" or not t["fixtures"]:
+            return
+        rnd = 1
+        while True:
+            current = [f for f in t["fixtures"] if f["round"] == rnd]
+            if len(current) < 2 or any(f["winner"] is None for f in current):
+                self._drop_rounds(t, rnd)
+                return
+            pairs = [(current[i]["winner"], current[i + 1]["winner"]) for i in range(0, len(current), 2)]
+            following = [f for f in t["fixtures"] if f["round"] == rnd + 1]
+            for i, (a, b) in enumerate(pairs):
+                if i >= len(following):
+                    self._add_fixture(t, rnd + 1, a, b)
+                elif (following[i]["a"], following[i]["b"]) != (a, b):
+                    self._reset_fixture(t, following[i])
+                    following[i].update(a=a, b=b)
+            rnd += 1
+
+    def _reset_fixture(self, t, f):
+        if f["applied"]:
+            _add(t["table"], f["applied"], -1)
+        f.update(mid=None, status="scheduled", result="", winner=None, applied=None)
+
+    def _drop_rounds(self, t, after):
+        for f in t["fixtures"]:
+            if f["round"] > after and f["applied"]:
+                _add(t["table"], f["applied"], -1)
+        t["fixtures"] = [f for f in t["fixtures"] if f["round"] <= after]
+
+    def start_fixture(self, engine, tid, fid, overs=None, venue=""):
+        """Create the engine match for a fixture (teams' players, names and link) and return it."""
+        with self._lock:
+            t = self._load()["tournaments"][tid]
+            f = next(f for f in t["fixtures"] if f["fid"] == fid)
+            if f["mid"]:
+                return engine.load_match(f["mid"])
+            teams = self._load()["teams"]
+            a, b = teams[f["a"]], teams[f["b"]]
+            extra = {"team_names": {TEAM_A: a["name"], TEAM_B: b["name"]},
+                     "tournament": {"tid": tid, "fid": fid, "teams": {TEAM_A: f["a"], TEAM_B: f["b"]}}}
+            match = engine.create_match(f"{a['name']} vs {b['name']} — {t['name']} R{f['round']}",
+                                        overs or t["overs"], a["players"], b["players"], venue=venue, extra=extra)
+            f.update(mid=match.mid, status="live")
+            self._save()
+            return match
+
+    def set_winner(self, tid, fid, team_id):
+        """Decide a tied knockout fixture (super over, toss...) so the bracket can move on."""
+        with self._lock:
+            t = self._load()["tournaments"][tid]
+            f = next(f for f in t["fixtures"] if f["fid"] == fid)
+            if team_id not in (f["a"], f["b"]):
+                raise ValueError("winner must be one of the fixture's teams")
+            f["winner"] = team_id
+            self._advance(t)
+            self._save()
+
+    # ---- engine listener protocol ----
+    def __call__(self, match):
+        pass  # only finished matches move the table; see finalized()
+
+    @instrumented("tournament.apply_result")
+    def finalized(self, match, summary):
+        link = match.state.get("tournament") or {}
+        delta = match_contribution(match.state)
+        if delta is None:
+            return
+        with self._lock:
+            t = self._load()["tournaments"].get(link.get("tid"))
+            f = next((f for f in (t or {}).get("fixtures", []) if f["fid"] == link.get("fid")), None)
+            if f is None or {f["a"], f["b"]} != set(link.get("teams", {}).values()):
+                return  # fixture gone, or re-drawn after a result upstream changed
+            if f["applied"]:
+                _add(t["table"], f["applied"], -1)  # re-finalized: replace, never double count
+            _add(t["table"], delta, +1)
+            won = [team for team, d in delta.items() if d["W"]]
+            f.update(mid=match.mid, status="completed", result=summary.get("result_text", ""),
+                     winner=won[0] if won else f["winner"] if t["format"] == "knockout" else None, applied=delta)
+            self._advance(t)
+            self._save()
+        get_metrics().incr("tournament_results")
+
+    def remove(self, mid):
+        # a deleted match's result leaves the table; the fixture can be played again
+        with self._lock:
+            changed = False
+            for t in self._load()["tournaments"].values():
+                for f in t["fixtures"]:
+                    if f["mid"] == mid:
+                        self._reset_fixture(t, f)
+                        self._advance(t)  # later rounds built on its winner go too
+                        changed = True
+            if changed:
+                self._save()
+
+    # ---- standings ----
+    def standings(self, tid):
+        """Points table rows, best first (points, then net run rate, then wins)."""
+        with self._lock:
+            t = self._load()["tournaments"].get(tid)
+            if t is None:
+                return []
+            rows = [{"Team": self.team_name(team), **row, "NRR": net_run_rate(row)} for team, row in t["table"].items()]
+        rows.sort(key=lambda r: (-r["Pts"], -r["NRR"], -r["W"], r["Team"]))
+        for pos, r in enumerate(rows, start=1):
+            r["Pos"] = pos
+        return rows
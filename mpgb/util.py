@@ -0,0 +1,38 @@
+# mpgb/util.py - small shared helpers (no Streamlit / pandas)
+
+
+def normalize_mobile(s):
+    if s is None or (isinstance(s, float) and s != s):  # None / NaN
+        return ""
+    s = str(s).strip()
+    for ch in [" ", "+", "-", "(", ")"]:
+        s = s.replace(ch, "")
+    digits = "".join([c for c in s if c.isdigit()])
+    if len(digits) > 10:
+        digits = digits[-10:]
+    return digits
+
+
+def format_over_ball(total_balls):
+    try:
+        total_balls = int(total_balls or 0)
+    except:
+        total_balls = 0
+    over_num = total_balls // 6
+    ball_in_over = total_balls % 6
+    return f"{over_num}.{ball_in_over}"
+
+
+# smart compare names or mobiles
+def same_player(a, b):
+    if not a or not b:
+        return False
+    sa = str(a).strip()
+    sb = str(b).strip()
+    if any(ch.isdigit() for ch in sa) and any(ch.isdigit() for ch in sb):
+        da = "".join([c for c in sa if c.isdigit()])
+        db = "".join([c for c in sb if c.isdigit()])
+        if len(da) >= 10 and len(db) >= 10:
+            return da[-10:] == db[-10:]
+        return da == db
+    return sa.lower() == sb.lower()
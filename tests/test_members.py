@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from mpgb.members import MemberRegistry, format_member_id, parse_member_id
+
+
+def run_threads(n, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_ids_continue_after_rows_added_by_hand(tmp_path):
+    path = tmp_path / "members.csv"
+    path.write_text("MemberID,Name,Mobile,Paid\nM007,Old,9876543210,Y\n", encoding="utf-8")
+    reg = MemberRegistry(str(path))
+    row, created = reg.register("New", "9123456780")
+    assert created and row["MemberID"] == "M008"
+    assert reg.register("Again", "91234 56780") == (row, False)
+
+
+@pytest.mark.parametrize("shared", [True, False], ids=["one-registry", "registry-per-thread"])
+def test_concurrent_registrations_get_unique_ids(tmp_path, shared):
+    path = str(tmp_path / "members.csv")
+    one = MemberRegistry(path, compact_after=5)
+    results = []
+
+    def register(i):
+        reg = one if shared else MemberRegistry(path, compact_after=5)
+        for j in range(10):
+            results.append(reg.register(f"P{i}-{j}", f"9{i:03d}{j:06d}")[0])
+
+    run_threads(8, register)
+    ids = [r["MemberID"] for r in results]
+    assert len(set(ids)) == len(ids) == 80
+    assert sorted(parse_member_id(m) for m in ids) == list(range(1, 81))
+    fresh = MemberRegistry(path).members()
+    assert [r["MemberID"] for r in fresh] == [format_member_id(n) for n in range(1, 81)]
+
+
+def test_concurrent_allocation_and_appends_never_overlap(tmp_path):
+    path = str(tmp_path / "members.csv")
+    blocks, rows = [], []
+
+    def work(i):
+        reg = MemberRegistry(path)
+        if i % 2:
+            for _ in range(5):
+                blocks.extend(reg.allocate_ids(3))
+        else:
+            report = reg.import_rows([{"Name": f"I{i}-{j}", "Mobile": f"8{i:03d}{j:06d}"} for j in range(15)])
+            rows.extend(r["MemberID"] for r in report["inserted"])
+
+    run_threads(6, work)
+    ids = blocks + rows
+    assert len(ids) == len(set(ids)) == 90
+    assert len(MemberRegistry(path).members()) == 45
+
+
+def test_same_mobile_registered_once_under_contention(tmp_path):
+    path = str(tmp_path / "members.csv")
+    results = []
+    run_threads(8, lambda i: results.append(MemberRegistry(path).register(f"Dup {i}", "9000000001")))
+    assert sum(created for _, created in results) == 1
+    assert len({row["MemberID"] for row, _ in results}) == 1
@@ -0,0 +1,31 @@
+import copy
+
+import pytest
+
+from mpgb import ScoringEngine
+from mpgb.bench import simulate_match
+from mpgb.engine import undo_ball
+from mpgb.replay import META_FIELDS, Timeline
+from mpgb.storage import MemoryStore
+
+
+def progress(state):
+    return {k: v for k, v in state.items() if k not in META_FIELDS}
+
+
+@pytest.mark.parametrize("seed", range(1, 13))
+def test_undo_matches_replay_at_every_ball(seed):
+    match = simulate_match(overs=3, players=6, seed=seed, engine=ScoringEngine(MemoryStore()))
+    timeline = Timeline(match.state)
+    state = copy.deepcopy(match.state)
+    for n in range(len(state["balls_log"]) - 1, -1, -1):
+        assert undo_ball(state)
+        assert progress(state) == progress(timeline.state_at(n)), f"ball {n}"
+    assert not undo_ball(state)
+
+
+@pytest.mark.parametrize("seed", range(1, 6))
+def test_replay_of_full_log_matches_live_state(seed):
+    match = simulate_match(overs=5, players=11, seed=seed, engine=ScoringEngine(MemoryStore()))
+    replayed = Timeline(match.state).state_at(len(match.state["balls_log"]))
+    assert progress(replayed) == progress(match.state)
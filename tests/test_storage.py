@@ -0,0 +1,87 @@
+import threading
+import time
+
+from mpgb.storage import StateWriter
+
+
+def test_writer_coalesces_to_newest_state():
+    gate, written = threading.Event(), []
+
+    def write(mid, data):
+        gate.wait(5)
+        written.append((mid, data))
+
+    writer = StateWriter(write)
+    writer.submit("m1", b"1")
+    for n in range(2, 6):
+        writer.submit("m1", str(n).encode())
+    gate.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+    # the first write may have started before the rest arrived; the middle ones never land
+    assert written[-1] == ("m1", b"5")
+    assert len(written) <= 2
+    assert writer.status("m1")["state"] == "saved"
+
+
+def test_pending_state_is_readable_until_written():
+    gate = threading.Event()
+    writer = StateWriter(lambda mid, data: gate.wait(5))
+    writer.submit("m1", b"new")
+    assert writer.pending("m1") == b"new"
+    gate.set()
+    assert writer.flush(timeout=5)
+    assert writer.pending("m1") is None
+    writer.close()
+
+
+def test_failed_write_is_kept_and_retried():
+    broken, written = [True], []
+
+    def write(mid, data):
+        if broken[0]:
+            raise OSError("disk full")
+        written.append(data)
+
+    writer = StateWriter(write, retry_seconds=0.05)
+    writer.submit("m1", b"state")
+    assert not writer.flush(timeout=5)
+    status = writer.status("m1")
+    assert status["state"] == "error" and status["retrying"]
+    assert writer.pending("m1") == b"state"
+
+    broken[0] = False
+    for _ in range(100):
+        if writer.status("m1")["state"] == "saved":
+            break
+        time.sleep(0.05)
+    assert writer.flush(timeout=5)
+    assert written == [b"state"]
+    assert writer.pending("m1") is None
+    writer.close()
+
+
+def test_newer_state_replaces_a_failed_one():
+    broken, written = [True], []
+
+    def write(mid, data):
+        if broken[0]:
+            raise OSError("disk full")
+        written.append(data)
+
+    writer = StateWriter(write, retry_seconds=60)
+    writer.submit("m1", b"old")
+    assert not writer.flush(timeout=5)
+    broken[0] = False
+    writer.submit("m1", b"new")
+    assert writer.flush(timeout=5)
+    assert written == [b"new"]
+    writer.close()
+
+
+def test_close_writes_inline_after_shutdown():
+    written = []
+    writer = StateWriter(lambda mid, data: written.append(data))
+    writer.close()
+    writer.submit("m1", b"late")
+    assert written == [b"late"]
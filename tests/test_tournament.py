@@ -0,0 +1,121 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from mpgb import ScoringEngine
+from mpgb.bench import ensure_bowler, random_delivery
+from mpgb.match import TEAM_A, TEAM_B
+from mpgb.storage import MemoryStore
+from mpgb.tournament import BYE, TournamentBook, bracket_order, knockout_seeds, round_robin
+
+
+@pytest.mark.parametrize("n", range(2, 9))
+def test_round_robin_pairs_every_team_once(n):
+    teams = [f"T{i}" for i in range(n)]
+    rounds = round_robin(teams)
+    games = [frozenset(p) for pairs in rounds for p in pairs]
+    assert sorted(games, key=sorted) == sorted((frozenset(p) for p in combinations(teams, 2)), key=sorted)
+    for pairs in rounds:
+        playing = [t for p in pairs for t in p]
+        assert len(playing) == len(set(playing)), "a team plays twice in one round"
+
+
+def test_round_robin_second_leg_swaps_home_and_away():
+    rounds = round_robin(["A", "B", "C", "D"], legs=2)
+    first = [p for pairs in rounds[:3] for p in pairs]
+    second = [p for pairs in rounds[3:] for p in pairs]
+    assert sorted((b, a) for a, b in first) == sorted(second)
+
+
+def test_bracket_order_keeps_top_seeds_apart():
+    assert bracket_order(8) == [1, 8, 4, 5, 2, 7, 3, 6]
+    assert bracket_order(4) == [1, 4, 2, 3]
+
+
+def test_knockout_seeds_give_byes_to_top_seeds():
+    pairs = knockout_seeds(["S1", "S2", "S3", "S4", "S5", "S6"])
+    assert pairs == [("S1", BYE), ("S4", "S5"), ("S2", BYE), ("S3", "S6")]
+
+
+# ---- points table through the engine ----
+def make_book(fmt="round_robin", teams=3):
+    book = TournamentBook()
+    engine = ScoringEngine(MemoryStore(), listeners=[book])
+    ids = [book.save_team(f"Team {c}", [f"{c}{p}" for p in "pqrst"]) for c in "XYZW"[:teams]]
+    tid = book.create("Cup", ids, fmt=fmt, overs=2)
+    return book, engine, tid
+
+
+def play(book, engine, tid, fid, seed):
+    rng = random.Random(seed)
+    match = book.start_fixture(engine, tid, fid)
+    turn = 0
+    while match.status in ("INNINGS1", "INNINGS2"):
+        turn = ensure_bowler(engine, match, turn)
+        outcome, extras, wicket = random_delivery(rng)
+        engine.record_ball(match, outcome, extras=extras, wicket_info=wicket)
+    return match
+
+
+def played(book, tid):
+    return {team: row["P"] for team, row in book.get(tid)["table"].items()}
+
+
+def test_result_goes_into_table():
+    book, engine, tid = make_book()
+    f = book.get(tid)["fixtures"][0]
+    match = play(book, engine, tid, f["fid"], seed=3)
+    engine.finalize(match)
+    table = book.get(tid)["table"]
+    assert table[f["a"]]["P"] == table[f["b"]]["P"] == 1
+    assert table[f["a"]]["RF"] == table[f["b"]]["RA"] == match.state["score"][TEAM_A]["runs"]
+    assert sum(row["Pts"] for row in table.values()) == 2
+
+
+def test_refinalizing_replaces_the_result():
+    book, engine, tid = make_book()
+    fid = book.get(tid)["fixtures"][0]["fid"]
+    match = play(book, engine, tid, fid, seed=4)
+    engine.finalize(match)
+    before = book.get(tid)["table"]
+    engine.finalize(match)
+    assert book.get(tid)["table"] == before
+
+    engine.undo_last_ball(match)
+    engine.record_ball(match, "6")
+    engine.finalize(match)
+    table = book.get(tid)["table"]
+    assert sorted(played(book, tid).values()) == [0, 1, 1]
+    assert sum(row["RF"] for row in table.values()) == match.state["score"][TEAM_A]["runs"] + match.state["score"][TEAM_B]["runs"]
+
+
+def test_deleting_a_match_takes_its_result_out():
+    book, engine, tid = make_book()
+    fid = book.get(tid)["fixtures"][0]["fid"]
+    match = play(book, engine, tid, fid, seed=5)
+    engine.finalize(match)
+    engine.delete_match(match.mid)
+    t = book.get(tid)
+    assert all(row["P"] == row["Pts"] == row["RF"] == 0 for row in t["table"].values())
+    f = next(f for f in t["fixtures"] if f["fid"] == fid)
+    assert f["mid"] is None and f["status"] == "scheduled"
+
+
+def test_knockout_final_is_redrawn_when_a_semi_goes():
+    book, engine, tid = make_book(fmt="knockout", teams=4)
+    semis = book.get(tid)["fixtures"]
+    matches = []
+    for seed, f in enumerate(semis, start=1):
+        match = play(book, engine, tid, f["fid"], seed)
+        engine.finalize(match)
+        if book.get(tid)["fixtures"][seed - 1]["winner"] is None:  # tie: decide it
+            book.set_winner(tid, f["fid"], f["a"])
+        matches.append(match)
+    fixtures = book.get(tid)["fixtures"]
+    final = [f for f in fixtures if f["round"] == 2]
+    assert len(final) == 1
+    assert {final[0]["a"], final[0]["b"]} == {f["winner"] for f in fixtures if f["round"] == 1}
+
+    engine.delete_match(matches[0].mid)
+    assert [f["round"] for f in book.get(tid)["fixtures"]] == [1, 1]